@@ -0,0 +1,618 @@
+import sys  # Used to measure the sizes of individual objects
+import time  # Used to time benchmarked operations
+import random  # Used to seed the pseudorandom number generator that Productionist uses
+import gc  # Used to count the objects allocated while fulfilling replayed content requests
+import itertools  # Used to enumerate the combinations of Productionist modes that requests are replayed under
+import array  # Used to recognize array-backed grammar paths when estimating the size of equivalent lists
+import os  # Used to lay out the files that scaling benchmarks generate
+import tempfile  # Used to hold those files, by default
+import json  # Used to write out benchmark results in a machine-readable format
+import platform  # Used to record the environment that benchmark results were obtained in
+import multiprocessing  # Used to run each indexing job in a fresh process, so that its peak memory can be measured
+try:
+    import resource  # Used to measure the peak memory of a process (Unix only)
+except ImportError:
+    resource = None
+import argparse  # Used to handle command-line arguments for this program
+import productionist
+import reductionist
+import synthetic_grammar
+from memory_accounting import deep_sizeof
+
+
+class _DictBackedObject(object):
+    """An empty object with a per-object attribute dictionary, used to estimate the size of dict-backed objects."""
+    pass
+
+
+def estimate_dict_backed_sizeof(obj):
+    """Return an estimate of the size, in bytes, that the given slotted object and the grammar paths it owns
+    would take up under the original dict-backed object model (with paths held as lists of Python ints).
+    """
+    attributes = {name: getattr(obj, name, None) for name in obj.__slots__}
+    size = sys.getsizeof(_DictBackedObject()) + sys.getsizeof(attributes)
+    for value in attributes.itervalues():
+        if isinstance(value, array.array):
+            size += _estimate_list_of_ints_sizeof(value)
+    return size
+
+
+def _estimate_list_of_ints_sizeof(int_array):
+    """Return an estimate of the size, in bytes, of a list of Python ints holding the given array's values."""
+    # Note: CPython caches small ints, so only larger ones would be allocated for each list
+    size = sys.getsizeof(list(int_array))
+    for value in int_array:
+        if not -5 <= value <= 256:
+            size += sys.getsizeof(value)
+    return size
+
+
+def measure_object_model_memory(productionist_object):
+    """Return a list of (component, object count, compact bytes, dict-backed bytes) tuples comparing the memory
+    taken up by the given Productionist's grammar objects under the compact (slotted, array-backed) object model
+    and the original dict-backed object model.
+    """
+    grammar = productionist_object.grammar
+    recipes = []
+    for expressible_meaning in productionist_object.expressible_meanings:
+        recipes += expressible_meaning.recipes or []
+    components = (
+        ('symbols', grammar.nonterminal_symbols),
+        ('rules', grammar.production_rules),
+        ('meanings', productionist_object.expressible_meanings),
+        ('recipes', recipes),
+    )
+    # Since components reference each other (e.g., a rule references its head), we measure each component's
+    # compact size excluding the objects of every other component, and excluding terminal strings and tags,
+    # which are shared across components
+    all_component_objects = set()
+    for _, objects in components:
+        all_component_objects |= {id(o) for o in objects}
+    shared_strings = {id(s) for s in grammar.terminal_symbols} | {id(t) for t in grammar.tags}
+    rows = []
+    for component_name, objects in components:
+        seen = (all_component_objects - {id(o) for o in objects}) | shared_strings
+        compact_size = sum(deep_sizeof(o, seen=seen) for o in objects)
+        # Compute how much of that is attributable to the objects' own storage (the object itself, plus the
+        # paths it owns), so that we can swap in an estimate for the dict-backed equivalent of that storage
+        own_storage_size = 0
+        for o in objects:
+            own_storage_size += sys.getsizeof(o)
+            for name in o.__slots__:
+                value = getattr(o, name, None)
+                if isinstance(value, array.array):
+                    own_storage_size += sys.getsizeof(value)
+        dict_backed_size = (
+            compact_size - own_storage_size + sum(estimate_dict_backed_sizeof(o) for o in objects)
+        )
+        rows.append((component_name, len(objects), compact_size, dict_backed_size))
+    return rows
+
+
+def _run_memory_benchmark(args):
+    """Load a content bundle and print a comparison of the memory its object model takes up."""
+    productionist_object = productionist.Productionist(
+        content_bundle_name=args.content_bundle_name,
+        content_bundle_directory=args.content_bundle_dir,
+        repetition_penalty_mode=False,
+        verbosity=0
+    )
+    rows = measure_object_model_memory(productionist_object=productionist_object)
+    print "{:<12}{:>12}{:>16}{:>16}{:>10}".format('component', 'objects', 'compact (B)', 'dict-backed (B)', 'saved')
+    for component_name, n_objects, compact_size, dict_backed_size in rows:
+        print "{:<12}{:>12}{:>16}{:>16}{:>9.1f}%".format(
+            component_name, n_objects, compact_size, dict_backed_size,
+            100.0 * (dict_backed_size - compact_size) / dict_backed_size if dict_backed_size else 0.0
+        )
+    total_compact_size = sum(row[2] for row in rows)
+    total_dict_backed_size = sum(row[3] for row in rows)
+    print "{:<12}{:>12}{:>16}{:>16}{:>9.1f}%".format(
+        'total', sum(row[1] for row in rows), total_compact_size, total_dict_backed_size,
+        100.0 * (total_dict_backed_size - total_compact_size) / total_dict_backed_size
+    )
+
+
+def measure_throughput(productionist_object, n):
+    """Return a tuple (outputs per second when fulfilling content requests, outputs per second for the expansion
+    engine alone) for the given Productionist, as measured over n outputs each.
+
+    The content request that's used is an empty one, which every expressible meaning satisfices, and the
+    expansion engine is measured by following recipes for those expressible meanings that were selected.
+    """
+    content_request = productionist.ContentRequest()
+    start_time = time.time()
+    for _ in xrange(n):
+        productionist_object.fulfill_content_request(content_request=content_request)
+    fulfillment_rate = n / (time.time() - start_time)
+    recipes = []
+    for _ in xrange(n):
+        selected_expressible_meaning = productionist_object._select_expressible_meaning(
+            candidates=productionist_object.expressible_meanings, scoring_metric=None
+        )
+        recipes.append(
+            productionist_object._select_recipe_for_expressible_meaning(expressible_meaning=selected_expressible_meaning)
+        )
+    start_time = time.time()
+    for recipe in recipes:
+        productionist_object._follow_recipe(recipe=recipe)
+    expansion_rate = n / (time.time() - start_time)
+    return fulfillment_rate, expansion_rate
+
+
+def _run_throughput_benchmark(args):
+    """Load a content bundle and print the rate at which outputs can be generated from it."""
+    random.seed(args.seed)
+    productionist_object = productionist.Productionist(
+        content_bundle_name=args.content_bundle_name,
+        content_bundle_directory=args.content_bundle_dir,
+        probabilistic_mode=not args.nonprobabilistic,
+        repetition_penalty_mode=False,
+        terse_mode=args.terse,
+        verbosity=0
+    )
+    fulfillment_rate, expansion_rate = measure_throughput(productionist_object=productionist_object, n=args.n)
+    print "Fulfilled content requests:\t{rate:.0f} outputs/s".format(rate=fulfillment_rate)
+    print "Expansion engine alone:\t\t{rate:.0f} outputs/s".format(rate=expansion_rate)
+
+
+def load_request_log(request_log_location):
+    """Return a list of content requests parsed from the given JSONL request log.
+
+    Each line of the log specifies one content request as a JSON object with any of the following keys:
+    'must_have' and 'must_not_have' (lists of tags), 'scoring_metric' (a list of [tag, weight] pairs),
+    'speaker', and 'min_length' and 'max_length' (in characters).
+    """
+    content_requests = []
+    with open(request_log_location) as request_log:
+        for line in request_log:
+            if not line.strip():
+                continue
+            request_specification = json.loads(line)
+            content_requests.append(productionist.ContentRequest(
+                must_have=set(request_specification.get('must_have', ())),
+                must_not_have=set(request_specification.get('must_not_have', ())),
+                scoring_metric=[tuple(pair) for pair in request_specification.get('scoring_metric', ())],
+                speaker=request_specification.get('speaker'),
+                min_length=request_specification.get('min_length'),
+                max_length=request_specification.get('max_length')
+            ))
+    return content_requests
+
+
+def save_request_log(content_requests, request_log_location):
+    """Write the given content requests to a JSONL request log (see load_request_log())."""
+    with open(request_log_location, 'w') as request_log:
+        for content_request in content_requests:
+            request_specification = {
+                'must_have': sorted(content_request.must_have),
+                'must_not_have': sorted(content_request.must_not_have),
+                'scoring_metric': [list(pair) for pair in content_request.scoring_metric or ()],
+            }
+            if content_request.speaker is not None:
+                request_specification['speaker'] = content_request.speaker
+            if content_request.min_length is not None:
+                request_specification['min_length'] = content_request.min_length
+            if content_request.max_length is not None:
+                request_specification['max_length'] = content_request.max_length
+            request_log.write(json.dumps(request_specification) + '\n')
+
+
+def generate_request_mix(productionist_object, n, narrow_fraction=0.5, seed=0):
+    """Return a list of n synthetic content requests for the given Productionist's bundle.
+
+    A narrow_fraction of the requests are narrow, which means that they must have every tag of some randomly
+    selected expressible meaning (such that only a few meanings will satisfice); the rest are broad, which
+    means that they must have at most one tag (such that many meanings will satisfice). Every request can be
+    fulfilled.
+    """
+    rng = random.Random(seed)
+    expressible_meanings = productionist_object.expressible_meanings
+    content_requests = []
+    for _ in xrange(n):
+        expressible_meaning = rng.choice(expressible_meanings)
+        if rng.random() < narrow_fraction:
+            must_have = set(expressible_meaning.tags)
+        elif expressible_meaning.tags and rng.random() < 0.5:
+            must_have = {rng.choice(sorted(expressible_meaning.tags))}
+        else:
+            must_have = set()
+        content_requests.append(productionist.ContentRequest(must_have=must_have))
+    return content_requests
+
+
+def replay_content_requests(productionist_object, content_requests):
+    """Fulfill each of the given content requests with the given Productionist, and return a dictionary reporting
+    on the throughput, the latency percentiles, and the allocations per request.
+
+    Since Python 2 provides no counter of all allocations, allocations are measured as the net number of
+    objects tracked by the garbage collector that are allocated (and not yet freed) while a request is
+    fulfilled, with garbage collection disabled during the replay; this counts every container that a
+    request leaves behind (including cyclic garbage), which is what drives garbage-collection pressure.
+    """
+    latencies = []
+    n_failures = 0
+    n_allocations = 0
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start_time = time.time()
+        for content_request in content_requests:
+            n_tracked_objects_before = gc.get_count()[0]
+            request_start_time = time.time()
+            try:
+                productionist_object.fulfill_content_request(content_request=content_request)
+            except AssertionError:
+                # This request cannot be fulfilled using this bundle
+                n_failures += 1
+            latencies.append(time.time() - request_start_time)
+            n_allocations += gc.get_count()[0] - n_tracked_objects_before
+            if gc.get_count()[0] > 100000:
+                # Don't let garbage pile up indefinitely (the collection isn't timed)
+                gc.collect()
+        total_seconds = time.time() - start_time
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    latencies.sort()
+
+    def percentile(q):
+        """Return the given percentile of the request latencies."""
+        return latencies[min(len(latencies)-1, int(q / 100.0 * len(latencies)))] if latencies else 0.0
+
+    return {
+        'n_requests': len(content_requests),
+        'n_failures': n_failures,
+        'requests_per_second': len(content_requests) / total_seconds if total_seconds else 0.0,
+        'p50_ms': 1000 * percentile(q=50),
+        'p95_ms': 1000 * percentile(q=95),
+        'p99_ms': 1000 * percentile(q=99),
+        'max_ms': 1000 * latencies[-1] if latencies else 0.0,
+        'allocations_per_request': float(n_allocations) / len(content_requests) if content_requests else 0.0,
+    }
+
+
+def run_replay_benchmark(content_bundle_name, content_bundle_directory, content_requests, seed=0):
+    """Replay the given content requests against the given bundle under every combination of probabilistic
+    (vs. nonprobabilistic), repetition-penalty, and terse modes, and return a list of dictionaries reporting
+    on each combination (see replay_content_requests()).
+    """
+    results = []
+    for probabilistic_mode, repetition_penalty_mode, terse_mode in itertools.product((True, False), repeat=3):
+        productionist_object = productionist.Productionist(
+            content_bundle_name=content_bundle_name,
+            content_bundle_directory=content_bundle_directory,
+            probabilistic_mode=probabilistic_mode,
+            repetition_penalty_mode=repetition_penalty_mode,
+            terse_mode=terse_mode,
+            verbosity=0
+        )
+        random.seed(seed)
+        result = replay_content_requests(productionist_object=productionist_object, content_requests=content_requests)
+        result['modes'] = {
+            'probabilistic': probabilistic_mode,
+            'repetition_penalty': repetition_penalty_mode,
+            'terse': terse_mode,
+        }
+        results.append(result)
+    return results
+
+
+def _run_replay_benchmark(args):
+    """Replay a request log (or a synthetic request mix) against a bundle under every mode combination, print a
+    summary, and (if applicable) write the results to file.
+    """
+    if args.request_log:
+        content_requests = load_request_log(request_log_location=args.request_log)
+    else:
+        content_requests = generate_request_mix(
+            productionist_object=productionist.Productionist(
+                content_bundle_name=args.content_bundle_name, content_bundle_directory=args.content_bundle_dir,
+                repetition_penalty_mode=False, verbosity=0
+            ),
+            n=args.n, narrow_fraction=args.narrow_fraction, seed=args.seed
+        )
+        if args.save_request_log:
+            save_request_log(content_requests=content_requests, request_log_location=args.save_request_log)
+    results = run_replay_benchmark(
+        content_bundle_name=args.content_bundle_name, content_bundle_directory=args.content_bundle_dir,
+        content_requests=content_requests, seed=args.seed
+    )
+    print "{:<14}{:<12}{:<8}{:>10}{:>10}{:>10}{:>10}{:>12}{:>10}".format(
+        'probabilistic', 'repetition', 'terse', 'req/s', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'net allocs', 'failures'
+    )
+    for result in results:
+        print "{:<14}{:<12}{:<8}{:>10.0f}{:>10.3f}{:>10.3f}{:>10.3f}{:>12.2f}{:>10}".format(
+            str(result['modes']['probabilistic']), str(result['modes']['repetition_penalty']),
+            str(result['modes']['terse']), result['requests_per_second'], result['p50_ms'], result['p95_ms'],
+            result['p99_ms'], result['allocations_per_request'], result['n_failures']
+        )
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({
+                'benchmark': 'replay',
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python_version': platform.python_version(),
+                'platform': platform.platform(),
+                'content_bundle': args.content_bundle_name,
+                'request_log': args.request_log,
+                'n_requests': len(content_requests),
+                'results': results,
+            }, output_file, indent=2, sort_keys=True)
+        print "\nWrote results to {output}".format(output=args.output)
+
+
+def measure_reductionist_phases(grammar_file_location, output_path_and_filename, memory_accounting=False):
+    """Index the given grammar and return a dictionary reporting on the time taken by each Reductionist phase
+    (and, if memory_accounting is True, the estimated bytes taken up by Reductionist's structures after each
+    phase), along with the peak memory of the process (if it can be measured on this platform).
+    """
+    start_time = time.time()
+    reductionist_object = reductionist.Reductionist(
+        path_to_input_content_file=grammar_file_location,
+        path_to_write_output_files_to=output_path_and_filename,
+        trie_output=True,
+        memory_accounting=memory_accounting,
+        verbosity=0
+    )
+    total_seconds = time.time() - start_time
+    estimated_bytes_after_phase = {
+        phase: sum(row[2] for row in rows) for phase, rows in reductionist_object.memory_snapshots
+    }
+    phases = []
+    for phase, seconds in reductionist_object.phase_timings:
+        phases.append({'phase': phase, 'seconds': seconds, 'estimated_bytes': estimated_bytes_after_phase.get(phase)})
+    failed = bool(reductionist_object.validator.errors)
+    return {
+        'n_symbols': len(reductionist_object.grammar.nonterminal_symbols),
+        'n_rules': len(reductionist_object.grammar.production_rules),
+        'n_grammar_paths': len(reductionist_object.trie) if not failed else None,
+        'n_expressible_meanings': len(reductionist_object.expressible_meanings) if not failed else None,
+        'validation_errors': reductionist_object.validator.error_messages,
+        'total_seconds': total_seconds,
+        'phases': phases,
+        # Note: on Linux, ru_maxrss is reported in kilobytes
+        'peak_rss_kilobytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+    }
+
+
+def _measure_reductionist_phases_in_fresh_process(kwargs):
+    """Call measure_reductionist_phases() with the given keyword arguments (used as a pool task)."""
+    return measure_reductionist_phases(**kwargs)
+
+
+def run_reductionist_scaling_benchmark(sizes, work_directory, memory_accounting=False, **knobs):
+    """Generate a synthetic grammar with each of the given numbers of nonterminal symbols (and the given knobs;
+    see synthetic_grammar.generate_synthetic_grammar()), index each one, and return a dictionary reporting on
+    how each Reductionist phase scales.
+
+    Each grammar is indexed in a fresh process, such that the peak memory that's reported pertains to that
+    grammar alone.
+    """
+    runs = []
+    for n_symbols in sizes:
+        grammar_file_location = os.path.join(work_directory, 'synthetic_{n}.json'.format(n=n_symbols))
+        synthetic_grammar.write_synthetic_grammar(
+            output_file_location=grammar_file_location, n_symbols=n_symbols, **knobs
+        )
+        pool = multiprocessing.Pool(processes=1)
+        try:
+            run = pool.apply(_measure_reductionist_phases_in_fresh_process, ({
+                'grammar_file_location': grammar_file_location,
+                'output_path_and_filename': os.path.join(work_directory, 'synthetic_{n}'.format(n=n_symbols)),
+                'memory_accounting': memory_accounting,
+            },))
+        finally:
+            pool.close()
+            pool.join()
+        run['requested_n_symbols'] = n_symbols
+        runs.append(run)
+    return {
+        'benchmark': 'reductionist_scaling',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'knobs': knobs,
+        'memory_accounting': memory_accounting,
+        'runs': runs,
+    }
+
+
+def _run_reductionist_scaling_benchmark(args):
+    """Run the Reductionist scaling benchmark, print a summary, and write the results to file."""
+    work_directory = args.work_dir or tempfile.mkdtemp(prefix='reductionist_scaling_')
+    results = run_reductionist_scaling_benchmark(
+        sizes=[int(size) for size in args.sizes.split(',')],
+        work_directory=work_directory,
+        memory_accounting=args.memory,
+        branching_factor=args.branching_factor,
+        depth=args.depth,
+        nonterminals_per_rule=args.nonterminals_per_rule,
+        tag_density=args.tag_density,
+        sharing=args.sharing,
+        seed=args.seed
+    )
+    phase_names = [phase['phase'] for phase in results['runs'][0]['phases']]
+    print "{:>10}{:>10}{:>12}{:>12}".format('symbols', 'rules', 'paths', 'meanings') + ''.join(
+        "{:>14}".format(phase_name[:13]) for phase_name in phase_names
+    ) + "{:>12}".format('peak RSS')
+    for run in results['runs']:
+        seconds_by_phase = {phase['phase']: phase['seconds'] for phase in run['phases']}
+        print "{:>10}{:>10}{:>12}{:>12}".format(
+            run['n_symbols'], run['n_rules'], run['n_grammar_paths'], run['n_expressible_meanings']
+        ) + ''.join(
+            "{:>13.3f}s".format(seconds_by_phase[phase_name]) if phase_name in seconds_by_phase else "{:>14}".format('-')
+            for phase_name in phase_names
+        ) + "{:>10}KB".format(run['peak_rss_kilobytes'])
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2, sort_keys=True)
+    print "\nWrote results to {output}".format(output=args.output)
+
+
+if __name__ == "__main__":
+    # Parse the command-line arguments
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(help="the benchmark to run")
+    memory_parser = subparsers.add_parser(
+        "memory",
+        help="compare the memory taken up by a loaded content bundle under the compact object model with an " +
+             "estimate for the original dict-backed object model"
+    )
+    memory_parser.add_argument(
+        "content_bundle_name",
+        help="the name of the content bundle that is to be loaded"
+    )
+    memory_parser.add_argument(
+        "content_bundle_dir",
+        help="the full filepath to the bundle of content files that have been generated by Reductionist"
+    )
+    memory_parser.set_defaults(run_benchmark=_run_memory_benchmark)
+    throughput_parser = subparsers.add_parser(
+        "throughput",
+        help="measure the number of outputs per second that can be generated from a content bundle"
+    )
+    throughput_parser.add_argument(
+        "content_bundle_name",
+        help="the name of the content bundle that is to be loaded"
+    )
+    throughput_parser.add_argument(
+        "content_bundle_dir",
+        help="the full filepath to the bundle of content files that have been generated by Reductionist"
+    )
+    throughput_parser.add_argument(
+        "--n",
+        help="the number of outputs to generate (default: 5000)",
+        type=int,
+        default=5000
+    )
+    throughput_parser.add_argument(
+        "--nonprobabilistic",
+        help="whether to disengage probabilistic mode (flag argument)",
+        action="store_true"
+    )
+    throughput_parser.add_argument(
+        "--terse",
+        help="whether to engage terse mode (flag argument)",
+        action="store_true"
+    )
+    throughput_parser.add_argument(
+        "--seed",
+        help="an integer seed for the pseudorandom number generator that Productionist uses (default: 0)",
+        type=int,
+        default=0
+    )
+    throughput_parser.set_defaults(run_benchmark=_run_throughput_benchmark)
+    replay_parser = subparsers.add_parser(
+        "replay",
+        help="replay a request log (or a synthetic mix of broad and narrow requests) against a content bundle " +
+             "under every combination of Productionist modes, reporting throughput, latency, and allocations"
+    )
+    replay_parser.add_argument(
+        "content_bundle_name",
+        help="the name of the content bundle that is to be loaded"
+    )
+    replay_parser.add_argument(
+        "content_bundle_dir",
+        help="the full filepath to the bundle of content files that have been generated by Reductionist"
+    )
+    replay_parser.add_argument(
+        "--request_log",
+        help="the filepath to a JSONL request log to replay (default: none, in which case a synthetic request " +
+             "mix will be replayed)",
+        default=None
+    )
+    replay_parser.add_argument(
+        "--n",
+        help="the number of requests in the synthetic request mix (default: 5000)",
+        type=int,
+        default=5000
+    )
+    replay_parser.add_argument(
+        "--narrow_fraction",
+        help="the fraction of requests in the synthetic request mix that have narrow tag constraints, rather " +
+             "than broad ones (default: 0.5)",
+        type=float,
+        default=0.5
+    )
+    replay_parser.add_argument(
+        "--save_request_log",
+        help="a filepath that the synthetic request mix will be written to, as a JSONL request log (default: none)",
+        default=None
+    )
+    replay_parser.add_argument(
+        "--seed",
+        help="an integer seed for generating the synthetic request mix and for Productionist (default: 0)",
+        type=int,
+        default=0
+    )
+    replay_parser.add_argument(
+        "--output",
+        help="a filepath that the results will be written to, as JSON (default: none)",
+        default=None
+    )
+    replay_parser.set_defaults(run_benchmark=_run_replay_benchmark)
+    scaling_parser = subparsers.add_parser(
+        "reductionist_scaling",
+        help="time and memory-profile each Reductionist phase across a sweep of synthetic grammar sizes"
+    )
+    scaling_parser.add_argument(
+        "--sizes",
+        help="a comma-separated list of the numbers of nonterminal symbols to sweep over (default: 50,100,200,400)",
+        default="50,100,200,400"
+    )
+    scaling_parser.add_argument(
+        "--branching_factor",
+        help="the number of production rules for each nonterminal symbol (default: 3)",
+        type=int,
+        default=3
+    )
+    scaling_parser.add_argument(
+        "--depth",
+        help="the number of levels of nonterminal symbols (default: 4)",
+        type=int,
+        default=4
+    )
+    scaling_parser.add_argument(
+        "--nonterminals_per_rule",
+        help="the number of nonterminal symbols referenced in the body of each non-leaf rule (default: 2)",
+        type=int,
+        default=2
+    )
+    scaling_parser.add_argument(
+        "--tag_density",
+        help="the probability that a given nonterminal symbol is tagged (default: 0.2)",
+        type=float,
+        default=0.2
+    )
+    scaling_parser.add_argument(
+        "--sharing",
+        help="the probability that a symbol reference is to a random symbol on the next level (default: 0.5)",
+        type=float,
+        default=0.5
+    )
+    scaling_parser.add_argument(
+        "--seed",
+        help="an integer seed for generating the synthetic grammars (default: 0)",
+        type=int,
+        default=0
+    )
+    scaling_parser.add_argument(
+        "--memory",
+        help="whether to estimate the bytes taken up by Reductionist's structures after each phase (flag " +
+             "argument); this makes the benchmark take longer, but doesn't affect the reported timings",
+        action="store_true"
+    )
+    scaling_parser.add_argument(
+        "--work_dir",
+        help="the directory that synthetic grammars and bundles will be written to (default: a new temporary " +
+             "directory)",
+        default=None
+    )
+    scaling_parser.add_argument(
+        "--output",
+        help="the filepath that the results will be written to, as JSON (default: reductionist_scaling.json)",
+        default="reductionist_scaling.json"
+    )
+    scaling_parser.set_defaults(run_benchmark=_run_reductionist_scaling_benchmark)
+    args = parser.parse_args()
+    args.run_benchmark(args)
@@ -0,0 +1,227 @@
+import sys  # Used to measure the sizes of individual objects
+import gc  # Used to traverse object graphs when measuring their total size
+import os  # Used to measure the sizes of memory-mapped files
+import argparse  # Used to handle command-line arguments for this program
+
+
+def deep_sizeof(obj, seen=None):
+    """Return the total size, in bytes, of the given object and everything reachable from it.
+
+    Objects that have already been counted (i.e., whose IDs are in the given set) are not counted again,
+    which allows callers to attribute shared objects to whichever structure they measure first. Classes,
+    modules, and functions are never counted, since these aren't part of the data that a bundle loads.
+    """
+    if seen is None:
+        seen = set()
+    total_size = 0
+    objects_to_measure = [obj]
+    while objects_to_measure:
+        o = objects_to_measure.pop()
+        if id(o) in seen or isinstance(o, (type, type(sys), type(deep_sizeof))):
+            continue
+        seen.add(id(o))
+        total_size += sys.getsizeof(o)
+        objects_to_measure.extend(gc.get_referents(o))
+    return total_size
+
+
+def account_for_components(components, shared_objects=()):
+    """Return a list of (component, object count, estimated bytes) tuples for the given components.
+
+    Each component is specified as a tuple (name, objects), and its size is the deep size of its objects,
+    excluding the objects of every other component (since components reference each other, e.g., a rule
+    references its head) and excluding the given shared objects. Whatever a component's objects reach that
+    isn't excluded in this way (and that hasn't already been counted for an earlier component) is attributed
+    to that component.
+    """
+    component_object_ids = {name: {id(o) for o in objects} for name, objects in components}
+    all_component_object_ids = set()
+    for object_ids in component_object_ids.itervalues():
+        all_component_object_ids |= object_ids
+    excluded_object_ids = {id(o) for o in shared_objects}
+    counted_object_ids = set()
+    rows = []
+    for name, objects in components:
+        seen = (all_component_object_ids - component_object_ids[name]) | excluded_object_ids | counted_object_ids
+        size = 0
+        for o in objects:
+            size += deep_sizeof(o, seen=seen)
+        counted_object_ids |= seen - all_component_object_ids - excluded_object_ids
+        counted_object_ids |= component_object_ids[name]
+        rows.append((name, len(objects), size))
+    return rows
+
+
+def _trie_size(trie):
+    """Return the number of bytes that the given marisa trie takes up (None counts as zero)."""
+    if trie is None:
+        return 0
+    return len(trie.tobytes())
+
+
+def productionist_memory_breakdown(productionist_object):
+    """Return a list of (component, object count, estimated bytes) tuples accounting for the memory taken up
+    by the given Productionist's loaded content bundle.
+
+    The trie and (in memory-mapped-meanings mode) the expressible-meanings file are memory-mapped, and so they
+    are reported at their mapped sizes; these pages live in the page cache, which is shared by all the worker
+    processes on a host that load the same bundle.
+    """
+    grammar = productionist_object.grammar
+    recipes = []
+    for expressible_meaning in productionist_object.expressible_meanings:
+        recipes += expressible_meaning.recipes or []
+    # In memory-mapped-meanings mode, recipes are only held for recently selected meanings
+    for cached_recipes in productionist_object._recipe_cache._entries.itervalues():
+        recipes += cached_recipes
+    caches = [productionist_object._restored_path_cache, productionist_object._dedup_windows]
+    if productionist_object._recipes_field_offsets is not None:
+        caches.append(productionist_object._recipes_field_offsets)
+    repetition_state = []
+    if productionist_object.repetition_penalties is not None:
+        repetition_state.append(productionist_object.repetition_penalties)
+    factored_index = []
+    if productionist_object.factored_meaning_index is not None:
+        factored_index.append(productionist_object.factored_meaning_index)
+    components = (
+        ('symbols', grammar.nonterminal_symbols),
+        ('rules', grammar.production_rules),
+        ('terminals', grammar.terminal_symbols),
+        ('tags', list(grammar.tags)),
+        ('meanings', productionist_object.expressible_meanings),
+        ('recipes', recipes),
+        ('factored_index', factored_index),
+        ('repetition', repetition_state),
+        ('caches', caches),
+        # Whatever else the grammar holds onto (e.g., its lookup tables and interned strings)
+        ('grammar', [grammar]),
+    )
+    rows = account_for_components(components=components)
+    rows.append(('trie', 1 if productionist_object.trie is not None else 0, _trie_size(productionist_object.trie)))
+    if productionist_object._expressible_meanings_map is not None:
+        rows.append(('meanings_map', 1, len(productionist_object._expressible_meanings_map)))
+    shared_repetition_file_location = productionist_object.shared_repetition_penalties_file_location
+    if shared_repetition_file_location and os.path.isfile(shared_repetition_file_location):
+        rows.append(('repetition_map', 1, os.path.getsize(shared_repetition_file_location)))
+    return rows
+
+
+def reductionist_memory_breakdown(reductionist_object, grammar_paths=None):
+    """Return a list of (component, object count, estimated bytes) tuples accounting for the memory taken up
+    by the given Reductionist's intermediate structures, as they currently stand.
+
+    Since the set of semantically meaningful grammar paths only exists while the trie is being built, it may
+    be passed in explicitly; once the trie is built, the paths held for its keys are accounted for instead.
+    """
+    grammar = reductionist_object.grammar
+    if grammar_paths is None:
+        grammar_paths = getattr(reductionist_object, '_grammar_paths_for_trie_keys', None)
+    components = [
+        ('symbols', grammar.nonterminal_symbols),
+        ('rules', grammar.production_rules),
+    ]
+    if grammar_paths is not None:
+        components.append(('paths', list(grammar_paths)))
+    expressible_meanings = getattr(reductionist_object, 'expressible_meanings', None)
+    if expressible_meanings is not None:
+        components.append(('meanings', expressible_meanings))
+    rows = account_for_components(components=components)
+    trie = getattr(reductionist_object, 'trie', None)
+    if trie is not None:
+        rows.append(('trie', 1, _trie_size(trie)))
+    return rows
+
+
+def format_memory_breakdown(rows):
+    """Return a human-readable table for the given (component, object count, estimated bytes) tuples."""
+    lines = ["{:<16}{:>12}{:>16}".format('component', 'objects', 'bytes')]
+    for component_name, n_objects, size in rows:
+        lines.append("{:<16}{:>12}{:>16}".format(component_name, n_objects, size))
+    lines.append("{:<16}{:>12}{:>16}".format('total', sum(row[1] for row in rows), sum(row[2] for row in rows)))
+    return '\n'.join(lines)
+
+
+def _run_productionist_report(args):
+    """Load a content bundle and print a breakdown of the memory it takes up."""
+    import productionist
+    productionist_object = productionist.Productionist(
+        content_bundle_name=args.content_bundle_name,
+        content_bundle_directory=args.content_bundle_dir,
+        repetition_penalty_mode=args.repetition_penalty,
+        memory_mapped_meanings=args.mmap_meanings,
+        verbosity=0
+    )
+    print format_memory_breakdown(rows=productionist_memory_breakdown(productionist_object=productionist_object))
+
+
+def _run_reductionist_report(args):
+    """Index a grammar and print a breakdown of the memory taken up by Reductionist at each indexing phase."""
+    import reductionist  # Imported here, since Reductionist itself imports this module
+    output_path_and_filename = args.output_dir
+    if output_path_and_filename[-1] != '/':
+        output_path_and_filename += '/'
+    output_path_and_filename += args.content_bundle_name
+    reductionist_object = reductionist.Reductionist(
+        path_to_input_content_file=args.grammar_file,
+        path_to_write_output_files_to=output_path_and_filename,
+        trie_output=args.trie_output,
+        memory_accounting=True,
+        verbosity=0
+    )
+    for phase, rows in reductionist_object.memory_snapshots:
+        print "-- After phase '{phase}':".format(phase=phase)
+        print format_memory_breakdown(rows=rows)
+        print
+
+
+if __name__ == "__main__":
+    # Parse the command-line arguments
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(help="the component whose memory is to be accounted for")
+    productionist_parser = subparsers.add_parser(
+        "productionist",
+        help="report a breakdown of the memory taken up by a content bundle loaded by Productionist"
+    )
+    productionist_parser.add_argument(
+        "content_bundle_name",
+        help="the name of the content bundle that is to be loaded"
+    )
+    productionist_parser.add_argument(
+        "content_bundle_dir",
+        help="the full filepath to the bundle of content files that have been generated by Reductionist"
+    )
+    productionist_parser.add_argument(
+        "--repetition_penalty",
+        help="whether to account for repetition-penalty state (flag argument)",
+        action="store_true"
+    )
+    productionist_parser.add_argument(
+        "--mmap_meanings",
+        help="whether to memory-map the expressible-meanings file (flag argument)",
+        action="store_true"
+    )
+    productionist_parser.set_defaults(run_report=_run_productionist_report)
+    reductionist_parser = subparsers.add_parser(
+        "reductionist",
+        help="index a grammar and report a breakdown of the memory taken up by Reductionist at each phase"
+    )
+    reductionist_parser.add_argument(
+        "content_bundle_name",
+        help="the name to be used across the bundle of content files that Reductionist will generate"
+    )
+    reductionist_parser.add_argument(
+        "grammar_file",
+        help="the full filepath to a grammar file exported by Expressionist"
+    )
+    reductionist_parser.add_argument(
+        "output_dir",
+        help="the full filepath to the directory that output files generated by Reductionist should be written to"
+    )
+    reductionist_parser.add_argument(
+        "--trie_output",
+        help="whether to include trie keys in the .meanings files (flag argument)",
+        action="store_true"
+    )
+    reductionist_parser.set_defaults(run_report=_run_reductionist_report)
+    args = parser.parse_args()
+    args.run_report(args)
@@ -1,12 +1,111 @@
 import random
 import re  # Used to build a content unit's tree expression
-import os  # Used to check modification times on grammar files
+import os  # Used to atomically replace repetition-penalty checkpoint files
+import tempfile  # Used to give each save of a repetition-penalty checkpoint file its own temporary file
+import time  # Used to determine when repetition penalties are due to be checkpointed, and to time phases
+import mmap  # Used to memory-map large expressible-meanings files, so that worker processes may share the page cache
+import array  # Used to compactly store recipe paths and the offset table for memory-mapped expressible meanings
+import collections  # Used to implement bounded least-recently-used caches and the queue of remaining path rules
+import bisect  # Used to sample from the precomputed cumulative weights in wildcard decision tables
+import sys  # Used to estimate the memory taken up by pre-generated outputs
+import threading  # Used to pre-generate outputs in the background
+import math  # Used to size the Bloom filters that track recently emitted outputs
+import hashlib  # Used to hash output texts into Bloom filters, and to hash bundle contents to validate checkpoints
+import struct  # Used to unpack hash digests into integers and to pack repetition-penalty file headers
+import ctypes  # Used to view shared repetition penalties in a memory-mapped file as arrays of numbers
+try:
+    import fcntl  # Used to lock stripes of shared repetition penalties across worker processes (Unix only)
+except ImportError:
+    fcntl = None
 import json  # Used to parse JSON grammar file generated by Reductionist
-import pickle  # Used to serialize the repetition-penalties dictionary, for persistence across generation instances
+import io  # Used to buffer the streams of compressed content files
+import gzip  # Used to decompress content files that Reductionist compressed
+import bz2  # Used to decompress content files that Reductionist compressed
+try:
+    import lzma  # Used to decompress content files that Reductionist compressed (Python 3 only)
+except ImportError:
+    lzma = None
+import cProfile  # Used to optionally profile content-request fulfillment, as part of instrumentation
+import pstats  # Used to report on such profiles
+import StringIO  # Used to collect such reports as strings
 import argparse  # Used to handle command-line arguments for this program
 import marisa_trie  # Used to load a trie data structure efficiently storing all the paths through the grammar
 
 
+# Define configuration parameters as constants
+HAVE_REPETITIONS_FILE_PERSIST_ACROSS_RUNTIME_INSTANCES = False
+REPETITION_PENALTY_MULTIPLIER = 0.033  # Initially 30 times less likely to be used after first usage
+REPETITION_PENALTY_RECOVERY_RATE = 1.2  # Sheds 15% of its current penalty after each non-usage instance
+# Note: to see how many turns it will take for a symbol's repetition penalty to fully refresh (to a 1.0 value),
+# repeatedly multiple a value initialized to REPETITION_PENALTY_MULTIPLIER by REPETITION_PENALTY_RECOVERY_RATE
+# until the value reaches 1.0 (e.g., for REPETITION_PENALTY_MULTIPLIER=0.033 and REPETITION_PENALTY_RECOVERY_RATE
+# =1.2, it takes 19 turns for a symbol to fully refresh)
+# The number of recipes that will be sampled from a factored index, for a content request that specifies a length
+# budget, before giving up on finding one that could produce content of a fitting length (the recipes of a bundle
+# with a factored index are never enumerated, and so they can't be pruned by their lengths ahead of time)
+LENGTH_BOUNDED_RECIPE_SAMPLING_ATTEMPTS = 32
+
+
+def content_file_compression(content_file_location):
+    """Return the codec ('gzip', 'bz2', or 'lzma') that the given content file was compressed with, or None if
+    it is uncompressed, as detected from the magic bytes at the start of the file.
+    """
+    with open(content_file_location, 'rb') as content_file:
+        magic = content_file.read(6)
+    if magic.startswith('\x1f\x8b'):
+        return 'gzip'
+    if magic.startswith('BZh'):
+        return 'bz2'
+    if magic == '\xfd7zXZ\x00':
+        return 'lzma'
+    return None
+
+
+def open_content_file(content_file_location):
+    """Open the given content file for reading, decompressing it as a stream if Reductionist compressed it.
+
+    Since the codec is detected from the file itself, a compressed bundle keeps the usual filenames, and
+    Reductionist may be switched between codecs without any change to how Productionist is configured.
+    """
+    compression = content_file_compression(content_file_location=content_file_location)
+    if compression is None:
+        return open(content_file_location, 'rb')
+    if compression == 'gzip':
+        # Note: GzipFile implements line iteration in Python, so we wrap it in a (C) buffered reader
+        return io.BufferedReader(gzip.open(content_file_location, 'rb'))
+    if compression == 'bz2':
+        return bz2.BZ2File(content_file_location, 'r')
+    if lzma is None:
+        raise Exception(
+            "Cannot load '{filepath}' -- it is compressed with lzma, which isn't available".format(
+                filepath=content_file_location
+            )
+        )
+    return lzma.open(content_file_location, 'rb')
+
+
+def uncompressed_content_file_size(content_file_location):
+    """Return the number of bytes that the given content file holds once decompressed (for an uncompressed file,
+    simply its size on disk).
+
+    A gzip file records this in its trailer (modulo 2**32, which is plenty for estimating footprints); for the
+    other codecs, it is determined by decompressing the file as a stream, which costs about as much as loading it.
+    """
+    compression = content_file_compression(content_file_location=content_file_location)
+    if compression is None:
+        return os.path.getsize(content_file_location)
+    if compression == 'gzip':
+        with open(content_file_location, 'rb') as content_file:
+            content_file.seek(-4, os.SEEK_END)
+            uncompressed_size, = struct.unpack('<I', content_file.read(4))
+        return uncompressed_size
+    uncompressed_size = 0
+    with open_content_file(content_file_location=content_file_location) as content_file:
+        for chunk in iter(lambda: content_file.read(1024*1024), ''):
+            uncompressed_size += len(chunk)
+    return uncompressed_size
+
+
 class Productionist(object):
     """A system that generates text outputs at runtime, on the fly.
 
@@ -16,7 +115,11 @@ class Productionist(object):
     """
 
     def __init__(self, content_bundle_name, content_bundle_directory, probabilistic_mode=False,
-                 repetition_penalty_mode=True, terse_mode=False, verbosity=1):
+                 repetition_penalty_mode=True, terse_mode=False, memory_mapped_meanings=False,
+                 recipe_cache_size=256, restored_path_cache_size=128, dedup_window_size=0, dedup_max_retries=3,
+                 persist_repetition_penalties=HAVE_REPETITIONS_FILE_PERSIST_ACROSS_RUNTIME_INSTANCES,
+                 repetition_penalties_checkpoint_interval=30.0, shared_repetition_penalties_file_location=None,
+                 verbosity=1):
         """Initialize a Productionist object."""
         self.content_bundle = content_bundle_name
         # If verbosity is 0, no information will be printed out during processing; if 1, information
@@ -37,6 +140,9 @@ class Productionist(object):
         # If applicable, load the trie file at the specified location; this file contains a data structure
         # (a 'trie') that efficiently stores all the semantically meaningful paths through the
         # grammar; this file will have been generated by Reductionist
+        # A bounded cache mapping trie keys to the grammar paths that they have been restored to; recipes
+        # in a bundle with a trie are held as trie keys, which only get restored when the recipe is used
+        self._restored_path_cache = LRUCache(capacity=restored_path_cache_size)
         try:
             self.trie = self._load_trie(
                 trie_file_location='{path}/{bundle_name}.marisa'.format(
@@ -45,14 +151,48 @@ class Productionist(object):
             )
         except IOError:
             self.trie = None
+        # If the bundle was indexed with a factored index (i.e., it includes a '.dag' file), its expressible
+        # meanings come with no enumerated recipes; instead, a recipe is sampled on demand, by walking the
+        # grammar with the tag signatures that Reductionist annotated its symbols and rules with
+        try:
+            self.factored_meaning_index = FactoredMeaningIndex.load(
+                tag_signatures_file_location='{path}/{bundle_name}.dag'.format(
+                    path=content_bundle_directory, bundle_name=content_bundle_name
+                ),
+                grammar=self.grammar
+            )
+            if self.verbosity > 0:
+                print "Loading factored meaning index..."
+        except IOError:
+            self.factored_meaning_index = None
+        # In memory-mapped-meanings mode, the expressible-meanings file is memory-mapped rather than read
+        # into memory, and only the tags of each expressible meaning (along with an offset table specifying
+        # where its recipes live in the file) are kept resident; a meaning's recipes are then decoded the
+        # first time that it is selected, and held onto in a bounded cache thereafter. Because the file is
+        # mapped read-only, worker processes on the same host will share its pages in the page cache.
+        self.memory_mapped_meanings = memory_mapped_meanings
+        # These get set by self._load_expressible_meanings_memory_mapped(), if applicable
+        self._expressible_meanings_map = None
+        self._recipes_field_offsets = None
+        # A bounded cache mapping the IDs of recently selected expressible meanings to their decoded
+        # recipes (only used in memory-mapped-meanings mode)
+        self._recipe_cache = LRUCache(capacity=recipe_cache_size)
         # Also load a set of expressible meanings -- these pertain to each of the possible tagsets that
         # generated content may come packaged with, and each expressible meaning bundles its associated
         # tagset with recipes for producing that content (in the form of paths through the grammar)
-        self.expressible_meanings = self._load_expressible_meanings(
-            expressible_meanings_file_location='{path}/{bundle_name}.meanings'.format(
-                path=content_bundle_directory, bundle_name=content_bundle_name
-            )
+        expressible_meanings_file_location = '{path}/{bundle_name}.meanings'.format(
+            path=content_bundle_directory, bundle_name=content_bundle_name
         )
+        if memory_mapped_meanings:
+            self.expressible_meanings = self._load_expressible_meanings_memory_mapped(
+                expressible_meanings_file_location=expressible_meanings_file_location
+            )
+        else:
+            self.expressible_meanings = self._load_expressible_meanings(
+                expressible_meanings_file_location=expressible_meanings_file_location
+            )
+        # The meanings now hold their own length bounds, so the grammar needn't hold onto them as well
+        self.grammar.expressible_meaning_length_bounds = None
         # In probabilistic mode, Productionist will select which expressible meanings to target
         # probabilistically, by fitting a probability distribution to the candidates using the scores
         # given to them; otherwise, Productionist will simply pick the highest scoring one
@@ -62,42 +202,95 @@ class Productionist(object):
         # rate on the penalty for selecting them); we do this by maintaining a current penalty for each
         # rule that increases each time the rule is used and decays as the rule is not used
         self.repetition_penalty_mode = repetition_penalty_mode
+        # Repetition penalties are held in a compact store, indexed by symbol (see Grammar.n_symbols); if
+        # they are to persist across generation instances, the store gets checkpointed to a file in the
+        # content bundle directory at most every repetition_penalties_checkpoint_interval seconds (as well
+        # as whenever self.save_repetition_penalties_file() is called), which means that a crash will lose
+        # at most one checkpoint interval's worth of updates
+        self.persist_repetition_penalties = persist_repetition_penalties
+        self.repetition_penalties_checkpoint_interval = repetition_penalties_checkpoint_interval
+        self._repetitions_file_location = '{path}/{bundle_name}.repetitions'.format(
+            path=content_bundle_directory, bundle_name=content_bundle_name
+        )
+        self._last_repetition_penalties_checkpoint_time = time.time()
+        # If a shared repetition-penalties file is specified, the penalties will be held in a memory-mapped
+        # file that all the worker processes on this host (that specify the same file) will read and update
+        # together, such that the same speaker will not repeat itself depending on which worker serves it
+        self.shared_repetition_penalties_file_location = shared_repetition_penalties_file_location
+        self.repetition_penalties = None
         if repetition_penalty_mode:
-            if HAVE_REPETITIONS_FILE_PERSIST_ACROSS_RUNTIME_INSTANCES:
-                # Check to see if a repetitions file has already been generated for this grammar (from a prior
-                # generation instance); repetition files are saved as serialized (pickled) Python dictionaries
+            if persist_repetition_penalties or shared_repetition_penalties_file_location:
+                # Repetitions files (and shared repetition-penalty files) can only be used for a content bundle
+                # with the very same grammar, which we check by comparing a hash of the grammar file's contents
+                bundle_content_hash = self._compute_bundle_content_hash(
+                    grammar_file_location='{path}/{bundle_name}.grammar'.format(
+                        path=content_bundle_directory, bundle_name=content_bundle_name
+                    )
+                )
+            if persist_repetition_penalties:
+                # Check to see if a repetitions file has already been saved for this content bundle (from a prior
+                # generation instance)
                 try:
-                    path_to_repetitions_file = '{path}.repetitions'.format(path=content_bundle_directory[:-5])
-                    repetitions_file = open(path_to_repetitions_file, 'rb')
-                    self.repetition_penalties = pickle.load(repetitions_file)
-                    # Make sure the grammar hasn't been modified since this repetitions file was last saved
-                    assert os.path.getmtime(path_to_repetitions_file) > os.path.getmtime(content_bundle_directory), None
+                    self.repetition_penalties = RepetitionPenaltyStore.load(
+                        repetitions_file_location=self._repetitions_file_location,
+                        n_symbols=self.grammar.n_symbols, bundle_content_hash=bundle_content_hash
+                    )
                     if self.verbosity > 0:
                         print "Loading repetitions file..."
-                except (IOError, AssertionError):
-                    # Time to initialize a new repetition-penalties dictionary; later, we'll save this so that
+                except (IOError, ValueError):
+                    # Time to initialize a new repetition-penalties store; later, we'll save this so that
                     # it can persist for use during any subsequent generation instances from this same grammar
-                    self.repetition_penalties = {
-                        str(symbol): 1.0 for symbol in self.grammar.nonterminal_symbols+self.grammar.terminal_symbols
-                    }
+                    self.repetition_penalties = RepetitionPenaltyStore(
+                        n_symbols=self.grammar.n_symbols, bundle_content_hash=bundle_content_hash
+                    )
                     if self.verbosity > 0:
-                        print "Could not load repetitions dictionary -- initializing new one..."
+                        print "Could not load repetitions file -- initializing new repetition penalties..."
             else:
-                self.repetition_penalties = {
-                    str(symbol): 1.0 for symbol in self.grammar.nonterminal_symbols+self.grammar.terminal_symbols
-                }
+                self.repetition_penalties = RepetitionPenaltyStore(n_symbols=self.grammar.n_symbols)
                 if self.verbosity > 0:
-                    print "Initializing new repetitions dictionary..."
-        else:
-            self.repetition_penalties = {}
+                    print "Initializing new repetition penalties..."
+            if shared_repetition_penalties_file_location:
+                # Attach to the shared repetition penalties; if this is the first worker to do so, the shared
+                # file will be initialized with the penalties that we just loaded or initialized. The given
+                # location is suffixed with the bundle name and the grammar hash, such that the bundles loaded by
+                # a BundleManager (which are all initialized with the same keyword arguments) each get their own
+                # file, and such that a new build of a bundle gets a fresh file, rather than colliding with the
+                # one for the old build (see self.adopt_repetition_penalties() for how penalties carry over)
+                self.repetition_penalties = SharedRepetitionPenaltyStore(
+                    shared_file_location='{path}.{bundle_name}.{content_hash}'.format(
+                        path=shared_repetition_penalties_file_location, bundle_name=content_bundle_name,
+                        content_hash=bundle_content_hash.encode('hex')
+                    ),
+                    n_symbols=self.grammar.n_symbols, bundle_content_hash=bundle_content_hash,
+                    recovery_rate=REPETITION_PENALTY_RECOVERY_RATE, initial_values=self.repetition_penalties.values
+                )
+                if self.verbosity > 0:
+                    print "Attaching to shared repetition penalties..."
         # In terse mode, the system will favor production rules that may produce terser dialogue
         self.terse_mode = terse_mode
+        # If a dedup window is specified (i.e., if its size is not 0), Productionist will keep track of the
+        # texts of the outputs it has recently emitted (at least the last dedup_window_size of them), and
+        # when it generates a duplicate of one, it will reject it and retry, up to dedup_max_retries times
+        # (after which the duplicate is let through); a window is kept for the bundle as a whole, and one is
+        # kept for each speaker specified in a content request (a bounded number of speakers are tracked, in
+        # least-recently-used fashion), which keeps memory usage constant
+        self.dedup_window_size = dedup_window_size
+        self.dedup_max_retries = dedup_max_retries
+        self._dedup_windows = LRUCache(capacity=256)
+        # Counts that are used to report on deduplication (see self.dedup_metrics())
+        self.dedup_checks = 0
+        self.dedup_rejections = 0
+        self.dedup_retries_exhausted = 0
         # The remaining path holds all the semantically meaningful production rules that the system
         # is to execute as soon as they are encountered (between encountering these rules, the
         # system is free to select between wildcard production rules since that only result in
         # lexical/syntactic variation, i.e., not variation in the tags that are accumulated); this
         # attribute gets set by self._follow_recipe()
-        self.remaining_path = []
+        self.remaining_path = collections.deque()
+        # When a content request specifies a length budget, this holds, for each rule on the remaining path, the
+        # minimum and maximum lengths that each nonterminal symbol in its body can contribute when the recipe is
+        # followed; this attribute also gets set by self._follow_recipe()
+        self.remaining_path_body_length_bounds = collections.deque()
         # The explicit path holds all the production rules that the system ended up executing
         # during generation (including ones that were selected as wildcard rules, which would thus not
         # be included in the remaining path); this is saved a record of the generation process that
@@ -108,12 +301,61 @@ class Productionist(object):
         # it is generating example terminal results of expanding nonterminal symbols or executing
         # production rules, in which case every production rule becomes a wildcard rule
         self.targeting_meaning = True
+        # If instrumentation is enabled (see self.enable_instrumentation()), this will be an Instrumentation
+        # object that collects per-phase latencies and counters as content requests are fulfilled; when it's
+        # None, the only cost of instrumentation is a handful of checks per request
+        self.instrumentation = None
+        # Lastly, build the tables that each nonterminal symbol carries to support the selection of wildcard
+        # rules; since these bake in the scoring modes that are engaged, they should be rebuilt (by calling
+        # this method again) if any of those modes is changed after initialization
+        self.build_wildcard_decision_tables()
 
     @property
     def scoring_modes_engaged(self):
         """Return whether any mode is engaged such that candidate production rules need to be scored."""
         return self.repetition_penalty_mode or self.terse_mode or self.grammar.unequal_rule_frequencies
 
+    def build_wildcard_decision_tables(self):
+        """Precompute, for each nonterminal symbol, the tables used to select its wildcard rules.
+
+        Each symbol gets one table for when Productionist is targeting an expressible meaning (in which case
+        only rules that are not semantically meaningful are candidates) and one for when it isn't (in which
+        case all of the symbol's rules are). Since the only component of a rule's score that changes over
+        time is its repetition penalty, everything else is folded into a static weight here.
+        """
+        # Determine how wildcard rules will be selected, given the scoring modes that are engaged
+        if not self.scoring_modes_engaged:
+            self._wildcard_selection_mode = 'uniform'
+        elif not self.repetition_penalty_mode:
+            self._wildcard_selection_mode = 'static'
+        else:
+            self._wildcard_selection_mode = 'dynamic'
+        for symbol in self.grammar.nonterminal_symbols:
+            symbol.targeting_wildcard_table = self._build_wildcard_decision_table(
+                candidate_rules=[r for r in symbol.production_rules if not r.semantically_meaningful]
+            )
+            symbol.nontargeting_wildcard_table = self._build_wildcard_decision_table(
+                candidate_rules=symbol.production_rules
+            )
+
+    def _build_wildcard_decision_table(self, candidate_rules):
+        """Return a WildcardDecisionTable for the given candidate wildcard rules."""
+        static_weights = []
+        penalty_indices = []
+        for rule in candidate_rules:
+            # Mirror the static components of self._score_candidate_production_rule()
+            static_weight = 1.0
+            if self.terse_mode:
+                for symbol in rule.body:
+                    static_weight /= len(symbol) if type(symbol) == unicode else 2
+            static_weight *= rule.frequency_score_multiplier
+            static_weights.append(static_weight)
+            # Hold onto the indices of the repetition penalties for the symbols in this rule's body
+            penalty_indices.append(rule.body_symbol_indices if self.repetition_penalty_mode else ())
+        return WildcardDecisionTable(
+            rules=candidate_rules, static_weights=static_weights, penalty_indices=penalty_indices
+        )
+
     def _load_grammar(self, grammar_file_location):
         """Load the grammar specification from file and build and return a Grammar object for it."""
         if self.verbosity > 0:
@@ -122,11 +364,19 @@ class Productionist(object):
         return grammar_object
 
     def _load_trie(self, trie_file_location):
-        """Load a trie from file (one containing the semantically meaningful paths through this grammar)."""
+        """Load a trie from file (one containing the semantically meaningful paths through this grammar).
+
+        The trie is memory-mapped, rather than read into memory, so that paths can be restored from it
+        on demand without it ever becoming resident in full.
+        """
+        # Note: marisa_trie raises a RuntimeError when asked to map a nonexistent file, so we check for
+        # this ourselves to signal that the bundle simply doesn't include a trie
+        if not os.path.isfile(trie_file_location):
+            raise IOError("There is no trie file located at '{filepath}'".format(filepath=trie_file_location))
         if self.verbosity > 0:
             print "Loading trie..."
         trie = marisa_trie.Trie()
-        trie.load(trie_file_location)
+        trie.mmap(trie_file_location)
         return trie
 
     def _load_expressible_meanings(self, expressible_meanings_file_location):
@@ -135,7 +385,7 @@ class Productionist(object):
             print "Loading expressible meanings..."
         expressible_meanings = []
         try:
-            f = open(expressible_meanings_file_location, 'r')
+            f = open_content_file(content_file_location=expressible_meanings_file_location)
         except IOError:
             raise Exception(
                 "Cannot load expressible meanings -- there is no file located at '{filepath}'".format(
@@ -143,30 +393,172 @@ class Productionist(object):
                 )
             )
         id_to_tag = self.grammar.id_to_tag
-        for line in f.readlines():
+        # Note: the file is iterated over line by line, such that a compressed file is decompressed as a stream
+        for line in f:
             meaning_id, all_paths_str, all_tags_str = line.strip('\n').split('\t')
-            if self.trie:
-                path_trie_keys = [int(path_trie_key) for path_trie_key in all_paths_str.split(',')]
-                recipes = [self.trie.restore_key(path_trie_key) for path_trie_key in path_trie_keys]
+            min_length, max_length = self._saved_length_bounds_for_expressible_meaning(meaning_id=int(meaning_id))
+            # In a bundle with a factored index, the recipes field only holds a wildcard
+            if self.factored_meaning_index is not None:
+                recipes = None
             else:
-                recipes = []
-                for path_str in all_paths_str.split('|'):
-                    recipes.append([int(rule_id) for rule_id in path_str.split(',')])
-            tags = {id_to_tag[tag_id] for tag_id in all_tags_str.split(',')} if all_tags_str else set()
+                recipes = self._parse_recipes_field(all_paths_str=all_paths_str)
+            tag_ids = all_tags_str.split(',') if all_tags_str else []
             expressible_meanings.append(
-                ExpressibleMeaning(meaning_id=int(meaning_id), tags=tags, recipes=recipes)
+                ExpressibleMeaning(
+                    meaning_id=int(meaning_id), tags={id_to_tag[tag_id] for tag_id in tag_ids},
+                    tag_mask=Grammar.tag_mask_for_tag_ids(tag_ids=tag_ids), recipes=recipes,
+                    recipes_are_trie_keys=bool(self.trie), min_length=min_length, max_length=max_length
+                )
             )
+        f.close()
         expressible_meanings.sort(key=lambda em: em.id)
         return expressible_meanings
 
+    def _load_expressible_meanings_memory_mapped(self, expressible_meanings_file_location):
+        """Memory-map a set of constructed expressible meanings from file, without decoding their recipes.
+
+        Only the ID and tags of each expressible meaning are parsed here; for the recipes field of each
+        line, which is where nearly all the bytes in a large .meanings file live, we merely record its start
+        and end offsets in the mapped file, so that it can be decoded if and when the meaning is selected.
+        """
+        if self.verbosity > 0:
+            print "Memory-mapping expressible meanings..."
+        try:
+            f = open(expressible_meanings_file_location, 'rb')
+        except IOError:
+            raise Exception(
+                "Cannot load expressible meanings -- there is no file located at '{filepath}'".format(
+                    filepath=expressible_meanings_file_location
+                )
+            )
+        if content_file_compression(content_file_location=expressible_meanings_file_location) is not None:
+            f.close()
+            raise Exception(
+                "Cannot memory-map the expressible meanings at '{filepath}', since the file is compressed".format(
+                    filepath=expressible_meanings_file_location
+                )
+            )
+        # Note: the mapping stays valid after the file object itself is closed
+        expressible_meanings_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+        expressible_meanings = []
+        # The offset table: for the expressible meaning with ID i, its recipes field spans the bytes
+        # [recipes_field_offsets[2*i], recipes_field_offsets[2*i+1]) in the mapped file; this relies on
+        # Reductionist writing out expressible meanings in order of their IDs, which it does
+        recipes_field_offsets = array.array('L')
+        id_to_tag = self.grammar.id_to_tag
+        file_length = len(expressible_meanings_map)
+        line_start = 0
+        while line_start < file_length:
+            line_end = expressible_meanings_map.find('\n', line_start)
+            if line_end == -1:  # The last line in the file may not have a trailing newline
+                line_end = file_length
+            first_tab = expressible_meanings_map.find('\t', line_start, line_end)
+            last_tab = expressible_meanings_map.rfind('\t', line_start, line_end)
+            meaning_id = int(expressible_meanings_map[line_start:first_tab])
+            all_tags_str = expressible_meanings_map[last_tab+1:line_end]
+            tag_ids = all_tags_str.split(',') if all_tags_str else []
+            min_length, max_length = self._saved_length_bounds_for_expressible_meaning(meaning_id=meaning_id)
+            expressible_meanings.append(
+                ExpressibleMeaning(
+                    meaning_id=meaning_id, tags={id_to_tag[tag_id] for tag_id in tag_ids},
+                    tag_mask=Grammar.tag_mask_for_tag_ids(tag_ids=tag_ids), recipes=None,
+                    min_length=min_length, max_length=max_length
+                )
+            )
+            recipes_field_offsets.append(first_tab+1)
+            recipes_field_offsets.append(last_tab)
+            line_start = line_end + 1
+        self._expressible_meanings_map = expressible_meanings_map
+        self._recipes_field_offsets = recipes_field_offsets
+        return expressible_meanings
+
+    def _saved_length_bounds_for_expressible_meaning(self, meaning_id):
+        """Return a tuple (minimum length, maximum length) for the outputs of the expressible meaning with the given
+        ID, as saved by Reductionist in the grammar file, or (None, None) if the bundle predates these bounds.
+        """
+        length_bounds = self.grammar.expressible_meaning_length_bounds
+        if length_bounds is None:
+            return None, None
+        min_length, max_length = length_bounds[meaning_id]
+        return min_length, max_length
+
+    def _parse_recipes_field(self, all_paths_str):
+        """Parse the recipes field of a line in a .meanings file to return a list of grammar paths (or, if this
+        bundle has a trie, a list of the trie keys for those paths).
+        """
+        if self.trie:
+            # Note: Reductionist delimits trie keys using the same separator that it uses for expanded paths
+            return [int(path_trie_key) for path_trie_key in all_paths_str.split('|')]
+        grammar_paths = []
+        for path_str in all_paths_str.split('|'):
+            # An empty path string denotes a path that doesn't pass through any semantically meaningful rules
+            grammar_paths.append(array.array('I', [int(rule_id) for rule_id in path_str.split(',')] if path_str else []))
+        return grammar_paths
+
+    def _recipes_for_expressible_meaning(self, expressible_meaning):
+        """Return the recipes for the given expressible meaning, decoding them from the memory-mapped
+        expressible-meanings file if they haven't been decoded already (or have since been evicted from the cache).
+        """
+        if expressible_meaning.recipes is not None:  # Loaded eagerly
+            return expressible_meaning.recipes
+        recipes = self._recipe_cache.get(expressible_meaning.id)
+        if recipes is None:
+            recipes_field_start = self._recipes_field_offsets[2*expressible_meaning.id]
+            recipes_field_end = self._recipes_field_offsets[2*expressible_meaning.id+1]
+            recipes = expressible_meaning.build_recipes(
+                recipes=self._parse_recipes_field(
+                    all_paths_str=self._expressible_meanings_map[recipes_field_start:recipes_field_end]
+                ),
+                recipes_are_trie_keys=bool(self.trie)
+            )
+            self._recipe_cache.put(expressible_meaning.id, recipes)
+        return recipes
+
     def save_repetition_penalties_file(self):
-        """Save a serialized version of the repetition-penalties dictionary, for use in any subsequent
-        generation instances.
+        """Checkpoint the current repetition penalties to file, for use in any subsequent generation instances."""
+        self.repetition_penalties.save(repetitions_file_location=self._repetitions_file_location)
+        self._last_repetition_penalties_checkpoint_time = time.time()
+
+    def adopt_repetition_penalties(self, productionist):
+        """Carry over the repetition penalties of the given Productionist (e.g., one that was loaded for an
+        earlier build of this content bundle), and return the number of symbols whose penalties were carried over.
+
+        Since symbol indices may change from build to build, symbols are matched by name (and terminal symbols
+        by text); symbols that are new to this bundle keep their current penalties. Shared repetition penalties
+        are only seeded this way by the first worker process to carry them over, and only if no worker has
+        updated them yet, since after that they belong to every worker that is attached to them.
+        """
+        if self.repetition_penalties is None or productionist.repetition_penalties is None:
+            return 0
+        old_values = productionist.repetition_penalties.values
+        old_symbol_indices = {key: i for i, key in enumerate(productionist.grammar.symbol_keys())}
+        values = array.array('d', (self.repetition_penalties[i] for i in xrange(len(self.repetition_penalties))))
+        n_adopted = 0
+        for i, key in enumerate(self.grammar.symbol_keys()):
+            old_symbol_index = old_symbol_indices.get(key)
+            if old_symbol_index is not None:
+                values[i] = old_values[old_symbol_index]
+                n_adopted += 1
+        if isinstance(self.repetition_penalties, SharedRepetitionPenaltyStore):
+            return n_adopted if self.repetition_penalties.seed(values=values) else 0
+        self.repetition_penalties = RepetitionPenaltyStore(
+            n_symbols=len(values), bundle_content_hash=self.repetition_penalties.bundle_content_hash, values=values
+        )
+        return n_adopted
+
+    @staticmethod
+    def _compute_bundle_content_hash(grammar_file_location):
+        """Return a SHA-1 digest of the contents of the given grammar file.
+
+        Since repetition penalties are indexed by symbol, and the symbols of a content bundle are all
+        defined in its grammar file, this hash identifies the bundles that a repetitions file applies to.
         """
-        path_to_repetitions_file = '{content_bundle}.repetitions'.format(content_bundle=self.content_bundle)
-        repetitions_file = open(path_to_repetitions_file, 'wb')
-        pickle.dump(self.repetition_penalties, repetitions_file)
-        repetitions_file.close()
+        content_hash = hashlib.sha1()
+        with open(grammar_file_location, 'rb') as grammar_file:
+            for chunk in iter(lambda: grammar_file.read(1024*1024), ''):
+                content_hash.update(chunk)
+        return content_hash.digest()
 
     def furnish_example_terminal_expansion_of_nonterminal_symbol(self, nonterminal_symbol_name):
         """Furnish example text generated by terminally expanding the nonterminal symbol with the given name."""
@@ -208,39 +600,152 @@ class Productionist(object):
         # Return the content package
         return output
 
-    def fulfill_content_request(self, content_request):
-        """Satisfy the given content request."""
+    def enable_instrumentation(self, profile=False):
+        """Start collecting per-phase latencies and counters (and, if profile is True, a cProfile profile)
+        as content requests are fulfilled, and return the Instrumentation object that collects them.
+        """
+        self.instrumentation = Instrumentation(profile=profile)
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        """Stop collecting instrumentation (whatever has been collected so far is discarded)."""
+        if self.instrumentation is not None and self.instrumentation.profiler is not None:
+            self.instrumentation.profiler.disable()
+        self.instrumentation = None
+
+    def fulfill_content_request(self, content_request, update_repetition_penalties=True, update_dedup_window=True):
+        """Satisfy the given content request.
+
+        If update_repetition_penalties is False, the repetition penalties will not be updated to reflect
+        the generated output, and likewise, if update_dedup_window is False, the output will still be checked
+        against the applicable window of recently emitted outputs, but it won't be added to it (both are used
+        to pre-generate outputs, which only count as emitted once they are actually handed out; see
+        ContentPregenerator).
+        """
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return self._fulfill_content_request(
+                content_request=content_request, update_repetition_penalties=update_repetition_penalties,
+                update_dedup_window=update_dedup_window, instrumentation=None
+            )
+        # Make sure the request gets finished (and the profiler, if any, turned off) even if the request
+        # fails, since otherwise the profiler would stay installed and slow down everything that follows
+        instrumentation.start_request()
+        succeeded = False
+        try:
+            output = self._fulfill_content_request(
+                content_request=content_request, update_repetition_penalties=update_repetition_penalties,
+                update_dedup_window=update_dedup_window, instrumentation=instrumentation
+            )
+            succeeded = True
+        finally:
+            instrumentation.finish_request(succeeded=succeeded)
+        return output
+
+    def _fulfill_content_request(self, content_request, update_repetition_penalties, update_dedup_window,
+                                 instrumentation):
+        """Satisfy the given content request, timing its phases using the given Instrumentation object (if
+        it's not None).
+        """
         # Find all of the expressible meanings that are satisficing, given the content request
         satisficing_expressible_meanings = self._compile_satisficing_expressible_meanings(
             content_request=content_request
         )
+        if instrumentation is not None:
+            instrumentation.lap(phase='compile_satisficing_expressible_meanings')
+            instrumentation.increment(counter='expressible_meanings_scanned', n=len(self.expressible_meanings))
+            instrumentation.increment(counter='satisficing_expressible_meanings', n=len(satisficing_expressible_meanings))
         # If there's no satisficing content requests, throw an error
         assert satisficing_expressible_meanings, (
             "Error: The submitted content request cannot be fulfilled by using this grammar."
         )
-        # Select one of these to target for generation, either randomly or by using the scoring metric
-        # given in the content request
-        selected_expressible_meaning = self._select_expressible_meaning(
-            candidates=satisficing_expressible_meanings, scoring_metric=content_request.scoring_metric
-        )
-        # Select one of the grammar paths associated with this expressible meaning
-        selected_recipe = self._select_recipe_for_expressible_meaning(
-            expressible_meaning=selected_expressible_meaning
-        )
-        # Execute that grammar path to produce the generated content satisfying the content request
-        generated_text = self._follow_recipe(recipe=selected_recipe)
+        # If applicable, grab the window of recently emitted outputs that we'll check this output against
+        dedup_window = self._dedup_window_for_content_request(content_request=content_request)
+        attempt = 0
+        while True:
+            # Select one of these to target for generation, either randomly or by using the scoring metric
+            # given in the content request
+            selected_expressible_meaning = self._select_expressible_meaning(
+                candidates=satisficing_expressible_meanings, scoring_metric=content_request.scoring_metric
+            )
+            if instrumentation is not None:
+                instrumentation.lap(phase='select_expressible_meaning')
+            # Select one of the grammar paths associated with this expressible meaning (that can produce content
+            # of a fitting length, if the request specifies a length budget)
+            selected_recipe = self._select_recipe_for_expressible_meaning(
+                expressible_meaning=selected_expressible_meaning, min_length=content_request.min_length,
+                max_length=content_request.max_length
+            )
+            if instrumentation is not None:
+                instrumentation.lap(phase='select_recipe_for_expressible_meaning')
+            # Execute that grammar path to produce the generated content satisfying the content request
+            generated_text = self._follow_recipe(
+                recipe=selected_recipe, min_length=content_request.min_length, max_length=content_request.max_length
+            )
+            if instrumentation is not None:
+                instrumentation.lap(phase='follow_recipe')
+                instrumentation.record_expansion(
+                    explicit_path_taken=self.explicit_path_taken,
+                    n_recipe_rules=len(self._restore_recipe_path(recipe=selected_recipe))
+                )
+            if dedup_window is None:
+                break
+            # Reject the text if it duplicates a recently emitted output (unless we're out of retries); note
+            # that since repetition penalties only get updated when we package up an output, a rejected text
+            # has no effect on them
+            self.dedup_checks += 1
+            if generated_text not in dedup_window:
+                break
+            self.dedup_rejections += 1
+            if attempt == self.dedup_max_retries:
+                self.dedup_retries_exhausted += 1
+                break
+            attempt += 1
+            if self.verbosity > 0:
+                print "Rejected a duplicate of a recently emitted output -- retrying..."
+        if dedup_window is not None and update_dedup_window:
+            dedup_window.add(generated_text)
         # Package that up with all the associated metadata
-        output = self._build_content_package(generated_text=generated_text, content_request=content_request)
+        output = self._build_content_package(
+            generated_text=generated_text, content_request=content_request,
+            update_repetition_penalties=update_repetition_penalties
+        )
+        if instrumentation is not None:
+            instrumentation.lap(phase='build_content_package')
         # Return the package
         return output
 
-    def _build_content_package(self, generated_text, targeted_symbol=None, selected_recipe=None, content_request=None):
+    def _dedup_window_for_content_request(self, content_request):
+        """Return the window of recently emitted outputs that applies to the given content request, or None
+        if deduplication is not engaged.
+        """
+        if not self.dedup_window_size:
+            return None
+        dedup_window = self._dedup_windows.get(content_request.speaker)
+        if dedup_window is None:
+            dedup_window = RecentOutputFilter(window_size=self.dedup_window_size)
+            self._dedup_windows.put(content_request.speaker, dedup_window)
+        return dedup_window
+
+    def dedup_metrics(self):
+        """Return a dictionary reporting on the rejection of outputs that duplicated recently emitted ones."""
+        return {
+            'checks': self.dedup_checks,
+            'rejections': self.dedup_rejections,
+            'retries_exhausted': self.dedup_retries_exhausted,
+            'reject_rate': float(self.dedup_rejections) / self.dedup_checks if self.dedup_checks else 0.0,
+        }
+
+    def _build_content_package(self, generated_text, targeted_symbol=None, selected_recipe=None, content_request=None,
+                               update_repetition_penalties=True):
         """Furnish an object that packaged the generated text with its accumulated tags and other metadata."""
         # Collect all the tags attached to the symbols along the path we took -- these are the
-        # tags that will come bundled with the generated content
-        tags = set()
+        # tags that will come bundled with the generated content; we accumulate them as a bitmask
+        # (see Grammar.tag_mask_for_tags()), which only gets turned into a set of tag strings if and
+        # when somebody reads Output.tags
+        tag_mask = 0
         for production_rule in self.explicit_path_taken:
-            tags |= set(production_rule.tags)
+            tag_mask |= production_rule.tag_mask
         # Produce a bracketed expression specifying the specific path through the grammar that
         # produced this generated content (useful for debugging/authoring purposes); first, we'll
         # need to save a copy of the explicit path that we took through the grammar, since this
@@ -253,7 +758,8 @@ class Productionist(object):
         # Instantiate an Output object
         output = Output(
             text=generated_text,
-            tags=tags,
+            tag_mask=tag_mask,
+            tags_for_tag_ids=self.grammar.tags_for_tag_ids,
             recipe=selected_recipe,
             explicit_grammar_path_taken=explicit_path_taken,
             bracketed_expression=bracketed_expression
@@ -261,17 +767,37 @@ class Productionist(object):
         # If repetition-penalty mode is engaged, penalize all the rules that we executed to produce
         # that content (so that they will be less likely to be used again) and decay the penalties
         # for all the other production rules in the grammar that we didn't execute this time around
-        if self.repetition_penalty_mode:
+        if self.repetition_penalty_mode and update_repetition_penalties:
             self._update_repetition_penalties(explicit_path_taken=explicit_path_taken)
         # Lastly, if this content is meant to fulfill a content request, check to make sure that it does so
         if content_request:
+            must_have_mask, must_not_have_mask = self._tag_masks_for_content_request(content_request=content_request)
             content_fulfills_the_request = (
-                not (output.tags & content_request.must_not_have) and
-                output.tags.issuperset(content_request.must_have)
+                must_have_mask is not None and
+                not (tag_mask & must_not_have_mask) and
+                tag_mask & must_have_mask == must_have_mask and
+                (content_request.max_length is None or len(generated_text) <= content_request.max_length)
             )
             assert content_fulfills_the_request, "The generated content unit does not satisfy the content request."
         return output
 
+    def _tag_masks_for_content_request(self, content_request):
+        """Return a tuple (must-have mask, must-not-have mask) of tag bitmasks for the given content request.
+
+        If the request's must-have tags include one that isn't in this grammar, no content can satisfy it,
+        which is signaled by a must-have mask of None; must-not-have tags that aren't in this grammar can
+        simply be ignored.
+        """
+        tag_masks = self.grammar.tag_masks
+        try:
+            must_have_mask = self.grammar.tag_mask_for_tags(tags=content_request.must_have)
+        except KeyError:
+            must_have_mask = None
+        must_not_have_mask = 0
+        for tag in content_request.must_not_have:
+            must_not_have_mask |= tag_masks.get(tag, 0)
+        return must_have_mask, must_not_have_mask
+
     def _compile_satisficing_expressible_meanings(self, content_request):
         """Compile all satisficing expressible meanings that are satisficing.
 
@@ -279,10 +805,21 @@ class Productionist(object):
         'must not have' tags and all of the 'must have' tags that are specified in the
         content request.
         """
+        must_have_mask, must_not_have_mask = self._tag_masks_for_content_request(content_request=content_request)
+        if must_have_mask is None:
+            return []
         satisficing_expressible_meanings = [
             em for em in self.expressible_meanings if
-            not (em.tags & content_request.must_not_have) and em.tags.issuperset(content_request.must_have)
+            not (em.tag_mask & must_not_have_mask) and em.tag_mask & must_have_mask == must_have_mask
         ]
+        # If the request specifies a length budget, prune the meanings that cannot produce content of a fitting length
+        if content_request.min_length is not None or content_request.max_length is not None:
+            satisficing_expressible_meanings = [
+                em for em in satisficing_expressible_meanings if self._length_bounds_fit_length_budget(
+                    length_bounds=self._length_bounds_for_expressible_meaning(expressible_meaning=em),
+                    min_length=content_request.min_length, max_length=content_request.max_length
+                )
+            ]
         # Make sure none of these have condition tags that are currently violated
         return satisficing_expressible_meanings
 
@@ -334,19 +871,51 @@ class Productionist(object):
                 score += weight
         return score
 
-    def _select_recipe_for_expressible_meaning(self, expressible_meaning):
-        """Select one of the grammar paths associated with the given expressible meaning."""
-        if self.verbosity > 0:
-            if len(expressible_meaning.recipes) == 1:
-                print "Selecting EM{em_id}'s sole recipe...".format(
-                    em_id=self.expressible_meanings.index(expressible_meaning)
+    def _select_recipe_for_expressible_meaning(self, expressible_meaning, min_length=None, max_length=None):
+        """Select one of the grammar paths associated with the given expressible meaning.
+
+        If a minimum or maximum length is given, only the recipes that can produce content of a fitting length
+        are candidates.
+        """
+        length_budget = min_length is not None or max_length is not None
+        if self.factored_meaning_index is not None:
+            # The recipes for this meaning aren't enumerated, so we sample one of them (uniformly) from the
+            # factored index; note that this means they don't get scored by repetition penalties, though
+            # the wildcard rules used to follow the sampled recipe still do
+            if self.verbosity > 0:
+                print "Sampling one of EM{em_id}'s {n} recipes...".format(
+                    em_id=expressible_meaning.id,
+                    n=self.factored_meaning_index.count_paths(tags=expressible_meaning.tags)
+                )
+            # If there's a length budget, we keep sampling until we get a recipe that can produce content of a
+            # fitting length (up to a point)
+            for _ in xrange(LENGTH_BOUNDED_RECIPE_SAMPLING_ATTEMPTS if length_budget else 1):
+                recipe = Recipe(
+                    recipe_id=None, expressible_meaning=expressible_meaning,
+                    grammar_path=self.factored_meaning_index.sample_path(tags=expressible_meaning.tags)
+                )
+                if not length_budget or self._length_bounds_fit_length_budget(
+                    length_bounds=self._length_bounds_for_recipe(recipe=recipe), min_length=min_length,
+                    max_length=max_length
+                ):
+                    return recipe
+            raise AssertionError(
+                "Error: No sampled recipe for EM{em_id} can produce content of the requested length.".format(
+                    em_id=expressible_meaning.id
                 )
+            )
+        candidates = self._recipes_for_expressible_meaning(expressible_meaning=expressible_meaning)
+        if length_budget:
+            candidates = self._recipes_fitting_length_budget(
+                recipes=candidates, min_length=min_length, max_length=max_length
+            )
+        if self.verbosity > 0:
+            if len(candidates) == 1:
+                print "Selecting EM{em_id}'s sole recipe...".format(em_id=expressible_meaning.id)
             else:
                 print "Selecting one of EM{em_id}'s {n} recipes...".format(
-                    em_id=self.expressible_meanings.index(expressible_meaning),
-                    n=len(expressible_meaning.recipes)
+                    em_id=expressible_meaning.id, n=len(candidates)
                 )
-        candidates = expressible_meaning.recipes
         # If there's only one option, we can just select that right off and move on
         if len(candidates) == 1:
             selected_recipe = candidates[0]
@@ -380,6 +949,11 @@ class Productionist(object):
         # doesn't pass through any symbols with tags; in this case, Productionist can just select
         # between production rules that are not semantically meaningful until it's ground out into
         # a terminal expansion
+        # Since every candidate recipe gets scored each time its expressible meaning is selected, a recipe
+        # held as a trie key keeps its path once it has been restored for scoring (restoring the candidates
+        # anew through the bounded cache would churn it whenever a meaning has more recipes than it holds)
+        if recipe.path is None:
+            recipe.path = self._restore_recipe_path(recipe=recipe)
         path = [self.grammar.production_rules[rule_id] for rule_id in recipe.path]
         score = sum(self._score_candidate_production_rule(rule) for rule in path)
         return score
@@ -394,10 +968,12 @@ class Productionist(object):
         """
         score = 1.0
         # If applicable, adjust score according to repetition penalties and terseness
-        for symbol in production_rule.body:
-            if self.repetition_penalty_mode:
-                score *= self.repetition_penalties[str(symbol)]
-            if self.terse_mode:
+        if self.repetition_penalty_mode:
+            repetition_penalties = self.repetition_penalties.values
+            for symbol_index in production_rule.body_symbol_indices:
+                score *= repetition_penalties[symbol_index]
+        if self.terse_mode:
+            for symbol in production_rule.body:
                 if type(symbol) == unicode:
                     score /= len(symbol)
                 else:
@@ -410,21 +986,127 @@ class Productionist(object):
         score *= production_rule.frequency_score_multiplier
         return score
 
-    def _follow_recipe(self, recipe):
-        """Follow the given recipe to generate the desired text content."""
+    @staticmethod
+    def _length_bounds_fit_length_budget(length_bounds, min_length, max_length):
+        """Return whether content whose length falls within the given bounds, a tuple (minimum length, maximum
+        length), could fit the given length budget (where either end of the budget may be None).
+
+        Bounds of (None, None) are unknown, in which case the content is presumed to possibly fit.
+        """
+        bounds_min_length, bounds_max_length = length_bounds
+        if bounds_min_length is None:
+            return True
+        return (
+            (max_length is None or bounds_min_length <= max_length) and
+            (min_length is None or bounds_max_length >= min_length)
+        )
+
+    def _length_bounds_for_expressible_meaning(self, expressible_meaning):
+        """Return a tuple (minimum length, maximum length) for the outputs that can express the given meaning.
+
+        Reductionist includes these bounds in the .grammar file; for older bundles, they're computed from the
+        meaning's recipes the first time they're needed. For an older bundle with a factored index, they're
+        unknown, which is signaled by (None, None).
+        """
+        if expressible_meaning.min_length is None and self.factored_meaning_index is None:
+            recipe_length_bounds = [
+                self._length_bounds_for_recipe(recipe=recipe)
+                for recipe in self._recipes_for_expressible_meaning(expressible_meaning=expressible_meaning)
+            ]
+            expressible_meaning.min_length = min(bounds[0] for bounds in recipe_length_bounds)
+            expressible_meaning.max_length = max(bounds[1] for bounds in recipe_length_bounds)
+        return expressible_meaning.min_length, expressible_meaning.max_length
+
+    def _length_bounds_for_recipe(self, recipe):
+        """Return a tuple (minimum length, maximum length) for the outputs that can be generated by following the
+        given recipe (computing these the first time they're needed).
+        """
+        if recipe.min_length is None:
+            recipe.min_length, recipe.max_length = self._length_bounds_for_recipe_path(
+                path=[self.grammar.production_rules[rule_id] for rule_id in self._restore_recipe_path(recipe=recipe)]
+            )
+        return recipe.min_length, recipe.max_length
+
+    def _recipes_fitting_length_budget(self, recipes, min_length, max_length):
+        """Return the given recipes that can produce content fitting the given length budget.
+
+        Since the lengths between a recipe's bounds aren't necessarily all attainable, it may be that an
+        expressible meaning whose bounds fit a budget with both a minimum and a maximum has no recipe that
+        does; in this case, the maximum length takes precedence, and every recipe that can fit it is returned.
+        """
+        fitting_recipes = [
+            recipe for recipe in recipes if self._length_bounds_fit_length_budget(
+                length_bounds=self._length_bounds_for_recipe(recipe=recipe), min_length=min_length,
+                max_length=max_length
+            )
+        ]
+        if not fitting_recipes and min_length is not None:
+            fitting_recipes = [
+                recipe for recipe in recipes if self._length_bounds_fit_length_budget(
+                    length_bounds=self._length_bounds_for_recipe(recipe=recipe), min_length=None,
+                    max_length=max_length
+                )
+            ]
+        return fitting_recipes
+
+    def _length_bounds_for_recipe_path(self, path, body_length_bounds=None):
+        """Return a tuple (minimum length, maximum length) for the outputs that can be generated by following the
+        given grammar path (a list of production rules) from the start symbol.
+
+        This mirrors the way that a recipe is followed: a symbol that heads the next rule on the path is expanded
+        using that rule, and any other symbol is expanded using one of its wildcard rules (whose length bounds
+        are held in its targeting wildcard table). If a list is given for body_length_bounds, a list holding the
+        length bounds of each nonterminal symbol in the body of each rule on the path (i.e., the lengths that
+        the symbol can contribute when the recipe is followed) is appended to it, in path order.
+        """
+        remaining_path = collections.deque(path)
+
+        def length_bounds_for_symbol(symbol):
+            """Return a tuple (minimum length, maximum length) for the expansions of the given symbol."""
+            if not remaining_path or remaining_path[0].head is not symbol:
+                return symbol.targeting_wildcard_table.min_length, symbol.targeting_wildcard_table.max_length
+            rule = remaining_path.popleft()
+            length_bounds_for_body_symbols = []
+            if body_length_bounds is not None:
+                body_length_bounds.append(length_bounds_for_body_symbols)
+            min_length = max_length = len(rule.expansion_plan_tail)
+            for terminal_run, body_symbol in rule.expansion_plan:
+                symbol_min_length, symbol_max_length = length_bounds_for_symbol(body_symbol)
+                length_bounds_for_body_symbols.append((symbol_min_length, symbol_max_length))
+                min_length += len(terminal_run) + symbol_min_length
+                max_length += len(terminal_run) + symbol_max_length
+            return min_length, max_length
+
+        return length_bounds_for_symbol(self.grammar.start_symbol)
+
+    def _follow_recipe(self, recipe, min_length=None, max_length=None):
+        """Follow the given recipe to generate the desired text content.
+
+        If a minimum or maximum length is given, every wildcard rule is selected from among those that can
+        still produce content of a fitting length (see
+        self._terminally_expand_nonterminal_symbol_within_length_bounds()).
+        """
         # Ground out the rule references in the recipe to form a list of actual ProductionRule
         # objects; note: if this is an empty list, that means that the selected path is one that
         # doesn't pass through any symbols with tags; in this case, Productionist can just randomly
         # select production rules that are not semantically meaningful until it's ground out into
         # a terminal expansion
-        path = [self.grammar.production_rules[rule_id] for rule_id in recipe.path]
+        path = [self.grammar.production_rules[rule_id] for rule_id in self._restore_recipe_path(recipe=recipe)]
         # Keep this list handy as the list of remaining rules to execute -- we'll
-        # be consuming this as we proceed
-        self.remaining_path = list(path)
+        # be consuming this as we proceed (from the front, hence the deque)
+        self.remaining_path = collections.deque(path)
         # Keep track of all the rules we ended up firing for this path, including our choices
         # for wildcards -- we'll use this later to generate a bracketed expression specifying
         # how exactly the content unit was generated (for debugging/authoring purposes)
         self.explicit_path_taken = []
+        if min_length is not None or max_length is not None:
+            body_length_bounds = []
+            self._length_bounds_for_recipe_path(path=path, body_length_bounds=body_length_bounds)
+            self.remaining_path_body_length_bounds = collections.deque(body_length_bounds)
+            return self._terminally_expand_nonterminal_symbol_within_length_bounds(
+                nonterminal_symbol=self.grammar.start_symbol, min_length=min_length or 0,
+                max_length=max_length if max_length is not None else sys.maxint
+            )
         # Execute the rules on the selected path in order to produce content expressing the
         # desired semantics, which are specifically the tags associated with the targeted
         # expressible meaning; this can be done by simply targeting the grammar's
@@ -435,16 +1117,36 @@ class Productionist(object):
         )
         return text
 
+    def _restore_recipe_path(self, recipe):
+        """Return the grammar path for the given recipe, as a list of production-rule IDs.
+
+        If this bundle has a trie, the recipe will only hold the trie key for its path, in which case we
+        restore the path from the (memory-mapped) trie, consulting the cache of recently restored paths first
+        (unless the recipe has held onto its path since being scored; see self._score_candidate_recipe()).
+        """
+        if recipe.path is not None:
+            return recipe.path
+        path = self._restored_path_cache.get(recipe.trie_key)
+        if path is None:
+            path_string = self.trie.restore_key(recipe.trie_key)
+            # An empty path string denotes a path that doesn't pass through any semantically meaningful rules
+            path = array.array('I', [int(rule_id) for rule_id in path_string.split(',')] if path_string else [])
+            self._restored_path_cache.put(recipe.trie_key, path)
+        return path
+
     def _terminally_expand_nonterminal_symbol(self, nonterminal_symbol, n_tabs_for_debug):
         """Terminally expand the given symbol."""
-        if self.verbosity > 1:
-            print "{whitespace}Expanding nonterminal symbol [[{symbol_name}]]...".format(
-                whitespace='  ' * n_tabs_for_debug,
-                symbol_name=nonterminal_symbol.name
-            )
-        # Select a production rule
-        if self.remaining_path and self.remaining_path[0] in nonterminal_symbol.production_rules:
-            next_rule = self.remaining_path.pop(0)
+        if self.verbosity < 2:
+            # Nothing is to be printed out, so we can use the leaner variant of the expansion engine
+            return self._terminally_expand_nonterminal_symbol_quietly(nonterminal_symbol=nonterminal_symbol)
+        print "{whitespace}Expanding nonterminal symbol [[{symbol_name}]]...".format(
+            whitespace='  ' * n_tabs_for_debug,
+            symbol_name=nonterminal_symbol.name
+        )
+        # Select a production rule (note: a rule is one of a symbol's production rules if and only if
+        # that symbol is the rule's head)
+        if self.remaining_path and self.remaining_path[0].head is nonterminal_symbol:
+            next_rule = self.remaining_path.popleft()
         else:
             if self.verbosity > 1:
                 print "{whitespace}Selecting wildcard rule...".format(whitespace='  ' * n_tabs_for_debug)
@@ -456,67 +1158,222 @@ class Productionist(object):
 
         A "wildcard rule" is one that is not marked as being semantically meaningful, and is thus not
         included on the targeted path (stored as the 'remaining_path' attribute).
+
+        This works over the decision tables precomputed by self.build_wildcard_decision_tables(), which
+        allows a selection to be made without building up any new data structures.
         """
         if self.targeting_meaning:
-            candidate_wildcard_rules = [r for r in nonterminal_symbol.production_rules if not r.semantically_meaningful]
+            table = nonterminal_symbol.targeting_wildcard_table
         else:
-            candidate_wildcard_rules = list(nonterminal_symbol.production_rules)
+            table = nonterminal_symbol.nontargeting_wildcard_table
+        candidate_wildcard_rules = table.rules
         # If there's only choice, we can just select that and move on
         if len(candidate_wildcard_rules) == 1:
-            selected_wildcard_rule = candidate_wildcard_rules[0]
-        elif not self.scoring_modes_engaged:
+            return candidate_wildcard_rules[0]
+        if not candidate_wildcard_rules:
+            # There are no available production rules associated with this nonterminal symbol; this is an
+            # authoring error, so let's report back accordingly
+            raise Exception(
+                "AuthoringError: The nonterminal symbol {symbol_name}".format(symbol_name=nonterminal_symbol.name) +
+                " has no available wildcard rules, which means it cannot be expanded."
+            )
+        if self._wildcard_selection_mode == 'uniform':
             # If no scoring mode is engaged, we can simply randomly select a wildcard rule
-            try:
-                selected_wildcard_rule = random.choice(candidate_wildcard_rules)
-            except IndexError:
-                # There are no available production rules associated with this nonterminal symbol; this is an
-                # authoring error, so let's report back accordingly
-                raise Exception(
-                    "AuthoringError: The nonterminal symbol {symbol_name}".format(symbol_name=nonterminal_symbol.name) +
-                    " has no available wildcard rules, which means it cannot be expanded."
-                )
-        else:
-            # Otherwise, we need to compute a utility distribution over the candidate wildcard rules
-            scores = {}
-            for rule in candidate_wildcard_rules:
-                scores[rule] = self._score_candidate_production_rule(production_rule=rule)
-            # Check if any candidate even earned any points; if not, we can just pick randomly
-            if not any(scores.values()):
-                selected_wildcard_rule = random.choice(candidate_wildcard_rules)
-            else:
-                # Next, fit a probability distribution to the utility distribution
-                probability_ranges = self._fit_probability_distribution_to_decision_candidates(scores=scores)
-                # Finally, select a wildcard rule (using the probability distribution, if probabilistic mode is engaged)
-                selected_wildcard_rule = self._select_candidate_given_probability_distribution(
-                    probability_ranges=probability_ranges
-                )
-        return selected_wildcard_rule
+            return random.choice(candidate_wildcard_rules)
+        if self._wildcard_selection_mode == 'static':
+            # The scores for the candidates never change, so we can select using the precomputed weights
+            if not table.total_static_weight:
+                # No candidate even earned any points, so we can just pick randomly
+                return random.choice(candidate_wildcard_rules)
+            if not self.probabilistic_mode:
+                return table.highest_static_weight_rule
+            return candidate_wildcard_rules[table.sample_index(
+                cumulative_weights=table.cumulative_static_weights, total_weight=table.total_static_weight
+            )]
+        # Otherwise, the scores for the candidates depend on the current repetition penalties, so we need to
+        # compute them now; we do so by scaling each candidate's static weight by the penalties for the symbols
+        # in its body, and accumulating the results into the table's (reused) cumulative-weights list
+        repetition_penalties = self.repetition_penalties.values
+        static_weights = table.static_weights
+        penalty_indices = table.penalty_indices
+        cumulative_weights = table.cumulative_weights
+        total_weight = 0.0
+        highest_weight = -1.0
+        highest_weight_index = 0
+        for i in xrange(len(candidate_wildcard_rules)):
+            weight = static_weights[i]
+            for symbol_index in penalty_indices[i]:
+                weight *= repetition_penalties[symbol_index]
+            if weight > highest_weight:
+                highest_weight = weight
+                highest_weight_index = i
+            total_weight += weight
+            cumulative_weights[i] = total_weight
+        if not total_weight:
+            # No candidate even earned any points, so we can just pick randomly
+            return random.choice(candidate_wildcard_rules)
+        if not self.probabilistic_mode:
+            return candidate_wildcard_rules[highest_weight_index]
+        return candidate_wildcard_rules[table.sample_index(
+            cumulative_weights=cumulative_weights, total_weight=total_weight
+        )]
 
     def _execute_production_rule(self, rule, n_tabs_for_debug):
         """Execute the given production rule."""
-        if self.verbosity > 1:
-            print "{whitespace}Using production rule #{rule_id}: '{rule_spec}'".format(
-                whitespace='  '*n_tabs_for_debug,
-                rule_id=rule.id,
-                rule_spec=str(rule)
-            )
+        if self.verbosity < 2:
+            # Nothing is to be printed out, so we can use the leaner variant of the expansion engine
+            return self._execute_production_rule_quietly(rule=rule)
+        print "{whitespace}Using production rule #{rule_id}: '{rule_spec}'".format(
+            whitespace='  '*n_tabs_for_debug,
+            rule_id=rule.id,
+            rule_spec=str(rule)
+        )
         # Add to our record of the explicit path we took the grammar to produce the
         # content we'll be sending back
         self.explicit_path_taken.append(rule)
-        # Terminally expand this symbol
+        # Terminally expand this symbol by working through its expansion plan, which interleaves runs
+        # of terminal symbols (already joined together) with the nonterminal symbols that we must expand
         terminally_expanded_symbols_in_this_rule_body = []
-        for symbol in rule.body:
-            if type(symbol) == unicode:  # Terminal symbol (no need to expand)
-                terminally_expanded_symbols_in_this_rule_body.append(symbol)
-            else:  # Nonterminal symbol, which means we have to expand it
-                terminal_expansion_of_that_symbol = self._terminally_expand_nonterminal_symbol(
-                    nonterminal_symbol=symbol, n_tabs_for_debug=n_tabs_for_debug + 1
-                )
-                terminally_expanded_symbols_in_this_rule_body.append(terminal_expansion_of_that_symbol)
+        for terminal_run, symbol in rule.expansion_plan:
+            terminally_expanded_symbols_in_this_rule_body.append(terminal_run)
+            terminal_expansion_of_that_symbol = self._terminally_expand_nonterminal_symbol(
+                nonterminal_symbol=symbol, n_tabs_for_debug=n_tabs_for_debug + 1
+            )
+            terminally_expanded_symbols_in_this_rule_body.append(terminal_expansion_of_that_symbol)
+        terminally_expanded_symbols_in_this_rule_body.append(rule.expansion_plan_tail)
         # Concatenate the results and return that string
         expansion_yielded_by_this_rule = ''.join(terminally_expanded_symbols_in_this_rule_body)
         return expansion_yielded_by_this_rule
 
+    def _terminally_expand_nonterminal_symbol_quietly(self, nonterminal_symbol):
+        """Terminally expand the given symbol, without printing out any debug text.
+
+        This is the hot path of the expansion engine, which is used whenever verbosity is below 2.
+        """
+        remaining_path = self.remaining_path
+        if remaining_path and remaining_path[0].head is nonterminal_symbol:
+            next_rule = remaining_path.popleft()
+        else:
+            next_rule = self._select_wildcard_production_rule(nonterminal_symbol)
+        return self._execute_production_rule_quietly(next_rule)
+
+    def _execute_production_rule_quietly(self, rule):
+        """Execute the given production rule, without printing out any debug text."""
+        self.explicit_path_taken.append(rule)
+        expansion_plan = rule.expansion_plan
+        if not expansion_plan:  # The rule's body includes only terminal symbols, which have been joined already
+            return rule.expansion_plan_tail
+        expand = self._terminally_expand_nonterminal_symbol_quietly
+        fragments = []
+        for terminal_run, symbol in expansion_plan:
+            fragments.append(terminal_run)
+            fragments.append(expand(symbol))
+        fragments.append(rule.expansion_plan_tail)
+        return u''.join(fragments)
+
+    def _terminally_expand_nonterminal_symbol_within_length_bounds(self, nonterminal_symbol, min_length, max_length):
+        """Terminally expand the given symbol, producing content whose length falls within the given bounds.
+
+        This is the variant of the expansion engine that is used when a content request specifies a length
+        budget (no debug text is printed out). The rules on the remaining path are executed as usual, but each
+        wildcard rule is selected from among those whose length bounds fit the lengths that remain available
+        for the symbol being expanded. Since the minimum length of every symbol is attainable, the content is
+        guaranteed to fit the maximum length, so long as the recipe's minimum length does; the minimum length is
+        guaranteed as well, except when the lengths attainable by a symbol have a gap that straddles the lengths
+        that remain available for it, in which case the content may fall short.
+        """
+        remaining_path = self.remaining_path
+        if remaining_path and remaining_path[0].head is nonterminal_symbol:
+            next_rule = remaining_path.popleft()
+            body_length_bounds = self.remaining_path_body_length_bounds.popleft()
+        else:
+            next_rule = self._select_wildcard_production_rule_within_length_bounds(
+                nonterminal_symbol=nonterminal_symbol, min_length=min_length, max_length=max_length
+            )
+            # A wildcard rule has no semantically meaningful descendants, and so each symbol in its body may be
+            # expanded in any of the ways that it can be
+            body_length_bounds = [(symbol.min_length, symbol.max_length) for _, symbol in next_rule.expansion_plan]
+        self.explicit_path_taken.append(next_rule)
+        expansion_plan = next_rule.expansion_plan
+        if not expansion_plan:
+            return next_rule.expansion_plan_tail
+        # Work through the expansion plan, tracking the length of the content produced so far (counting all the
+        # rule's terminal symbols up front), along with the total minimum and maximum lengths of the symbols that
+        # are yet to be expanded; from these, we can determine the lengths that remain available for each symbol
+        length = len(next_rule.expansion_plan_tail) + sum(len(terminal_run) for terminal_run, _ in expansion_plan)
+        remaining_min_length = sum(bounds[0] for bounds in body_length_bounds)
+        remaining_max_length = sum(bounds[1] for bounds in body_length_bounds)
+        fragments = []
+        for i in xrange(len(expansion_plan)):
+            terminal_run, symbol = expansion_plan[i]
+            symbol_min_length, symbol_max_length = body_length_bounds[i]
+            remaining_min_length -= symbol_min_length
+            remaining_max_length -= symbol_max_length
+            fragments.append(terminal_run)
+            expansion = self._terminally_expand_nonterminal_symbol_within_length_bounds(
+                nonterminal_symbol=symbol, min_length=min_length - length - remaining_max_length,
+                max_length=max_length - length - remaining_min_length
+            )
+            fragments.append(expansion)
+            length += len(expansion)
+        fragments.append(next_rule.expansion_plan_tail)
+        return u''.join(fragments)
+
+    def _select_wildcard_production_rule_within_length_bounds(self, nonterminal_symbol, min_length, max_length):
+        """Select a wildcard production rule for expanding the given symbol into content whose length falls
+        within the given bounds.
+
+        If every candidate fits, the selection is made as usual (see self._select_wildcard_production_rule()).
+        Otherwise, the selection is made in the same way, but only among the candidates whose length bounds fit;
+        if none does (which can only happen due to a gap in the lengths attainable by the symbol), the maximum
+        length takes precedence, and the candidates that can fit it are used.
+        """
+        if self.targeting_meaning:
+            table = nonterminal_symbol.targeting_wildcard_table
+        else:
+            table = nonterminal_symbol.nontargeting_wildcard_table
+        if table.longest_min_length <= max_length and table.shortest_max_length >= min_length:
+            return self._select_wildcard_production_rule(nonterminal_symbol)
+        candidate_wildcard_rules = table.rules
+        fitting_indices = [
+            i for i, rule in enumerate(candidate_wildcard_rules) if
+            rule.min_length <= max_length and rule.max_length >= min_length
+        ]
+        if not fitting_indices:
+            fitting_indices = [
+                i for i, rule in enumerate(candidate_wildcard_rules) if rule.min_length <= max_length
+            ]
+        if len(fitting_indices) == 1:
+            return candidate_wildcard_rules[fitting_indices[0]]
+        if self._wildcard_selection_mode == 'uniform':
+            return candidate_wildcard_rules[random.choice(fitting_indices)]
+        # Otherwise, weight the fitting candidates just as self._select_wildcard_production_rule() weights all of
+        # them (note that the penalty indices are empty unless repetition-penalty mode is engaged)
+        repetition_penalties = self.repetition_penalties.values if self.repetition_penalties is not None else None
+        static_weights = table.static_weights
+        penalty_indices = table.penalty_indices
+        cumulative_weights = []
+        total_weight = 0.0
+        highest_weight = -1.0
+        highest_weight_index = fitting_indices[0]
+        for i in fitting_indices:
+            weight = static_weights[i]
+            for symbol_index in penalty_indices[i]:
+                weight *= repetition_penalties[symbol_index]
+            if weight > highest_weight:
+                highest_weight = weight
+                highest_weight_index = i
+            total_weight += weight
+            cumulative_weights.append(total_weight)
+        if not total_weight:
+            # No candidate even earned any points, so we can just pick randomly
+            return candidate_wildcard_rules[random.choice(fitting_indices)]
+        if not self.probabilistic_mode:
+            return candidate_wildcard_rules[highest_weight_index]
+        index = bisect.bisect_right(cumulative_weights, random.random() * total_weight)
+        # Guard against float rounding pushing us past the last candidate
+        return candidate_wildcard_rules[fitting_indices[min(index, len(fitting_indices) - 1)]]
+
     def _produce_bracketed_expression(self, symbol_to_start_from=None):
         """Produce a bracketed expression for a given grammar path.
 
@@ -586,14 +1443,23 @@ class Productionist(object):
         """
         symbols_used_this_time = set()
         for rule in explicit_path_taken:
-            for symbol in rule.body:
-                symbols_used_this_time.add(symbol)
-        for symbol in self.grammar.nonterminal_symbols+self.grammar.terminal_symbols:
-            if symbol in symbols_used_this_time:
-                self.repetition_penalties[str(symbol)] *= REPETITION_PENALTY_MULTIPLIER
-            else:
-                self.repetition_penalties[str(symbol)] *= REPETITION_PENALTY_RECOVERY_RATE
-            self.repetition_penalties[str(symbol)] = min(1.0, self.repetition_penalties[str(symbol)])
+            symbols_used_this_time.update(rule.body_symbol_indices)
+        self.repetition_penalties.update(
+            used_symbol_indices=symbols_used_this_time, multiplier=REPETITION_PENALTY_MULTIPLIER,
+            recovery_rate=REPETITION_PENALTY_RECOVERY_RATE
+        )
+        # If applicable, checkpoint the updated penalties; since a checkpoint is only a safeguard against losing
+        # updates in a crash, a failure to save one must not fail the request that happened to trigger it (we'll
+        # simply try again once the next checkpoint interval has elapsed)
+        if (self.persist_repetition_penalties and
+                time.time() - self._last_repetition_penalties_checkpoint_time >=
+                self.repetition_penalties_checkpoint_interval):
+            try:
+                self.save_repetition_penalties_file()
+            except (IOError, OSError) as error:
+                self._last_repetition_penalties_checkpoint_time = time.time()
+                if self.verbosity > 0:
+                    print "Could not checkpoint repetition penalties: {error}".format(error=error)
 
     @staticmethod
     def _fit_probability_distribution_to_decision_candidates(scores):
@@ -651,17 +1517,36 @@ class ExpressibleMeaning(object):
     and they are reified as objects of the class Recipe, defined below.
     """
 
-    def __init__(self, meaning_id, tags, recipes):
+    # Since a large content bundle may include a great many expressible meanings (and far more recipes),
+    # this class and the Recipe class use slots rather than per-object attribute dictionaries
+    __slots__ = ('id', 'tags', 'tag_mask', 'recipes', 'min_length', 'max_length')
+
+    def __init__(self, meaning_id, tags, recipes, tag_mask=0, recipes_are_trie_keys=False, min_length=None,
+                 max_length=None):
         """Initialize an ExpressibleMeaning object."""
         self.id = meaning_id
         # A set including all the tags associated with this expressible meaning; these can be thought
         # of as the semantics that are associated with all the paths through the grammar that this
         # expressible meaning indexes
         self.tags = tags
+        # The same tags, as a bitmask (see Grammar.tag_mask_for_tags()), which is what content requests
+        # get checked against
+        self.tag_mask = tag_mask
         # A list of the recipes for generating content that expresses the associated meaning; each is
         # represented as a compressed grammar path (i.e., one that, if its rules are executed in order,
-        # will produce the exact set of tags associated with this expressible meaning)
-        self.recipes = self._init_build_recipes(recipes=recipes)
+        # will produce the exact set of tags associated with this expressible meaning); if this is None,
+        # the expressible meaning was loaded in memory-mapped-meanings mode, in which case its recipes
+        # get built on demand by Productionist._recipes_for_expressible_meaning()
+        self.recipes = (
+            self.build_recipes(recipes=recipes, recipes_are_trie_keys=recipes_are_trie_keys)
+            if recipes is not None else None
+        )
+        # The minimum and maximum lengths (in characters) of the outputs that can be generated by following one
+        # of this meaning's recipes; these are included in the .grammar file by Reductionist, and otherwise
+        # they get set by Productionist._length_bounds_for_expressible_meaning() (for an older bundle with a
+        # factored index, whose recipes are never enumerated, they remain None)
+        self.min_length = min_length
+        self.max_length = max_length
 
     def __str__(self):
         """Return string representation."""
@@ -669,14 +1554,16 @@ class ExpressibleMeaning(object):
             ', '.join(self.tags)
         )
 
-    def _init_build_recipes(self, recipes):
+    def build_recipes(self, recipes, recipes_are_trie_keys=False):
         """Return a list of Recipe objects, each corresponding to one of the grammar paths associated with
-        this expressible meaning.
+        this expressible meaning (given either as lists of rule IDs or, if applicable, as trie keys).
         """
         recipe_objects = []
         for i in xrange(len(recipes)):
-            grammar_path = recipes[i]
-            recipe_objects.append(Recipe(recipe_id=i, expressible_meaning=self, grammar_path=grammar_path))
+            if recipes_are_trie_keys:
+                recipe_objects.append(Recipe(recipe_id=i, expressible_meaning=self, trie_key=recipes[i]))
+            else:
+                recipe_objects.append(Recipe(recipe_id=i, expressible_meaning=self, grammar_path=recipes[i]))
         recipe_objects.sort(key=lambda r: r.id)
         return recipe_objects
 
@@ -697,22 +1584,1435 @@ class Recipe(object):
     repetition penalties, author assigned application frequencies and usage constraints, etc.
     """
 
-    def __init__(self, recipe_id, expressible_meaning, grammar_path):
+    __slots__ = ('id', 'expressible_meaning', 'path', 'trie_key', 'min_length', 'max_length')
+
+    def __init__(self, recipe_id, expressible_meaning, grammar_path=None, trie_key=None):
         """Initialize a Recipe object."""
+        # Note: a recipe that was sampled from a factored index (see FactoredMeaningIndex) has no ID, since
+        # the recipes of such a bundle are never enumerated
         self.id = recipe_id
         self.expressible_meaning = expressible_meaning
-        self.name = '{meaning_id}-{recipe_id}'.format(meaning_id=expressible_meaning.id, recipe_id=self.id)
+        # The grammar path for this recipe, as an array of production-rule IDs; if the content bundle has
+        # a trie, this will be None, and we instead hold onto the trie key for the path, which Productionist
+        # only restores when the recipe is actually used (see Productionist._restore_recipe_path()); if a
+        # scoring mode is engaged, the restored path is kept here once the recipe has been scored, since
+        # every candidate recipe gets scored each time that its expressible meaning is selected
         self.path = grammar_path
+        self.trie_key = trie_key
+        # The minimum and maximum lengths (in characters) of the outputs that can be generated by following this
+        # recipe; these get set by Productionist._length_bounds_for_recipe() the first time they're needed
+        self.min_length = None
+        self.max_length = None
 
     def __str__(self):
         """Return string representation."""
         return "Recipe {name}".format(name=self.name)
 
+    @property
+    def name(self):
+        """Return the name of this recipe (built on demand, rather than stored, to save memory)."""
+        return '{meaning_id}-{recipe_id}'.format(meaning_id=self.expressible_meaning.id, recipe_id=self.id)
+
+
+class FactoredMeaningIndex(object):
+    """A factored index of the semantically meaningful paths through a grammar, from which the recipes for an
+    expressible meaning may be sampled without ever enumerating them.
+
+    The grammar itself (restricted to its semantically meaningful symbols and rules) forms an AND-OR DAG:
+    a symbol is an OR node, whose paths are those of its semantically meaningful rules (plus the empty path,
+    if any of its rules is not semantically meaningful), and a semantically meaningful rule is an AND node,
+    whose paths are formed by combining one path for each semantically meaningful symbol in its body. In a
+    '.dag' file, Reductionist annotates each of these nodes with its tag signatures, i.e., the tagsets of the
+    paths descending from it, along with the number of paths that yield each one. To sample a path with a
+    given signature, we walk down from the start symbol, choosing among a symbol's rules in proportion to
+    the number of paths that each yields with the target signature, and choosing a signature for each of a
+    rule's body symbols (such that together with the rule's own tags they yield the target) in proportion
+    to the number of combinations that yield it, using tables of the signatures of each prefix of the rule
+    body that are precomputed at load time. As such, paths are sampled uniformly.
+    """
+
+    __slots__ = (
+        'grammar', 'signatures_for_symbols', 'signatures_for_rules', 'body_symbols_for_rules', 'prefix_signatures'
+    )
+
+    def __init__(self, grammar, signatures_for_symbols, signatures_for_rules):
+        """Initialize a FactoredMeaningIndex object."""
+        self.grammar = grammar
+        # Dictionaries mapping the IDs of semantically meaningful symbols and rules to dictionaries that map
+        # tag signatures (frozensets of tags) to the number of paths yielding them
+        self.signatures_for_symbols = signatures_for_symbols
+        self.signatures_for_rules = signatures_for_rules
+        # For each semantically meaningful rule, a tuple containing the semantically meaningful symbols in
+        # its body, and a list whose ith entry maps the signatures that can be formed from the rule's own
+        # tags and one signature for each of the first i of those symbols to the number of combinations
+        # yielding each one (the entirely empty combination included)
+        self.body_symbols_for_rules = {}
+        self.prefix_signatures = {}
+        for rule_id in signatures_for_rules:
+            rule = grammar.production_rules[rule_id]
+            body_symbols = tuple(
+                symbol for symbol in rule.body if type(symbol) is not unicode and symbol.id in signatures_for_symbols
+            )
+            prefix_signatures = [{frozenset(rule.tags): 1}]
+            for symbol in body_symbols[:-1]:
+                extended_signatures = collections.defaultdict(int)
+                for signature, count in prefix_signatures[-1].iteritems():
+                    for symbol_signature, symbol_count in signatures_for_symbols[symbol.id].iteritems():
+                        extended_signatures[signature | symbol_signature] += count * symbol_count
+                prefix_signatures.append(dict(extended_signatures))
+            self.body_symbols_for_rules[rule_id] = body_symbols
+            self.prefix_signatures[rule_id] = prefix_signatures
+
+    @classmethod
+    def load(cls, tag_signatures_file_location, grammar):
+        """Load a factored index from a '.dag' file written by Reductionist (raising an IOError if there is none)."""
+        with open_content_file(content_file_location=tag_signatures_file_location) as tag_signatures_file:
+            tag_signatures_dictionary = json.loads(tag_signatures_file.read())
+        id_to_tag = grammar.id_to_tag
+
+        def parse_signatures(signatures_dictionary):
+            """Return a dictionary mapping tag signatures to path counts, given one read from file."""
+            return {
+                frozenset(id_to_tag[tag_id] for tag_id in signature_str.split(',')) if signature_str else frozenset():
+                    count for signature_str, count in signatures_dictionary.iteritems()
+            }
+
+        return cls(
+            grammar=grammar,
+            signatures_for_symbols={
+                int(symbol_id): parse_signatures(signatures_dictionary)
+                for symbol_id, signatures_dictionary in tag_signatures_dictionary['nonterminal_symbols'].iteritems()
+            },
+            signatures_for_rules={
+                int(rule_id): parse_signatures(signatures_dictionary)
+                for rule_id, signatures_dictionary in tag_signatures_dictionary['production_rules'].iteritems()
+            }
+        )
+
+    def count_paths(self, tags):
+        """Return the number of semantically meaningful paths through the grammar that yield the given tags."""
+        return self.signatures_for_symbols.get(self.grammar.start_symbol.id, {}).get(frozenset(tags), 0)
+
+    def sample_path(self, tags):
+        """Return a path (as an array of production-rule IDs) sampled uniformly from those yielding the given tags."""
+        path = array.array('I')
+        self._sample_path_for_symbol(symbol=self.grammar.start_symbol, signature=frozenset(tags), path=path)
+        return path
+
+    def _sample_path_for_symbol(self, symbol, signature, path):
+        """Append to the given path one sampled from those descending from the given symbol with the given signature."""
+        candidates = []
+        if not signature and any(not rule.semantically_meaningful for rule in symbol.production_rules):
+            candidates.append((None, 1))  # The empty path
+        for rule in symbol.production_rules:
+            if rule.semantically_meaningful:
+                n_paths = self.signatures_for_rules[rule.id].get(signature, 0)
+                if n_paths:
+                    candidates.append((rule, n_paths))
+        selected_rule = self._select_weighted_candidate(candidates=candidates)
+        if selected_rule is not None:
+            self._sample_path_for_rule(rule=selected_rule, signature=signature, path=path)
+
+    def _sample_path_for_rule(self, rule, signature, path):
+        """Append to the given path one sampled from those descending from the given rule with the given signature."""
+        path.append(rule.id)
+        body_symbols = self.body_symbols_for_rules[rule.id]
+        # If none of the body symbols has a nonempty path, the only path for this rule is the one naming it
+        if not any(
+            r.semantically_meaningful for symbol in body_symbols for r in symbol.production_rules
+        ):
+            return
+        prefix_signatures = self.prefix_signatures[rule.id]
+        while True:
+            # Working backward from the last body symbol, select a signature for each symbol, such that the
+            # signatures of the earlier symbols (together with the rule's own tags) can still make up whatever
+            # of the target signature the later symbols haven't accounted for
+            signatures_for_body_symbols = [None] * len(body_symbols)
+            remaining_signature = signature
+            for i in xrange(len(body_symbols)-1, -1, -1):
+                candidates = []
+                for symbol_signature, symbol_count in self.signatures_for_symbols[body_symbols[i].id].iteritems():
+                    if not symbol_signature <= remaining_signature:
+                        continue
+                    for prefix_signature, prefix_count in prefix_signatures[i].iteritems():
+                        if prefix_signature | symbol_signature == remaining_signature:
+                            candidates.append(((symbol_signature, prefix_signature), symbol_count * prefix_count))
+                symbol_signature, remaining_signature = self._select_weighted_candidate(candidates=candidates)
+                signatures_for_body_symbols[i] = symbol_signature
+            subpath = array.array('I')
+            for symbol, symbol_signature in zip(body_symbols, signatures_for_body_symbols):
+                self._sample_path_for_symbol(symbol=symbol, signature=symbol_signature, path=subpath)
+            # Reductionist drops the combination in which every body symbol takes the empty path (since the
+            # rule has other combinations), so we reject it and sample again
+            if subpath:
+                path.extend(subpath)
+                return
+
+    @staticmethod
+    def _select_weighted_candidate(candidates):
+        """Select one of the given (candidate, weight) tuples, with probability proportional to its weight.
+
+        Since path counts may be huge, the weights are integers of arbitrary size, and so we select using
+        integer arithmetic (rather than by fitting a probability distribution, which would lose precision).
+        """
+        target = random.randrange(sum(weight for _, weight in candidates))
+        for candidate, weight in candidates:
+            if target < weight:
+                return candidate
+            target -= weight
+
+
+class ContentPregenerator(object):
+    """A layer around a Productionist that keeps pools of pre-generated outputs for recently submitted content
+    requests, so that a request whose pool isn't empty can be fulfilled in constant time.
+
+    A background worker refills pools as they drain, and pools are evicted in least-recently-used order
+    whenever the (estimated) memory taken up by all pooled outputs exceeds a budget. When a request's pool
+    is empty, the request is fulfilled synchronously, as usual. To stay consistent with repetition-penalty
+    mode and with deduplication, pre-generated outputs don't update the repetition penalties or the windows
+    of recently emitted outputs when they're generated; instead, these are updated at the moment an output
+    is handed out, and a pooled output that duplicates one emitted since it was generated gets discarded.
+
+    Since a Productionist is not itself thread-safe, all generation using the wrapped Productionist should
+    go through this layer once its worker has been started.
+    """
+
+    def __init__(self, productionist, pool_size=8, memory_budget=16*1024*1024):
+        """Initialize a ContentPregenerator object."""
+        self.productionist = productionist
+        # The number of ready outputs the worker will try to keep on hand for each content request
+        self.pool_size = pool_size
+        # The total number of bytes that pooled outputs may take up (as estimated by self._estimate_output_size())
+        self.memory_budget = memory_budget
+        # A mapping from content-request keys (see self._content_request_key()) to pools; each pool is a
+        # tuple (content request, deque of (output, estimated size) tuples), and the mapping is maintained
+        # in least-recently-used order
+        self._pools = collections.OrderedDict()
+        self._pooled_bytes = 0
+        # Guards the pools and all use of the wrapped Productionist
+        self._lock = threading.Lock()
+        # Signals the worker that some pool may need refilling
+        self._refill_needed = threading.Event()
+        self._stopped = False
+        self._worker = None
+        # Counts of requests fulfilled from a pool and requests fulfilled synchronously
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """Start the background worker that refills pools."""
+        if self._worker is None:
+            self._stopped = False
+            self._worker = threading.Thread(target=self._refill_pools)
+            self._worker.daemon = True
+            self._worker.start()
+
+    def stop(self):
+        """Stop the background worker, waiting for it to finish whatever output it may be generating."""
+        if self._worker is not None:
+            self._stopped = True
+            self._refill_needed.set()
+            self._worker.join()
+            self._worker = None
+
+    def fulfill_content_request(self, content_request):
+        """Satisfy the given content request, using a pre-generated output if one is available."""
+        key = self._content_request_key(content_request=content_request)
+        with self._lock:
+            pool = self._pools.pop(key, None)
+            if pool is None:
+                # This request is new (or its pool was evicted), so we'll start pooling outputs for it
+                pool = (content_request, collections.deque())
+            self._pools[key] = pool  # Mark the pool as the most recently used one
+            # If the Productionist is deduplicating outputs, the pooled outputs must be checked against the
+            # window of recently emitted outputs as they're handed out, since it may have changed since they
+            # were pre-generated
+            dedup_window = self.productionist._dedup_window_for_content_request(content_request=content_request)
+            output = None
+            while pool[1]:
+                pooled_output, output_size = pool[1].popleft()
+                self._pooled_bytes -= output_size
+                if dedup_window is not None:
+                    self.productionist.dedup_checks += 1
+                    if pooled_output.text in dedup_window:
+                        self.productionist.dedup_rejections += 1
+                        continue
+                    dedup_window.add(pooled_output.text)
+                output = pooled_output
+                break
+            if output is not None:
+                if self.productionist.repetition_penalty_mode:
+                    self.productionist._update_repetition_penalties(
+                        explicit_path_taken=output.explicit_grammar_path_taken
+                    )
+                self.hits += 1
+            else:
+                output = self.productionist.fulfill_content_request(content_request=content_request)
+                self.misses += 1
+        self._refill_needed.set()
+        return output
+
+    def _content_request_key(self, content_request):
+        """Return a hashable key that identifies requests that are equivalent to the given content request."""
+        return (
+            frozenset(content_request.must_have), frozenset(content_request.must_not_have),
+            tuple(content_request.scoring_metric) if content_request.scoring_metric else (),
+            content_request.min_length, content_request.max_length,
+            # When the Productionist is deduplicating outputs, each speaker has its own window of recently
+            # emitted outputs, and so its own pool; otherwise, the speaker has no bearing on the outputs
+            content_request.speaker if self.productionist.dedup_window_size else None
+        )
+
+    @staticmethod
+    def _estimate_output_size(output):
+        """Return a rough estimate of the number of bytes that the given output takes up."""
+        return (
+            sys.getsizeof(output) + sys.getsizeof(output.text) + sys.getsizeof(output.tag_mask) +
+            sys.getsizeof(output.explicit_grammar_path_taken) + sys.getsizeof(output.bracketed_expression) +
+            sys.getsizeof(output.tree_expression) + sys.getsizeof(output.tree_expression_with_tags)
+        )
+
+    def _refill_pools(self):
+        """Refill pools that are below capacity, one output at a time, until this pregenerator is stopped."""
+        while not self._stopped:
+            self._refill_needed.wait()
+            self._refill_needed.clear()
+            while not self._stopped and self._refill_one_pool():
+                pass
+
+    def _refill_one_pool(self):
+        """Generate one output for the most recently used pool that's below capacity, and return whether
+        there was such a pool.
+        """
+        with self._lock:
+            key = next((k for k in reversed(self._pools) if len(self._pools[k][1]) < self.pool_size), None)
+            if key is None:
+                return False
+            content_request, pool = self._pools[key]
+            try:
+                output = self.productionist.fulfill_content_request(
+                    content_request=content_request, update_repetition_penalties=False, update_dedup_window=False
+                )
+            except AssertionError:
+                # This request cannot be fulfilled, so there's no sense in pooling outputs for it
+                del self._pools[key]
+                return True
+            output_size = self._estimate_output_size(output=output)
+            pool.append((output, output_size))
+            self._pooled_bytes += output_size
+            # Evict least recently used pools until we're within the memory budget again
+            while self._pooled_bytes > self.memory_budget and self._pools:
+                _, (_, evicted_pool) = self._pools.popitem(last=False)
+                self._pooled_bytes -= sum(size for _, size in evicted_pool)
+            return True
+
+
+class BundleManager(object):
+    """A registry of content bundles that loads each bundle's Productionist on demand and keeps the loaded
+    bundles within a memory budget.
+
+    Requests are routed by bundle name. Loaded bundles are maintained in least-recently-used order, and
+    whenever the approximate footprint of all loaded bundles (as estimated by self._estimate_footprint())
+    exceeds the budget, least recently used bundles are evicted until it no longer does. A bundle that
+    still has requests in flight is never evicted, which means the budget may be exceeded temporarily if
+    every other bundle is busy.
+
+    When a new build of a loaded bundle is published, the bundle may be reloaded without a restart, either
+    by calling self.reload_bundle() or by having a watcher thread poll the bundle's content files (see
+    self.start_watching()). The new build is loaded in the background and swapped in between requests, with
+    any requests in flight finishing on the old build, and its repetition penalties are carried over from
+    the old build by symbol name (see Productionist.adopt_repetition_penalties()).
+    """
+
+    # The extensions of the content files that make up a bundle
+    CONTENT_FILE_EXTENSIONS = ('grammar', 'meanings', 'marisa', 'dag')
+
+    def __init__(self, content_bundle_directories=None, memory_budget=256*1024*1024, productionist_kwargs=None,
+                 verbosity=1):
+        """Initialize a BundleManager object."""
+        # A mapping from bundle names to the directories holding their content files
+        self.content_bundle_directories = dict(content_bundle_directories or {})
+        # The total number of bytes that loaded bundles may take up (approximately)
+        self.memory_budget = memory_budget
+        # Keyword arguments that every Productionist will be initialized with (e.g., probabilistic_mode)
+        self.productionist_kwargs = dict(productionist_kwargs or {})
+        self.verbosity = verbosity
+        # A mapping from the names of loaded bundles to (Productionist, estimated footprint) tuples,
+        # maintained in least-recently-used order
+        self._loaded_bundles = collections.OrderedDict()
+        self._loaded_bytes = 0
+        # A mapping from bundle names to the number of requests currently in flight for them
+        self._requests_in_flight = collections.defaultdict(int)
+        # Guards all of the above; a Productionist is not itself thread-safe, so each one is additionally
+        # guarded by its own lock while a request is being fulfilled with it
+        self._lock = threading.Lock()
+        self._bundle_locks = collections.defaultdict(threading.Lock)
+        # A mapping from the names of loaded bundles to the signatures of the content files that they were
+        # loaded from (see self._content_file_signature()), which the watcher compares against to detect
+        # newly published builds
+        self._content_file_signatures = {}
+        # The names of bundles that are currently being reloaded in the background
+        self._reloads_in_progress = set()
+        # A mapping from bundle names to content-file signatures that differ from the loaded ones, as observed
+        # on the last poll; a bundle only gets reloaded once its signature holds steady for a full polling
+        # interval, so that we don't load a build whose files are still being written
+        self._observed_content_file_signatures = {}
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        # Counts of bundle loads, evictions, reloads, and failed reloads
+        self.loads = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.reload_failures = 0
+
+    def register_bundle(self, content_bundle_name, content_bundle_directory):
+        """Register the directory that holds the content files for the bundle with the given name."""
+        with self._lock:
+            self.content_bundle_directories[content_bundle_name] = content_bundle_directory
+
+    def fulfill_content_request(self, content_bundle_name, content_request):
+        """Satisfy the given content request using the bundle with the given name, loading it if need be."""
+        productionist = self.acquire(content_bundle_name=content_bundle_name)
+        try:
+            with self._bundle_locks[content_bundle_name]:
+                return productionist.fulfill_content_request(content_request=content_request)
+        finally:
+            self.release(content_bundle_name=content_bundle_name)
+
+    def acquire(self, content_bundle_name):
+        """Return the Productionist for the bundle with the given name, loading it if need be, and mark a request
+        as being in flight for that bundle (the caller must call self.release() once the request is done).
+        """
+        with self._lock:
+            if content_bundle_name not in self.content_bundle_directories:
+                raise KeyError("There is no registered content bundle named '{}'".format(content_bundle_name))
+            self._requests_in_flight[content_bundle_name] += 1
+            try:
+                if content_bundle_name in self._loaded_bundles:
+                    # Mark the bundle as the most recently used one
+                    loaded_bundle = self._loaded_bundles.pop(content_bundle_name)
+                else:
+                    loaded_bundle = self._load_bundle(content_bundle_name=content_bundle_name)
+                    self._loaded_bytes += loaded_bundle[1]
+                self._loaded_bundles[content_bundle_name] = loaded_bundle
+                self._evict_to_budget()
+            except:
+                self._release(content_bundle_name=content_bundle_name)
+                raise
+            return loaded_bundle[0]
+
+    def release(self, content_bundle_name):
+        """Mark a request for the bundle with the given name as no longer being in flight."""
+        with self._lock:
+            self._release(content_bundle_name=content_bundle_name)
+            # Now that this bundle may be evictable, make sure we're within the budget
+            self._evict_to_budget()
+
+    def _release(self, content_bundle_name):
+        """Decrement the number of requests in flight for the bundle with the given name (the lock must be held)."""
+        self._requests_in_flight[content_bundle_name] -= 1
+        if not self._requests_in_flight[content_bundle_name]:
+            del self._requests_in_flight[content_bundle_name]
+
+    def evict(self, content_bundle_name):
+        """Unload the bundle with the given name, unless it has requests in flight, and return whether it was
+        unloaded.
+        """
+        with self._lock:
+            if content_bundle_name not in self._loaded_bundles or content_bundle_name in self._requests_in_flight:
+                return False
+            self._unload_bundle(content_bundle_name=content_bundle_name)
+            return True
+
+    def loaded_bundle_footprints(self):
+        """Return a list of (bundle name, estimated footprint in bytes) tuples for the loaded bundles, in
+        least-recently-used order.
+        """
+        with self._lock:
+            return [(name, footprint) for name, (_, footprint) in self._loaded_bundles.iteritems()]
+
+    def reload_bundle(self, content_bundle_name, wait=False):
+        """Reload the bundle with the given name from its content files (e.g., once a new build has been published)
+        in the background, and return the thread doing so, or None if the bundle isn't loaded or is already
+        being reloaded; if wait is True, this method only returns once the reload is done.
+
+        The new build is swapped in atomically between requests: requests that are in flight when it is swapped
+        in finish on the old build, and every subsequent request is served by the new one. If the new build
+        fails to load, the old build remains in service.
+        """
+        with self._lock:
+            if content_bundle_name not in self._loaded_bundles or content_bundle_name in self._reloads_in_progress:
+                return None
+            self._reloads_in_progress.add(content_bundle_name)
+        reloader = threading.Thread(target=self._reload_bundle, kwargs={'content_bundle_name': content_bundle_name})
+        reloader.daemon = True
+        reloader.start()
+        if wait:
+            reloader.join()
+        return reloader
+
+    def _reload_bundle(self, content_bundle_name):
+        """Load a new build of the bundle with the given name and swap it in for the loaded one."""
+        try:
+            if self.verbosity > 0:
+                print "Reloading content bundle '{}'...".format(content_bundle_name)
+            # Note: the signature is taken before loading, such that a build published mid-load will be caught
+            # by the next poll
+            content_file_signature = self._content_file_signature(content_bundle_name=content_bundle_name)
+            try:
+                productionist = self._build_productionist(content_bundle_name=content_bundle_name)
+            except Exception as error:
+                with self._lock:
+                    self.reload_failures += 1
+                if self.verbosity > 0:
+                    print "Could not reload content bundle '{name}' -- keeping the old build: {error}".format(
+                        name=content_bundle_name, error=error
+                    )
+                return
+            footprint = self._estimate_footprint(productionist=productionist)
+            with self._lock:
+                if content_bundle_name not in self._loaded_bundles:
+                    # The bundle was evicted while we were loading its new build, which the next request for it
+                    # will load anyway
+                    return
+                old_productionist, old_footprint = self._loaded_bundles[content_bundle_name]
+                productionist.adopt_repetition_penalties(productionist=old_productionist)
+                # Requests in flight hold onto the old build and will finish on it, but it must no longer
+                # checkpoint its penalties over those of the new build
+                old_productionist.persist_repetition_penalties = False
+                # Note: replacing the value for an existing key leaves the bundle's position in the LRU order as is
+                self._loaded_bundles[content_bundle_name] = (productionist, footprint)
+                self._loaded_bytes += footprint - old_footprint
+                self._content_file_signatures[content_bundle_name] = content_file_signature
+                self.reloads += 1
+                self._evict_to_budget()
+        finally:
+            with self._lock:
+                self._reloads_in_progress.discard(content_bundle_name)
+
+    def start_watching(self, interval=5.0):
+        """Start a background thread that polls the content files of the loaded bundles every interval seconds
+        and reloads any bundle for which a new build has been published (see self.poll_for_new_builds()).
+        """
+        if self._watcher is None:
+            self._stop_watching.clear()
+            self._watcher = threading.Thread(target=self._watch, kwargs={'interval': interval})
+            self._watcher.daemon = True
+            self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the watcher thread."""
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval):
+        """Poll for new builds of the loaded bundles every interval seconds, until told to stop."""
+        while not self._stop_watching.wait(interval):
+            self.poll_for_new_builds()
+
+    def poll_for_new_builds(self):
+        """Check the content files of the loaded bundles for new builds, start reloading any bundle whose new
+        build has held steady since the last poll, and return the names of the bundles being reloaded.
+        """
+        with self._lock:
+            loaded_content_file_signatures = dict(self._content_file_signatures)
+        bundles_to_reload = []
+        for content_bundle_name, loaded_content_file_signature in loaded_content_file_signatures.iteritems():
+            content_file_signature = self._content_file_signature(content_bundle_name=content_bundle_name)
+            if content_file_signature == loaded_content_file_signature:
+                self._observed_content_file_signatures.pop(content_bundle_name, None)
+            elif self._observed_content_file_signatures.get(content_bundle_name) == content_file_signature:
+                del self._observed_content_file_signatures[content_bundle_name]
+                bundles_to_reload.append(content_bundle_name)
+            else:
+                # The files have changed, and may still be changing; we'll check again on the next poll
+                self._observed_content_file_signatures[content_bundle_name] = content_file_signature
+        return [
+            content_bundle_name for content_bundle_name in bundles_to_reload if
+            self.reload_bundle(content_bundle_name=content_bundle_name) is not None
+        ]
+
+    def _content_file_signature(self, content_bundle_name):
+        """Return a tuple of (extension, modification time, size) tuples for the content files of the bundle
+        with the given name, which changes whenever a new build of the bundle is published.
+        """
+        content_file_signature = []
+        for extension in self.CONTENT_FILE_EXTENSIONS:
+            content_file_location = '{path}/{bundle_name}.{extension}'.format(
+                path=self.content_bundle_directories[content_bundle_name], bundle_name=content_bundle_name,
+                extension=extension
+            )
+            try:
+                file_status = os.stat(content_file_location)
+            except OSError:
+                continue
+            content_file_signature.append((extension, file_status.st_mtime, file_status.st_size))
+        return tuple(content_file_signature)
+
+    def _load_bundle(self, content_bundle_name):
+        """Load the bundle with the given name and return a (Productionist, estimated footprint) tuple."""
+        if self.verbosity > 0:
+            print "Loading content bundle '{}'...".format(content_bundle_name)
+        content_file_signature = self._content_file_signature(content_bundle_name=content_bundle_name)
+        productionist = self._build_productionist(content_bundle_name=content_bundle_name)
+        self._content_file_signatures[content_bundle_name] = content_file_signature
+        self.loads += 1
+        return productionist, self._estimate_footprint(productionist=productionist)
+
+    def _build_productionist(self, content_bundle_name):
+        """Return a new Productionist for the bundle with the given name."""
+        kwargs = dict(self.productionist_kwargs)
+        kwargs.setdefault('verbosity', 0)
+        return Productionist(
+            content_bundle_name=content_bundle_name,
+            content_bundle_directory=self.content_bundle_directories[content_bundle_name],
+            **kwargs
+        )
+
+    def _unload_bundle(self, content_bundle_name):
+        """Unload the bundle with the given name (the lock must be held)."""
+        if self.verbosity > 0:
+            print "Evicting content bundle '{}'...".format(content_bundle_name)
+        productionist, footprint = self._loaded_bundles.pop(content_bundle_name)
+        self._loaded_bytes -= footprint
+        del self._content_file_signatures[content_bundle_name]
+        # If its repetition penalties are to persist, checkpoint them before we let go of it (evictions happen
+        # while routing requests, which a failure to save the checkpoint must not fail)
+        if productionist.repetition_penalty_mode and productionist.persist_repetition_penalties:
+            try:
+                productionist.save_repetition_penalties_file()
+            except (IOError, OSError) as error:
+                if self.verbosity > 0:
+                    print "Could not checkpoint the repetition penalties of content bundle '{name}': {error}".format(
+                        name=content_bundle_name, error=error
+                    )
+        self.evictions += 1
+
+    def _evict_to_budget(self):
+        """Evict least recently used bundles that have no requests in flight until the loaded bundles are
+        within the memory budget (the lock must be held).
+        """
+        if self._loaded_bytes <= self.memory_budget:
+            return
+        for content_bundle_name in list(self._loaded_bundles):
+            if self._loaded_bytes <= self.memory_budget:
+                break
+            if content_bundle_name not in self._requests_in_flight:
+                self._unload_bundle(content_bundle_name=content_bundle_name)
+
+    @staticmethod
+    def _estimate_footprint(productionist):
+        """Return a rough estimate of the number of bytes that the given Productionist's bundle takes up.
+
+        The estimate is based on the sizes of the bundle's content files: the grammar, the factored index, and
+        (unless it is memory-mapped) the expressible-meanings file are read into memory in full, and their
+        in-memory object models take up roughly as much as their JSON and text; the trie and a memory-mapped
+        meanings file occupy the page cache, so they're counted at their on-disk sizes as well. Since a content
+        file that Reductionist compressed is decompressed as it's loaded, it is counted at its uncompressed size.
+        """
+        footprint = 0
+        for extension in BundleManager.CONTENT_FILE_EXTENSIONS:
+            content_file_location = '{path}/{bundle_name}.{extension}'.format(
+                path=productionist._grammar_file_location, bundle_name=productionist.content_bundle,
+                extension=extension
+            )
+            if os.path.isfile(content_file_location):
+                footprint += uncompressed_content_file_size(content_file_location=content_file_location)
+        return footprint
+
+
+class ShardedContentBundle(object):
+    """A content bundle that Reductionist has indexed as a set of shards (see reductionist.write_sharded_bundle()),
+    of which only the ones that a process needs are loaded.
+
+    If the names of certain shards are given, only those shards are loaded (eagerly), and requests are only
+    ever served from them; otherwise, each shard is loaded on demand, the first time that a request could be
+    served from it. The bundle's manifest lists the expressible meanings of each shard (their tags and length
+    bounds), from which the satisficing meanings of every shard are determined without loading it. Since a
+    meaning with several tags from the tagset that a bundle was sharded by is held by each of their shards,
+    the satisficing meanings are gathered across shards by their tags, such that each one is only counted
+    once. One of them is then selected: at random (such that every satisficing meaning across the bundle is
+    equally likely to be targeted, as with an unsharded bundle), or, if the request has a scoring metric, at
+    random among the best-scoring ones. The request is served by a shard holding the selected meaning (one
+    that's already loaded, if possible), and only that shard then gets loaded, if need be. Without a scoring
+    metric, the request is narrowed to target the selected meaning alone, by way of its tags;
+    with one, the shard selects among its satisficing meanings using the metric, just as an unsharded bundle
+    would. Since shards are loaded as separate Productionists, each one keeps its own repetition penalties.
+    """
+
+    def __init__(self, content_bundle_name, content_bundle_directory, shards=None, productionist_kwargs=None,
+                 verbosity=1):
+        """Initialize a ShardedContentBundle object."""
+        self.content_bundle = content_bundle_name
+        if content_bundle_directory[-1] == '/':  # Strip off trailing slash, if applicable
+            content_bundle_directory = content_bundle_directory[:-1]
+        self.content_bundle_directory = content_bundle_directory
+        self.verbosity = verbosity
+        # Keyword arguments that every shard's Productionist will be initialized with
+        self.productionist_kwargs = dict(productionist_kwargs or {})
+        self.productionist_kwargs.setdefault('verbosity', 0)
+        # Load the manifest, which maps each shard name to its key, top-level symbols, and tags
+        manifest_file_location = '{path}/{bundle_name}.manifest'.format(
+            path=content_bundle_directory, bundle_name=content_bundle_name
+        )
+        with open(manifest_file_location) as manifest_file:
+            self.manifest = json.load(manifest_file)
+        self.tags_for_shards = {
+            shard_name: frozenset(shard['tags']) for shard_name, shard in self.manifest['shards'].iteritems()
+        }
+        # A mapping from shard names to lists of ExpressibleMeaning objects (without recipes) for the meanings
+        # that the manifest lists for each shard; a manifest written before these were listed maps every shard
+        # to None, in which case a shard must be loaded to determine its satisficing meanings
+        self.expressible_meanings_for_shards = {}
+        for shard_name, shard in self.manifest['shards'].iteritems():
+            if 'expressible_meanings' not in shard:
+                self.expressible_meanings_for_shards[shard_name] = None
+                continue
+            self.expressible_meanings_for_shards[shard_name] = [
+                ExpressibleMeaning(
+                    meaning_id=i, tags=frozenset(tags), recipes=None, min_length=min_length, max_length=max_length
+                )
+                for i, (tags, min_length, max_length) in enumerate(shard['expressible_meanings'])
+            ]
+        # The shards that this process has declared, or None if any shard may be loaded on demand
+        if shards is not None:
+            for shard_name in shards:
+                if shard_name not in self.tags_for_shards:
+                    raise KeyError("Content bundle '{bundle_name}' has no shard named '{shard_name}'".format(
+                        bundle_name=content_bundle_name, shard_name=shard_name
+                    ))
+            shards = frozenset(shards)
+        self.declared_shards = shards
+        # A mapping from the names of loaded shards to their Productionists
+        self.productionists = {}
+        # Guards the loading of shards (a Productionist is not itself thread-safe, so requests to the same
+        # shard must still be serialized by the caller)
+        self._lock = threading.Lock()
+        if self.declared_shards is not None:
+            for shard_name in sorted(self.declared_shards):
+                self._productionist_for_shard(shard_name=shard_name)
+
+    def shards_for_key(self, key):
+        """Return the names of the shards that were formed for the given key (a top-level symbol name or tag)."""
+        return sorted(
+            shard_name for shard_name, shard in self.manifest['shards'].iteritems() if shard['key'] == key
+        )
+
+    def fulfill_content_request(self, content_request):
+        """Satisfy the given content request using one of the shards that could serve it."""
+        must_have = set(content_request.must_have)
+        candidate_shards = sorted(
+            shard_name for shard_name, tags in self.tags_for_shards.iteritems() if
+            must_have <= tags and (self.declared_shards is None or shard_name in self.declared_shards)
+        )
+        # Gather the satisficing expressible meanings across the candidate shards, keyed by their tags (which
+        # identify a meaning across the whole bundle), along with the names of the shards that hold each one
+        satisficing_expressible_meanings = collections.OrderedDict()
+        for shard_name in candidate_shards:
+            for expressible_meaning in self._compile_satisficing_expressible_meanings_for_shard(
+                shard_name=shard_name, content_request=content_request
+            ):
+                tags = frozenset(expressible_meaning.tags)
+                if tags not in satisficing_expressible_meanings:
+                    satisficing_expressible_meanings[tags] = (expressible_meaning, [])
+                satisficing_expressible_meanings[tags][1].append(shard_name)
+        assert satisficing_expressible_meanings, (
+            "Error: The submitted content request cannot be fulfilled by using this grammar."
+        )
+        # If the request has a scoring metric, only the best-scoring meanings remain in the running
+        candidates = satisficing_expressible_meanings.values()
+        if content_request.scoring_metric:
+            scores = [
+                Productionist._score_expressible_meaning(
+                    expressible_meaning=expressible_meaning, scoring_metric=content_request.scoring_metric
+                ) for expressible_meaning, _ in candidates
+            ]
+            best_score = max(scores)
+            candidates = [candidate for candidate, score in zip(candidates, scores) if score == best_score]
+        expressible_meaning, shard_names = random.choice(candidates)
+        # Prefer a shard that's already loaded
+        shard_name = next((name for name in shard_names if name in self.productionists), shard_names[0])
+        if not content_request.scoring_metric:
+            # Narrow the request to the selected meaning, by requiring its tags and ruling out every other tag
+            # that the shard has
+            content_request = ContentRequest(
+                must_have=set(expressible_meaning.tags),
+                must_not_have=set(content_request.must_not_have) | (
+                    self.tags_for_shards[shard_name] - expressible_meaning.tags
+                ),
+                speaker=content_request.speaker,
+                min_length=content_request.min_length,
+                max_length=content_request.max_length
+            )
+        if self.verbosity > 0:
+            print "Serving content request from shard {shard_name}...".format(shard_name=shard_name)
+        productionist = self._productionist_for_shard(shard_name=shard_name)
+        return productionist.fulfill_content_request(content_request=content_request)
+
+    def _compile_satisficing_expressible_meanings_for_shard(self, shard_name, content_request):
+        """Return the expressible meanings of the shard with the given name that satisfice the given content
+        request, as determined from the manifest (see Productionist._compile_satisficing_expressible_meanings()).
+        """
+        expressible_meanings = self.expressible_meanings_for_shards[shard_name]
+        if expressible_meanings is None:
+            productionist = self._productionist_for_shard(shard_name=shard_name)
+            return productionist._compile_satisficing_expressible_meanings(content_request=content_request)
+        must_have = set(content_request.must_have)
+        must_not_have = set(content_request.must_not_have)
+        return [
+            em for em in expressible_meanings if
+            must_have <= em.tags and not (must_not_have & em.tags) and Productionist._length_bounds_fit_length_budget(
+                length_bounds=(em.min_length, em.max_length), min_length=content_request.min_length,
+                max_length=content_request.max_length
+            )
+        ]
+
+    def _productionist_for_shard(self, shard_name):
+        """Return the Productionist for the shard with the given name, loading it if need be."""
+        with self._lock:
+            if shard_name not in self.productionists:
+                if self.verbosity > 0:
+                    print "Loading shard {shard_name} of content bundle '{bundle_name}'...".format(
+                        shard_name=shard_name, bundle_name=self.content_bundle
+                    )
+                self.productionists[shard_name] = Productionist(
+                    content_bundle_name='{bundle_name}.{shard_name}'.format(
+                        bundle_name=self.content_bundle, shard_name=shard_name
+                    ),
+                    content_bundle_directory=self.content_bundle_directory,
+                    **self.productionist_kwargs
+                )
+            return self.productionists[shard_name]
+
+
+class RecentOutputFilter(object):
+    """A rotating Bloom filter over the texts of recently emitted outputs.
+
+    The filter comprises two generations of bits: new texts are added to the current generation, and once
+    it holds window_size texts, it becomes the previous generation (and the old previous generation is
+    discarded). Membership is checked against both generations, which means that a text is remembered for
+    at least window_size subsequent additions, while memory stays constant. As with any Bloom filter, a
+    text may be falsely reported as recently emitted, at roughly the given false-positive rate.
+    """
+
+    def __init__(self, window_size, false_positive_rate=0.01):
+        """Initialize a RecentOutputFilter object."""
+        self.window_size = max(1, window_size)
+        # Size each generation according to the standard formulas for an optimal Bloom filter
+        self.n_bits = int(math.ceil(-self.window_size * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.n_hashes = max(1, int(round(float(self.n_bits) / self.window_size * math.log(2))))
+        self._current_generation = bytearray((self.n_bits + 7) // 8)
+        self._previous_generation = bytearray((self.n_bits + 7) // 8)
+        self._texts_in_current_generation = 0
+
+    def __contains__(self, text):
+        """Return whether the given text was (probably) among the recently emitted outputs."""
+        bit_indices = self._bit_indices(text=text)
+        return (
+            self._all_bits_set(generation=self._current_generation, bit_indices=bit_indices) or
+            self._all_bits_set(generation=self._previous_generation, bit_indices=bit_indices)
+        )
+
+    def add(self, text):
+        """Record the given text as having been emitted."""
+        if self._texts_in_current_generation >= self.window_size:
+            # Rotate the generations
+            self._previous_generation = self._current_generation
+            self._current_generation = bytearray(len(self._previous_generation))
+            self._texts_in_current_generation = 0
+        for bit_index in self._bit_indices(text=text):
+            self._current_generation[bit_index >> 3] |= 1 << (bit_index & 7)
+        self._texts_in_current_generation += 1
+
+    def _bit_indices(self, text):
+        """Return the indices of the bits that the given text hashes to (using double hashing)."""
+        if type(text) == unicode:
+            text = text.encode('utf-8')
+        first_hash, second_hash = struct.unpack('<QQ', hashlib.md5(text).digest())
+        return [(first_hash + i*second_hash) % self.n_bits for i in xrange(self.n_hashes)]
+
+    @staticmethod
+    def _all_bits_set(generation, bit_indices):
+        """Return whether all of the given bits are set in the given generation."""
+        for bit_index in bit_indices:
+            if not generation[bit_index >> 3] & (1 << (bit_index & 7)):
+                return False
+        return True
+
+
+class RepetitionPenaltyStore(object):
+    """A compact store of the current repetition penalties for all the symbols in a grammar.
+
+    Penalties are held in an array of doubles indexed by symbol (see Grammar.n_symbols). Since a symbol
+    whose penalty has fully recovered stays at 1.0 until it is used again, we also keep track of which
+    symbols are currently penalized, so that an update only has to touch those symbols.
+
+    A store may be saved to and loaded from a compact binary file, which comprises a header (a magic
+    string, a hash of the content bundle that the penalties pertain to, and the number of symbols) followed
+    by the raw array of penalties; files are written atomically, by writing to a temporary file and then
+    renaming it over the old file, so that a crash mid-save will never leave behind a corrupt file.
+    """
+
+    FILE_MAGIC = 'PRODREP1'
+    FILE_HEADER_FORMAT = '<8s20sI'
+
+    def __init__(self, n_symbols, bundle_content_hash='\0'*20, values=None):
+        """Initialize a RepetitionPenaltyStore object."""
+        # The SHA-1 digest of the content bundle that these penalties pertain to (see
+        # Productionist._compute_bundle_content_hash())
+        self.bundle_content_hash = bundle_content_hash
+        self.values = values if values is not None else array.array('d', [1.0]) * n_symbols
+        self._penalized_symbol_indices = {i for i in xrange(len(self.values)) if self.values[i] < 1.0}
+
+    def __len__(self):
+        """Return the number of symbols whose penalties are held in this store."""
+        return len(self.values)
+
+    def __getitem__(self, symbol_index):
+        """Return the current repetition penalty for the symbol with the given index."""
+        return self.values[symbol_index]
+
+    def update(self, used_symbol_indices, multiplier, recovery_rate):
+        """Increase the penalties for the symbols that were just used and decay the penalties for all the others."""
+        values = self.values
+        penalized_symbol_indices = self._penalized_symbol_indices
+        for symbol_index in list(penalized_symbol_indices):
+            if symbol_index not in used_symbol_indices:
+                penalty = values[symbol_index] * recovery_rate
+                if penalty >= 1.0:
+                    penalty = 1.0
+                    penalized_symbol_indices.discard(symbol_index)
+                values[symbol_index] = penalty
+        for symbol_index in used_symbol_indices:
+            penalty = min(1.0, values[symbol_index] * multiplier)
+            values[symbol_index] = penalty
+            if penalty < 1.0:
+                penalized_symbol_indices.add(symbol_index)
+            else:
+                penalized_symbol_indices.discard(symbol_index)
+
+    def save(self, repetitions_file_location):
+        """Atomically save this store to the given file."""
+        # Each save gets its own temporary file (in the same directory, such that the rename is atomic), since
+        # several worker processes may be checkpointing the same bundle's penalties at once
+        file_descriptor, temporary_file_location = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(repetitions_file_location)),
+            prefix='{}.'.format(os.path.basename(repetitions_file_location)), suffix='.tmp'
+        )
+        try:
+            with os.fdopen(file_descriptor, 'wb') as repetitions_file:
+                repetitions_file.write(
+                    struct.pack(self.FILE_HEADER_FORMAT, self.FILE_MAGIC, self.bundle_content_hash, len(self.values))
+                )
+                self.values.tofile(repetitions_file)
+                repetitions_file.flush()
+                os.fsync(repetitions_file.fileno())
+            try:
+                os.rename(temporary_file_location, repetitions_file_location)
+            except OSError:
+                if os.name != 'nt':
+                    raise
+                # On Windows, a file cannot be renamed over an existing one
+                os.remove(repetitions_file_location)
+                os.rename(temporary_file_location, repetitions_file_location)
+        except:
+            if os.path.exists(temporary_file_location):
+                os.remove(temporary_file_location)
+            raise
+
+    @classmethod
+    def load(cls, repetitions_file_location, n_symbols, bundle_content_hash):
+        """Load a store from the given file, raising a ValueError if it pertains to a different content bundle."""
+        with open(repetitions_file_location, 'rb') as repetitions_file:
+            header = repetitions_file.read(struct.calcsize(cls.FILE_HEADER_FORMAT))
+            try:
+                magic, file_bundle_content_hash, file_n_symbols = struct.unpack(cls.FILE_HEADER_FORMAT, header)
+            except struct.error:
+                raise ValueError("The repetitions file at '{}' is malformed".format(repetitions_file_location))
+            if magic != cls.FILE_MAGIC:
+                raise ValueError("The file at '{}' is not a repetitions file".format(repetitions_file_location))
+            if file_bundle_content_hash != bundle_content_hash or file_n_symbols != n_symbols:
+                raise ValueError(
+                    "The repetitions file at '{}' pertains to a different content bundle".format(
+                        repetitions_file_location
+                    )
+                )
+            values = array.array('d')
+            try:
+                values.fromfile(repetitions_file, n_symbols)
+            except EOFError:
+                raise ValueError("The repetitions file at '{}' is truncated".format(repetitions_file_location))
+        return cls(n_symbols=n_symbols, bundle_content_hash=bundle_content_hash, values=values)
+
+
+class SharedRepetitionPenaltyStore(object):
+    """A store of repetition penalties that is shared by all the worker processes on a host.
+
+    The penalties are held in a memory-mapped file, which comprises a header (a magic string, a hash of
+    the content bundle, the number of symbols, the recovery rate, and a global update counter) followed
+    by an array of stored penalties (doubles) and an array of the update counts at which each penalty was
+    last stored. Rather than decaying the penalty of every symbol upon each update, recovery is applied
+    lazily: a symbol's current penalty is its stored penalty multiplied by the recovery rate once for every
+    update since it was last stored (capped at 1.0), which is exactly what repeated eager decay yields. As
+    such, an update only has to write the symbols that were just used.
+
+    Updates to the global counter and to the symbols in a given stripe are guarded by advisory byte-range
+    locks (one per stripe), which allows workers that used symbols in different stripes to update them
+    concurrently; reads are lock-free. This class provides the same interface as RepetitionPenaltyStore,
+    and it may be saved to (but not loaded from) the same compact file format.
+    """
+
+    FILE_MAGIC = 'PRODSRP1'
+    FILE_HEADER_FORMAT = '<8s20sId'
+    # The global update counter (an unsigned 64-bit integer) follows the header
+    COUNTER_OFFSET = struct.calcsize(FILE_HEADER_FORMAT)
+    ARRAYS_OFFSET = COUNTER_OFFSET + 8
+
+    def __init__(self, shared_file_location, n_symbols, bundle_content_hash, recovery_rate, initial_values=None,
+                 n_lock_stripes=64):
+        """Initialize a SharedRepetitionPenaltyStore object."""
+        if fcntl is None:
+            raise RuntimeError("Shared repetition penalties require a platform that supports fcntl")
+        self.shared_file_location = shared_file_location
+        self.bundle_content_hash = bundle_content_hash
+        self.recovery_rate = recovery_rate
+        self.n_lock_stripes = n_lock_stripes
+        file_size = self.ARRAYS_OFFSET + 16*n_symbols
+        # The byte ranges that we lock lie just past the end of the file, which means that locking them never
+        # interferes with reading or writing the file (fcntl locks are advisory, and they may extend past EOF);
+        # the first range guards the global update counter and the rest guard the stripes of symbols
+        self._lock_region_offset = file_size
+        self._shared_file = open(shared_file_location, 'a+b')
+        self._lock(0)
+        try:
+            self._shared_file.seek(0, os.SEEK_END)
+            if self._shared_file.tell() == 0:
+                # We're the first worker to attach to this file, so we'll initialize it
+                self._shared_file.write(
+                    struct.pack(self.FILE_HEADER_FORMAT, self.FILE_MAGIC, bundle_content_hash, n_symbols, recovery_rate)
+                )
+                self._shared_file.write(struct.pack('<Q', 0))
+                stored_penalties = initial_values if initial_values is not None else array.array('d', [1.0])*n_symbols
+                stored_penalties.tofile(self._shared_file)
+                # The update counts at which the penalties were last stored are all zero, which extending the
+                # file to its full size will take care of
+                self._shared_file.truncate(file_size)
+                self._shared_file.flush()
+            else:
+                self._shared_file.seek(0)
+                header = self._shared_file.read(self.COUNTER_OFFSET)
+                try:
+                    magic, file_bundle_content_hash, file_n_symbols, file_recovery_rate = struct.unpack(
+                        self.FILE_HEADER_FORMAT, header
+                    )
+                except struct.error:
+                    raise ValueError("The shared repetitions file at '{}' is malformed".format(shared_file_location))
+                if magic != self.FILE_MAGIC:
+                    raise ValueError(
+                        "The file at '{}' is not a shared repetitions file".format(shared_file_location)
+                    )
+                if (file_bundle_content_hash != bundle_content_hash or file_n_symbols != n_symbols or
+                        file_recovery_rate != recovery_rate):
+                    raise ValueError(
+                        "The shared repetitions file at '{}' pertains to a different content bundle or "
+                        "configuration".format(shared_file_location)
+                    )
+        finally:
+            self._unlock(0)
+        self._mmap = mmap.mmap(self._shared_file.fileno(), file_size)
+        self._update_counter = ctypes.c_uint64.from_buffer(self._mmap, self.COUNTER_OFFSET)
+        self._stored_penalties = (ctypes.c_double*n_symbols).from_buffer(self._mmap, self.ARRAYS_OFFSET)
+        self._last_stored_at = (ctypes.c_uint64*n_symbols).from_buffer(self._mmap, self.ARRAYS_OFFSET+8*n_symbols)
+
+    @property
+    def values(self):
+        """Return an indexable view of the current repetition penalties (namely, this store itself)."""
+        return self
+
+    def __len__(self):
+        """Return the number of symbols whose penalties are held in this store."""
+        return len(self._stored_penalties)
+
+    def __getitem__(self, symbol_index):
+        """Return the current repetition penalty for the symbol with the given index."""
+        return self._current_penalty(
+            symbol_index=symbol_index, update_count=self._update_counter.value
+        )
+
+    def _current_penalty(self, symbol_index, update_count):
+        """Return the penalty for the symbol with the given index, as of the given number of updates."""
+        stored_penalty = self._stored_penalties[symbol_index]
+        if stored_penalty >= 1.0:
+            return 1.0
+        n_updates_since_stored = update_count - self._last_stored_at[symbol_index]
+        if n_updates_since_stored <= 0:
+            return stored_penalty
+        return min(1.0, stored_penalty * self.recovery_rate**n_updates_since_stored)
+
+    def seed(self, values):
+        """Overwrite the penalties with the given values, unless this store has already been updated (or seeded),
+        and return whether it was seeded.
+
+        This allows the first worker process to load a new build of a content bundle to carry over the penalties
+        from the old build (see Productionist.adopt_repetition_penalties()), while the workers that load it
+        after that leave alone the penalties that are by then shared with it.
+        """
+        self._lock(0)
+        try:
+            if self._update_counter.value != 0:
+                return False
+            # Seeding counts as an update, which marks the store as seeded for every other worker; since no
+            # update count has been claimed yet, no worker can be writing to any stripe while we hold this lock
+            self._update_counter.value = 1
+            for symbol_index, penalty in enumerate(values):
+                self._stored_penalties[symbol_index] = penalty
+                self._last_stored_at[symbol_index] = 1
+        finally:
+            self._unlock(0)
+        return True
+
+    def update(self, used_symbol_indices, multiplier, recovery_rate):
+        """Increase the penalties for the symbols that were just used and decay the penalties for all the others.
+
+        The given recovery rate must be the one that this store was initialized with, since recovery is
+        applied lazily for all the workers that share this store.
+        """
+        if recovery_rate != self.recovery_rate:
+            raise ValueError("A shared repetition-penalty store must always be updated with the same recovery rate")
+        # Claim the next update count; the penalties of the symbols that were just used will be stored as of
+        # this count, and since they were not recovering during this update, their current penalties are
+        # those as of the previous count
+        self._lock(0)
+        try:
+            self._update_counter.value += 1
+            update_count = self._update_counter.value
+        finally:
+            self._unlock(0)
+        used_symbol_indices_by_stripe = collections.defaultdict(list)
+        for symbol_index in used_symbol_indices:
+            used_symbol_indices_by_stripe[symbol_index % self.n_lock_stripes].append(symbol_index)
+        for stripe, symbol_indices in used_symbol_indices_by_stripe.iteritems():
+            self._lock(1+stripe)
+            try:
+                for symbol_index in symbol_indices:
+                    if self._last_stored_at[symbol_index] > update_count:
+                        # A worker that claimed a later update count got to this symbol first, so its stored
+                        # penalty is already more recent than ours would be; we apply our multiplier on top of it,
+                        # rather than moving the symbol's recovery back to our count
+                        penalty = self._stored_penalties[symbol_index]
+                        self._stored_penalties[symbol_index] = min(1.0, penalty * multiplier)
+                        continue
+                    penalty = self._current_penalty(symbol_index=symbol_index, update_count=update_count-1)
+                    self._stored_penalties[symbol_index] = min(1.0, penalty * multiplier)
+                    self._last_stored_at[symbol_index] = update_count
+            finally:
+                self._unlock(1+stripe)
+
+    def snapshot(self):
+        """Return a RepetitionPenaltyStore holding a copy of the current repetition penalties."""
+        update_count = self._update_counter.value
+        values = array.array('d', (
+            self._current_penalty(symbol_index=i, update_count=update_count) for i in xrange(len(self))
+        ))
+        return RepetitionPenaltyStore(
+            n_symbols=len(values), bundle_content_hash=self.bundle_content_hash, values=values
+        )
+
+    def save(self, repetitions_file_location):
+        """Atomically save a snapshot of this store to the given file (in the RepetitionPenaltyStore format)."""
+        self.snapshot().save(repetitions_file_location=repetitions_file_location)
+
+    def close(self):
+        """Detach from the shared file."""
+        del self._update_counter, self._stored_penalties, self._last_stored_at
+        self._mmap.close()
+        self._shared_file.close()
+
+    def _lock(self, lock_index):
+        """Acquire the lock with the given index (0 for the global update counter, else 1 plus a stripe)."""
+        fcntl.lockf(self._shared_file, fcntl.LOCK_EX, 1, self._lock_region_offset+lock_index, os.SEEK_SET)
+
+    def _unlock(self, lock_index):
+        """Release the lock with the given index."""
+        fcntl.lockf(self._shared_file, fcntl.LOCK_UN, 1, self._lock_region_offset+lock_index, os.SEEK_SET)
+
+
+class WildcardDecisionTable(object):
+    """A table, precomputed at load time, that supports selecting one of a nonterminal symbol's wildcard rules.
+
+    The table holds the candidate rules themselves, their static weights (i.e., the components of their
+    scores that don't change over time), and ready-made sampling structures over those weights. For the case
+    of repetition-penalty mode, in which the weights must be adjusted at decision time, it also holds the
+    indices of the repetition penalties that apply to each candidate, along with a list that is reused to
+    accumulate the adjusted weights.
+    """
+
+    __slots__ = (
+        'rules', 'static_weights', 'cumulative_static_weights', 'total_static_weight', 'highest_static_weight_rule',
+        'penalty_indices', 'cumulative_weights', 'min_length', 'max_length', 'longest_min_length',
+        'shortest_max_length'
+    )
+
+    def __init__(self, rules, static_weights, penalty_indices):
+        """Initialize a WildcardDecisionTable object."""
+        self.rules = tuple(rules)
+        self.static_weights = tuple(static_weights)
+        # The running sums of the static weights, for sampling a candidate by bisection
+        cumulative_static_weights = []
+        total_static_weight = 0.0
+        for weight in static_weights:
+            total_static_weight += weight
+            cumulative_static_weights.append(total_static_weight)
+        self.cumulative_static_weights = tuple(cumulative_static_weights)
+        self.total_static_weight = total_static_weight
+        # The candidate that would be selected when probabilistic mode is not engaged
+        self.highest_static_weight_rule = (
+            self.rules[max(xrange(len(self.rules)), key=lambda i: self.static_weights[i])] if self.rules else None
+        )
+        # For each candidate, the indices of the repetition penalties for the symbols in its body (these will
+        # be empty if repetition-penalty mode is not engaged)
+        self.penalty_indices = tuple(penalty_indices)
+        # A list that Productionist._select_wildcard_production_rule() reuses to accumulate the running sums
+        # of the candidates' weights, once adjusted according to current repetition penalties
+        self.cumulative_weights = [0.0] * len(self.rules)
+        # The minimum and maximum lengths of the terminal results of executing any of the candidates, along
+        # with the longest minimum and the shortest maximum; the latter two tell us whether every candidate
+        # fits a given length budget, in which case it's unnecessary to filter the candidates by their lengths
+        # (see Productionist._select_wildcard_production_rule_within_length_bounds())
+        self.min_length = min(rule.min_length for rule in self.rules) if self.rules else 0
+        self.max_length = max(rule.max_length for rule in self.rules) if self.rules else 0
+        self.longest_min_length = max(rule.min_length for rule in self.rules) if self.rules else 0
+        self.shortest_max_length = min(rule.max_length for rule in self.rules) if self.rules else 0
+
+    def sample_index(self, cumulative_weights, total_weight):
+        """Return the index of a candidate sampled according to the given running sums of candidate weights."""
+        index = bisect.bisect_right(cumulative_weights, random.random() * total_weight)
+        # Guard against float rounding pushing us past the last candidate
+        return min(index, len(self.rules) - 1)
+
+
+class Instrumentation(object):
+    """A collector of per-phase latencies and counters for the content requests that a Productionist fulfills.
+
+    The phases of fulfilling a request are timed using laps: start_request() starts the clock, and each call
+    to lap() records the time since the previous lap (or the start) under the given phase, such that the
+    phases of a request partition its total latency (if a duplicate output is rejected and regenerated, the
+    phases that are repeated accrue more time for the same request). If profile is True, a cProfile profile
+    is also collected across all requests.
+    """
+
+    PHASES = (
+        'compile_satisficing_expressible_meanings', 'select_expressible_meaning',
+        'select_recipe_for_expressible_meaning', 'follow_recipe', 'build_content_package', 'total'
+    )
+
+    def __init__(self, profile=False):
+        """Initialize an Instrumentation object."""
+        # A latency histogram for each phase, plus one for the total latency of a request
+        self.histograms = {phase: LatencyHistogram() for phase in self.PHASES}
+        # Counts of requests, candidates scanned, wildcard decisions made, and rules executed, among others
+        self.counters = collections.defaultdict(int)
+        # The deepest expansion that has been observed (i.e., the greatest number of nested rule executions)
+        self.max_expansion_depth = 0
+        self.profiler = cProfile.Profile() if profile else None
+        # The time at which the current request started, and the time of its most recent lap
+        self._request_start_time = None
+        self._last_lap_time = None
+        # The time accrued so far in each phase of the current request (these get recorded in the histograms
+        # once the request is finished, so that each request contributes one sample per phase)
+        self._phase_times = {}
+
+    def start_request(self):
+        """Start the clock for a new content request."""
+        self._phase_times.clear()
+        if self.profiler is not None:
+            self.profiler.enable()
+        self._request_start_time = self._last_lap_time = time.time()
+
+    def lap(self, phase):
+        """Attribute the time since the previous lap to the given phase of the current request."""
+        now = time.time()
+        self._phase_times[phase] = self._phase_times.get(phase, 0.0) + now - self._last_lap_time
+        self._last_lap_time = now
+
+    def finish_request(self, succeeded=True):
+        """Record the latencies for the phases of the current request.
+
+        If succeeded is False, the request failed partway through (e.g., because it couldn't be satisfied),
+        in which case it's only tallied as a failed request, so as not to skew the latencies.
+        """
+        if self.profiler is not None:
+            self.profiler.disable()
+        if not succeeded:
+            self.counters['failed_requests'] += 1
+            return
+        for phase, seconds in self._phase_times.iteritems():
+            self.histograms[phase].record(seconds=seconds)
+        self.histograms['total'].record(seconds=self._last_lap_time-self._request_start_time)
+        self.counters['requests'] += 1
+
+    def increment(self, counter, n=1):
+        """Increment the given counter by n."""
+        self.counters[counter] += n
+
+    def record_expansion(self, explicit_path_taken, n_recipe_rules):
+        """Update the expansion counters to reflect the given path, which was produced by following a recipe
+        with the given number of rules.
+        """
+        self.counters['rules_executed'] += len(explicit_path_taken)
+        # Every rule that was executed but not specified by the recipe was selected as a wildcard rule
+        self.counters['wildcard_decisions'] += len(explicit_path_taken) - n_recipe_rules
+        # The path lists rules in the order they were executed, which is a preorder traversal of the
+        # derivation tree; since we know how many nonterminal symbols each rule expands, we can recover the
+        # depth of the tree by tracking how many expansions remain to be done at each level
+        depth = 0
+        pending_expansions_at_each_level = []
+        for rule in explicit_path_taken:
+            while pending_expansions_at_each_level and not pending_expansions_at_each_level[-1]:
+                pending_expansions_at_each_level.pop()
+            if pending_expansions_at_each_level:
+                pending_expansions_at_each_level[-1] -= 1
+            pending_expansions_at_each_level.append(len(rule.expansion_plan))
+            depth = max(depth, len(pending_expansions_at_each_level))
+        self.counters['expansion_depth_total'] += depth
+        self.max_expansion_depth = max(self.max_expansion_depth, depth)
+
+    def report(self):
+        """Return a dictionary reporting on everything that has been collected."""
+        n_requests = self.counters['requests']
+        return {
+            'phases': {phase: histogram.summary() for phase, histogram in self.histograms.iteritems()},
+            'counters': dict(self.counters),
+            'mean_expansion_depth': float(self.counters['expansion_depth_total']) / n_requests if n_requests else 0.0,
+            'max_expansion_depth': self.max_expansion_depth,
+        }
+
+    def format_report(self):
+        """Return a human-readable report on everything that has been collected."""
+        report = self.report()
+        lines = ["{:<44}{:>8}{:>12}{:>12}{:>12}{:>12}".format(
+            'phase', 'count', 'mean (ms)', 'p50 (ms)', 'p99 (ms)', 'max (ms)'
+        )]
+        for phase in self.PHASES:
+            summary = report['phases'][phase]
+            lines.append("{:<44}{:>8}{:>12.3f}{:>12.3f}{:>12.3f}{:>12.3f}".format(
+                phase, summary['count'], 1000*summary['mean'], 1000*summary['p50'], 1000*summary['p99'],
+                1000*summary['max']
+            ))
+        lines.append('')
+        for counter in sorted(report['counters']):
+            lines.append("{:<44}{:>8}".format(counter, report['counters'][counter]))
+        lines.append("{:<44}{:>8.2f}".format('mean_expansion_depth', report['mean_expansion_depth']))
+        lines.append("{:<44}{:>8}".format('max_expansion_depth', report['max_expansion_depth']))
+        return '\n'.join(lines)
+
+    def profile_stats(self, sort_by='cumulative', limit=25):
+        """Return a report on the cProfile profile that has been collected (if profiling is engaged)."""
+        if self.profiler is None:
+            return None
+        stream = StringIO.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats(sort_by).print_stats(limit)
+        return stream.getvalue()
+
+
+class LatencyHistogram(object):
+    """A histogram of latencies, with logarithmically spaced buckets.
+
+    Bucket i holds the latencies that are under 2**i microseconds (and at least 2**(i-1) microseconds),
+    which means that percentiles are reported to within a factor of two, using constant memory.
+    """
+
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    N_BUCKETS = 40
+
+    def __init__(self):
+        """Initialize a LatencyHistogram object."""
+        self.buckets = array.array('L', [0]) * self.N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        """Record the given latency."""
+        microseconds = int(seconds * 1e6)
+        self.buckets[min(self.N_BUCKETS-1, microseconds.bit_length())] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Return an estimate (the upper bound of the bucket it falls in) of the given percentile, in seconds."""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        n_seen = 0
+        for i, n_in_bucket in enumerate(self.buckets):
+            n_seen += n_in_bucket
+            if n_seen >= rank and n_in_bucket:
+                return min(self.max, (2**i) / 1e6)
+        return self.max
+
+    def summary(self):
+        """Return a dictionary summarizing this histogram (all latencies are in seconds)."""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(q=50),
+            'p90': self.percentile(q=90),
+            'p99': self.percentile(q=99),
+            'max': self.max,
+        }
+
+
+class LRUCache(object):
+    """A bounded mapping that evicts its least recently used entry once it reaches capacity."""
+
+    def __init__(self, capacity):
+        """Initialize an LRUCache object."""
+        # The maximum number of entries this cache will hold; a capacity of 0 disables caching
+        self.capacity = capacity
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        """Return the number of entries currently held in this cache."""
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """Return whether an entry for the given key is currently held in this cache."""
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Return the value cached for the given key (marking it as most recently used), or the default."""
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            return default
+        self._entries[key] = value
+        return value
+
+    def put(self, key, value):
+        """Cache the given value for the given key, evicting the least recently used entry if necessary."""
+        if self.capacity <= 0:
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries from this cache."""
+        self._entries.clear()
+
 
 class ContentRequest(object):
     """A content request submitted to a Productionist module."""
 
-    def __init__(self, must_have=None, must_not_have=None, scoring_metric=None):
+    def __init__(self, must_have=None, must_not_have=None, scoring_metric=None, speaker=None, min_length=None,
+                 max_length=None):
         """Initialize a ContentRequest object."""
         # Tags that must be associated with generated content
         self.must_have = must_have if must_have else set()
@@ -720,17 +3020,29 @@ class ContentRequest(object):
         self.must_not_have = must_not_have if must_not_have else set()
         # A list of (tag, weight) tuples specifying the desirability of optional tags
         self.scoring_metric = scoring_metric
+        # An optional identifier for the character who will speak the generated content; if Productionist
+        # is deduplicating outputs, it keeps a separate window of recent outputs for each speaker (with
+        # requests that don't specify a speaker sharing one window for the entire content bundle)
+        self.speaker = speaker
+        # Optional bounds on the length (in characters) of the generated content, as when it must fit into a
+        # speech bubble; Productionist enforces these by pruning the expressible meanings, recipes, and
+        # wildcard rules that cannot produce content of a fitting length
+        self.min_length = min_length
+        self.max_length = max_length
 
 
 class Output(object):
     """A generated text output, comprising both the textual content itself and its associated tags."""
 
-    def __init__(self, text, tags, recipe, explicit_grammar_path_taken, bracketed_expression):
+    def __init__(self, text, tag_mask, tags_for_tag_ids, recipe, explicit_grammar_path_taken, bracketed_expression):
         """Initialize an Output object."""
         # The generated textual content, itself
         self.text = text
-        # The set of tags inherited from the nonterminal symbols expanded to generate this content
-        self.tags = tags
+        # The tags inherited from the nonterminal symbols expanded to generate this content, as a bitmask
+        # (see Grammar.tag_mask_for_tags()); the set of tags itself only gets built when self.tags is read
+        self.tag_mask = tag_mask
+        self._tags_for_tag_ids = tags_for_tag_ids
+        self._tags = None
         # The recipe that was followed to produce this output; this associates the generated content
         # with the expressible meaning and the specific recipe that were targeted to produce it, which
         # could be useful for debugging/authoring reasons
@@ -751,6 +3063,13 @@ class Output(object):
         """Return string representation."""
         return self.text
 
+    @property
+    def tags(self):
+        """Return the set of tags inherited from the nonterminal symbols expanded to generate this content."""
+        if self._tags is None:
+            self._tags = Grammar.tags_for_tag_mask(tag_mask=self.tag_mask, tags_for_tag_ids=self._tags_for_tag_ids)
+        return self._tags
+
     def _construct_tree_expression(self, exclude_tags):
         """Construct a more understandable version of the bracketed expression, presented as a tree."""
         bracketed_expression = self.bracketed_expression
@@ -778,6 +3097,13 @@ class Grammar(object):
         # These get set by self._init_parse_content_file()
         self.nonterminal_symbols = None
         self.id_to_tag = None
+        # The minimum and maximum lengths (in characters) of the outputs of each expressible meaning, as a list
+        # of [minimum length, maximum length] pairs indexed by meaning ID, or None for an older bundle; these
+        # are held here only until the expressible meanings are loaded (see Productionist.__init__())
+        self.expressible_meaning_length_bounds = None
+        # A table used to intern the tags and terminal symbols parsed from the grammar file, so that each
+        # distinct string is held in memory only once, no matter how many symbols or rules reference it
+        self._interned_strings = {}
         # Parse the
         self._init_parse_json_grammar_specification(path_to_json_grammar_specification=grammar_file_location)
         self.start_symbol = next(s for s in self.nonterminal_symbols if s.start_symbol)
@@ -790,19 +3116,47 @@ class Grammar(object):
         for symbol in self.nonterminal_symbols:
             self.production_rules += symbol.production_rules
         self.production_rules.sort(key=lambda r: r.id)
-        # Collect all terminal symbols
+        # Collect all terminal symbols, assigning each an index that follows those of the nonterminal
+        # symbols (whose indices are their IDs); these indices are used to key per-symbol state, namely
+        # repetition penalties
         self.terminal_symbols = []
+        terminal_symbol_indices = {}
         for rule in self.production_rules:
             for symbol in rule.body:
-                if type(symbol) == unicode and symbol not in self.terminal_symbols:
+                if type(symbol) == unicode and symbol not in terminal_symbol_indices:
+                    terminal_symbol_indices[symbol] = len(self.nonterminal_symbols) + len(self.terminal_symbols)
                     self.terminal_symbols.append(symbol)
-        # Have all production rules compile all the tags on the symbols in their rule bodies
+        self.n_symbols = len(self.nonterminal_symbols) + len(self.terminal_symbols)
+        for rule in self.production_rules:
+            rule.body_symbol_indices = array.array('I', [
+                terminal_symbol_indices[symbol] if type(symbol) == unicode else symbol.id for symbol in rule.body
+            ])
+        # Have all production rules compile all the tags on the symbols in their rule bodies, as well
+        # as the expansion plans that Productionist will execute them by
         for rule in self.production_rules:
             rule.compile_tags()
+            rule.compile_expansion_plan()
         # Compile all tags attached to all symbols in this grammar
         self.tags = set()
         for symbol in self.nonterminal_symbols:
             self.tags |= set(symbol.tags)
+        # Tags are dense ID numbers assigned by Reductionist, which lets us represent a set of tags as a
+        # bitmask, with the bit for each tag's ID set; build a table mapping tags to their bits, as well
+        # as a list of the tags, indexed by ID, to turn bitmasks back into sets of tags
+        self.tag_masks = {tag: 1 << int(tag_id) for tag_id, tag in self.id_to_tag.iteritems()}
+        self.tags_for_tag_ids = [None] * len(self.id_to_tag)
+        for tag_id, tag in self.id_to_tag.iteritems():
+            self.tags_for_tag_ids[int(tag_id)] = tag
+        # Bundles generated by Reductionist include a tag bitmask for each rule; for older bundles, we
+        # compute these from the compiled tags
+        for rule in self.production_rules:
+            if rule.tag_mask is None:
+                rule.tag_mask = self.tag_mask_for_tags(tags=rule.tags)
+        # Likewise, bundles generated by Reductionist include the minimum and maximum lengths (in characters) of
+        # the terminal expansions of each symbol and rule, which Productionist uses to fulfill content requests
+        # that specify a length budget; for older bundles, we compute these here
+        for symbol in self.nonterminal_symbols:
+            symbol.compute_expansion_length_bounds()
         # Check whether any symbols have rules with unequal application frequencies; if none do, then
         # Productionist may be able to choose rules randomly (this attribute is used to determine whether
         # a 'scoring mode' is engaged, in Productionist.scoring_modes_engaged())
@@ -812,11 +3166,23 @@ class Grammar(object):
         # files generated by Reductionist)
         self._init_validate_grammar()
 
+    def symbol_keys(self):
+        """Return a list of keys identifying the symbols in this grammar, indexed like per-symbol state.
+
+        Unlike indices, which Reductionist assigns anew each time a grammar is indexed, these keys are stable
+        across builds of a grammar: a nonterminal symbol is keyed by its name and a terminal symbol by its
+        text (along with a flag distinguishing the two).
+        """
+        keys = [(False, symbol.name) for symbol in self.nonterminal_symbols]
+        keys += [(True, symbol) for symbol in self.terminal_symbols]
+        return keys
+
     def _init_parse_json_grammar_specification(self, path_to_json_grammar_specification):
         """Parse a JSON grammar specification exported by Expressionist to instantiate symbols and rules."""
         # Load in the JSON spec
         try:
-            grammar_dictionary = json.loads(open(path_to_json_grammar_specification).read())
+            with open_content_file(content_file_location=path_to_json_grammar_specification) as grammar_file:
+                grammar_dictionary = json.loads(grammar_file.read())
         except IOError:
             raise Exception(
                 "Cannot load grammar -- there is no grammar file located at '{filepath}'".format(
@@ -825,13 +3191,17 @@ class Grammar(object):
             )
         # Grab out the dictionaries mapping tag IDs to the tags themselves, which we need to execute
         # expressible meanings
-        self.id_to_tag = grammar_dictionary['id_to_tag']
+        self.id_to_tag = {
+            self._intern(tag_id): self._intern(tag) for tag_id, tag in grammar_dictionary['id_to_tag'].iteritems()
+        }
+        # Bundles generated by Reductionist include the length bounds of each expressible meaning's outputs
+        self.expressible_meaning_length_bounds = grammar_dictionary.get('expressible_meaning_length_bounds')
         # Build objects for the nonterminal symbols defined in the spec
         symbol_objects = []
         nonterminal_symbol_specifications = grammar_dictionary['nonterminal_symbols']
         for symbol_id, nonterminal_symbol_specification in nonterminal_symbol_specifications.iteritems():
             symbol_name = nonterminal_symbol_specification['name']
-            tags = nonterminal_symbol_specification['tags']
+            tags = tuple(self._intern(tag) for tag in nonterminal_symbol_specification['tags'])
             production_rules_specification = nonterminal_symbol_specification['production_rules']
             expansions_are_complete_outputs = (
                 nonterminal_symbol_specification['expansions_are_complete_outputs']
@@ -843,10 +3213,42 @@ class Grammar(object):
                 production_rules_specification=production_rules_specification,
                 expansions_are_complete_outputs=expansions_are_complete_outputs,
                 start_symbol=symbol_is_start_symbol, semantically_meaningful=symbol_is_semantically_meaningful,
+                min_length=nonterminal_symbol_specification.get('min_length'),
+                max_length=nonterminal_symbol_specification.get('max_length')
             )
             symbol_objects.append(symbol_object)
         self.nonterminal_symbols = symbol_objects
 
+    def tag_mask_for_tags(self, tags):
+        """Return the bitmask for the given tags (raising a KeyError if one of them isn't in this grammar)."""
+        tag_masks = self.tag_masks
+        tag_mask = 0
+        for tag in tags:
+            tag_mask |= tag_masks[tag]
+        return tag_mask
+
+    @staticmethod
+    def tag_mask_for_tag_ids(tag_ids):
+        """Return the bitmask for the tags with the given IDs (given as strings, as in a .meanings file)."""
+        tag_mask = 0
+        for tag_id in tag_ids:
+            tag_mask |= 1 << int(tag_id)
+        return tag_mask
+
+    @staticmethod
+    def tags_for_tag_mask(tag_mask, tags_for_tag_ids):
+        """Return the set of tags for the given bitmask, given the list of tags indexed by ID."""
+        tags = set()
+        while tag_mask:
+            lowest_bit = tag_mask & -tag_mask
+            tags.add(tags_for_tag_ids[lowest_bit.bit_length()-1])
+            tag_mask ^= lowest_bit
+        return tags
+
+    def _intern(self, string):
+        """Return the canonical copy of the given string, registering it as such if it's not yet been seen."""
+        return self._interned_strings.setdefault(string, string)
+
     def _init_ground_symbol_references_in_all_production_rule_bodies(self):
         """Ground all symbol references in production rule bodies to actual NonterminalSymbol objects."""
         for symbol in self.nonterminal_symbols:
@@ -864,10 +3266,13 @@ class Grammar(object):
                 symbol_object = self.nonterminal_symbols[symbol_reference]
                 rule_body_with_resolved_symbol_references.append(symbol_object)
             else:
-                # We've encountered a terminal symbol, so we can just append this string itself
-                # to the list that we're building
-                rule_body_with_resolved_symbol_references.append(symbol_reference)
-            production_rule.body = rule_body_with_resolved_symbol_references
+                # We've encountered a terminal symbol, so we can just append (the interned copy of) this
+                # string itself to the list that we're building
+                rule_body_with_resolved_symbol_references.append(self._intern(symbol_reference))
+        # Rule bodies are never modified after this point, so we store them as tuples; we also no longer
+        # need the body specification, which would otherwise stay resident for the life of the grammar
+        production_rule.body = tuple(rule_body_with_resolved_symbol_references)
+        production_rule.body_specification = None
 
     def _init_validate_grammar(self):
         """Run validation checks to ensure the well-formedness of this grammar."""
@@ -888,12 +3293,18 @@ class Grammar(object):
 class NonterminalSymbol(object):
     """A nonterminal symbol in an annotated context-free grammar authored using an Expressionist-like tool."""
 
+    __slots__ = (
+        'id', 'name', 'tags', 'production_rules', 'expansions_are_complete_outputs', 'start_symbol',
+        'semantically_meaningful', 'targeting_wildcard_table', 'nontargeting_wildcard_table', 'min_length',
+        'max_length'
+    )
+
     def __init__(self, symbol_id, name, tags, production_rules_specification, expansions_are_complete_outputs,
-                 start_symbol, semantically_meaningful):
+                 start_symbol, semantically_meaningful, min_length=None, max_length=None):
         """Initialize a NonterminalSymbol object."""
         self.id = symbol_id
         self.name = name
-        # Set the tags attached to this symbol (defined as a list of strings of the form 'tagset:tag')
+        # Set the tags attached to this symbol (defined as a tuple of strings of the form 'tagset:tag')
         self.tags = tags
         # Reify production rules for expanding this symbol
         self.production_rules = self._init_reify_production_rules(production_rules_specification)
@@ -904,6 +3315,15 @@ class NonterminalSymbol(object):
         self.start_symbol = start_symbol
         # Whether this symbol and/or any of its descendants have tags
         self.semantically_meaningful = semantically_meaningful
+        # Tables supporting the selection of this symbol's wildcard rules when Productionist is targeting an
+        # expressible meaning and when it isn't; these get set by Productionist.build_wildcard_decision_tables()
+        self.targeting_wildcard_table = None
+        self.nontargeting_wildcard_table = None
+        # The minimum and maximum lengths (in characters) of the terminal expansions of this symbol; these are
+        # included in the grammar file by Reductionist, and otherwise they get set by
+        # self.compute_expansion_length_bounds()
+        self.min_length = min_length
+        self.max_length = max_length
 
     def __str__(self):
         """Return string representation."""
@@ -922,7 +3342,10 @@ class NonterminalSymbol(object):
                     ProductionRule(
                         rule_id=rule_id, head=self, body_specification=body_specification,
                         application_frequency=application_frequency,
-                        semantically_meaningful=rule_is_semantically_meaningful
+                        semantically_meaningful=rule_is_semantically_meaningful,
+                        tag_mask=rule_specification.get('tag_mask'),
+                        min_length=rule_specification.get('min_length'),
+                        max_length=rule_specification.get('max_length')
                     )
                 )
         return production_rule_objects
@@ -937,11 +3360,28 @@ class NonterminalSymbol(object):
             for rule in self.production_rules:
                 rule.frequency_score_multiplier = rule.application_frequency/maximum_application_frequency
 
+    def compute_expansion_length_bounds(self):
+        """Determine (if they weren't included in the grammar file) and return the minimum and maximum lengths
+        (in characters) of the terminal expansions of this symbol.
+        """
+        if self.min_length is None:
+            rule_length_bounds = [rule.compute_expansion_length_bounds() for rule in self.production_rules]
+            self.min_length = min(bounds[0] for bounds in rule_length_bounds) if rule_length_bounds else 0
+            self.max_length = max(bounds[1] for bounds in rule_length_bounds) if rule_length_bounds else 0
+        return self.min_length, self.max_length
+
 
 class ProductionRule(object):
     """A production rule in an annotated context-free grammar authored using an Expressionist-like tool."""
 
-    def __init__(self, rule_id, head, body_specification, application_frequency, semantically_meaningful):
+    __slots__ = (
+        'id', 'head', 'body', 'body_specification', 'application_frequency', 'frequency_score_multiplier',
+        'semantically_meaningful', 'tags', 'tag_mask', 'expansion_plan', 'expansion_plan_tail', 'body_symbol_indices',
+        'min_length', 'max_length'
+    )
+
+    def __init__(self, rule_id, head, body_specification, application_frequency, semantically_meaningful,
+                 tag_mask=None, min_length=None, max_length=None):
         """Initialize a ProductionRule object.
 
         'head' is a nonterminal symbol constituting the left-hand side of this rule, while
@@ -960,6 +3400,23 @@ class ProductionRule(object):
         self.frequency_score_multiplier = None
         self.semantically_meaningful = semantically_meaningful
         self.tags = []  # Gets set by self.compile_tags()
+        # The same tags, as a bitmask (see Grammar.tag_mask_for_tags()); this is included in the grammar file by
+        # Reductionist, and otherwise it gets set by Grammar.__init__()
+        self.tag_mask = tag_mask
+        # A compiled form of this rule's body, as a tuple of (terminal run, nonterminal symbol) pairs, where
+        # each terminal run is the concatenation of the terminal symbols preceding that nonterminal symbol,
+        # plus a tail, which is the concatenation of any terminal symbols following the last nonterminal
+        # symbol; these get set by self.compile_expansion_plan()
+        self.expansion_plan = None
+        self.expansion_plan_tail = None
+        # The indices (see Grammar.n_symbols) of the symbols in this rule's body, which are used to look up
+        # their repetition penalties; this gets set by Grammar.__init__()
+        self.body_symbol_indices = None
+        # The minimum and maximum lengths (in characters) of the terminal results of executing this rule; these
+        # are included in the grammar file by Reductionist, and otherwise they get set by
+        # self.compute_expansion_length_bounds()
+        self.min_length = min_length
+        self.max_length = max_length
 
     def __str__(self):
         """Return string representation."""
@@ -978,16 +3435,39 @@ class ProductionRule(object):
                     if tag not in self.tags:
                         self.tags.append(tag)
 
+    def compile_expansion_plan(self):
+        """Compile this rule's body into an expansion plan, in which adjacent terminal symbols are pre-joined."""
+        expansion_plan = []
+        terminal_run = []
+        for symbol in self.body:
+            if type(symbol) == unicode:
+                terminal_run.append(symbol)
+            else:
+                expansion_plan.append((u''.join(terminal_run), symbol))
+                terminal_run = []
+        self.expansion_plan = tuple(expansion_plan)
+        self.expansion_plan_tail = u''.join(terminal_run)
+
+    def compute_expansion_length_bounds(self):
+        """Determine (if they weren't included in the grammar file) and return the minimum and maximum lengths
+        (in characters) of the terminal results of executing this rule.
+        """
+        if self.min_length is None:
+            min_length = max_length = 0
+            for symbol in self.body:
+                if type(symbol) == unicode:
+                    min_length += len(symbol)
+                    max_length += len(symbol)
+                else:
+                    symbol_min_length, symbol_max_length = symbol.compute_expansion_length_bounds()
+                    min_length += symbol_min_length
+                    max_length += symbol_max_length
+            self.min_length = min_length
+            self.max_length = max_length
+        return self.min_length, self.max_length
+
 
 if __name__ == "__main__":
-    # Define configuration parameters as constants
-    HAVE_REPETITIONS_FILE_PERSIST_ACROSS_RUNTIME_INSTANCES = False
-    REPETITION_PENALTY_MULTIPLIER = 0.033  # Initially 30 times less likely to be used after first usage
-    REPETITION_PENALTY_RECOVERY_RATE = 1.2  # Sheds 15% of its current penalty after each non-usage instance
-    # Note: to see how many turns it will take for a symbol's repetition penalty to fully refresh (to a 1.0 value),
-    # repeatedly multiple a value initialized to REPETITION_PENALTY_MULTIPLIER by REPETITION_PENALTY_RECOVERY_RATE
-    # until the value reaches 1.0 (e.g., for REPETITION_PENALTY_MULTIPLIER=0.033 and REPETITION_PENALTY_RECOVERY_RATE
-    # =1.2, it takes 19 turns for a symbol to fully refresh)
     # Parse the command-line arguments
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -1052,12 +3532,81 @@ if __name__ == "__main__":
              "terms of number of characters) will be prioritized.",
         action="store_true"
     )
+    parser.add_argument(
+        "--min_length",
+        help="the minimum length (in characters) of the generated outputs (default: none)",
+        type=int,
+        default=None
+    )
+    parser.add_argument(
+        "--max_length",
+        help="the maximum length (in characters) of the generated outputs, as when they must fit into a speech " +
+             "bubble; branches of the grammar that cannot produce an output of a fitting length are pruned " +
+             "(default: none)",
+        type=int,
+        default=None
+    )
     parser.add_argument(
         "--test",
         help="whether to engage test mode (flag argument); when test mode is engaged, the system forms a random " +
              "content request and attempts to satisfy it.",
         action="store_true"
     )
+    parser.add_argument(
+        "--mmap_meanings",
+        help="whether to memory-map the expressible-meanings file (flag argument); when this is engaged, the " +
+             "recipes for an expressible meaning will only be decoded once it is selected, which keeps resident " +
+             "memory low for large content bundles",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--recipe_cache_size",
+        help="the number of expressible meanings whose decoded recipes will be cached when the " +
+             "expressible-meanings file is memory-mapped (default: 256)",
+        type=int,
+        default=256
+    )
+    parser.add_argument(
+        "--restored_path_cache_size",
+        help="the number of grammar paths restored from the trie that will be cached, if the content bundle " +
+             "includes a trie (default: 128); with a scoring mode engaged, recipes keep their paths once scored " +
+             "instead",
+        type=int,
+        default=128
+    )
+    parser.add_argument(
+        "--dedup_window",
+        help="the number of recently emitted outputs that newly generated outputs will be checked against; " +
+             "duplicates will be rejected and regenerated (default: 0, which disables deduplication)",
+        type=int,
+        default=0
+    )
+    parser.add_argument(
+        "--dedup_retries",
+        help="the maximum number of times a duplicate output will be regenerated before it's let through " +
+             "(default: 3)",
+        type=int,
+        default=3
+    )
+    parser.add_argument(
+        "--persist_repetition_penalties",
+        help="whether to load repetition penalties from (and checkpoint them to) a repetitions file in the " +
+             "content bundle directory, so that they persist across generation instances (flag argument)",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--shared_repetition_penalties",
+        help="the filepath prefix for a memory-mapped repetition-penalties file (suffixed with the bundle name " +
+             "and a hash of its grammar) that is to be shared with any other Productionist processes on this " +
+             "host that specify the same prefix (default: none)",
+        default=None
+    )
+    parser.add_argument(
+        "--profile",
+        help="whether to report per-phase latencies and counters (along with a cProfile profile) for the " +
+             "fulfilled content requests (flag argument)",
+        action="store_true"
+    )
     parser.add_argument(
         "--seed",
         help="an integer seed for the pseudorandom number generator that Productionist uses",
@@ -1079,6 +3628,15 @@ if __name__ == "__main__":
         probabilistic_mode=not args.nonprobabilistic,
         repetition_penalty_mode=args.repetition_penalty,
         terse_mode=args.terse,
+        memory_mapped_meanings=args.mmap_meanings,
+        recipe_cache_size=args.recipe_cache_size,
+        restored_path_cache_size=args.restored_path_cache_size,
+        dedup_window_size=args.dedup_window,
+        dedup_max_retries=args.dedup_retries,
+        persist_repetition_penalties=(
+            args.persist_repetition_penalties or HAVE_REPETITIONS_FILE_PERSIST_ACROSS_RUNTIME_INSTANCES
+        ),
+        shared_repetition_penalties_file_location=args.shared_repetition_penalties,
         verbosity=args.verbosity
     )
     if args.symbol:  # Expand a particular nonterminal symbol
@@ -1111,7 +3669,8 @@ if __name__ == "__main__":
             must_not_have = set()
             scoring_metric = []
         content_request = ContentRequest(
-            must_have=must_have, must_not_have=must_not_have, scoring_metric=scoring_metric
+            must_have=must_have, must_not_have=must_not_have, scoring_metric=scoring_metric,
+            min_length=args.min_length, max_length=args.max_length
         )
         if args.verbosity > 0:
             print (
@@ -1124,10 +3683,18 @@ if __name__ == "__main__":
                 ) +
                 "\n\tScoring metric: {}".format(
                     ', '.join(str(t) for t in scoring_metric) if scoring_metric else 'N/A'
-                )
+                ) +
+                "\n\tMinimum length: {}".format(args.min_length if args.min_length is not None else 'N/A') +
+                "\n\tMaximum length: {}".format(args.max_length if args.max_length is not None else 'N/A')
             )
+        if args.profile:
+            productionist.enable_instrumentation(profile=True)
         # Fulfill the content request to generate an output (as an object of the class Output, defined above)
         outputs = [productionist.fulfill_content_request(content_request=content_request) for _ in xrange(args.n)]
+        if args.dedup_window and args.verbosity > 0:
+            print "\n-- Deduplication: {rejections} of {checks} generated outputs rejected ({rate:.1%})".format(
+                rate=productionist.dedup_metrics()['reject_rate'], **productionist.dedup_metrics()
+            )
     for i in xrange(len(outputs)):
         output = outputs[i]
         if args.verbosity > 0:
@@ -1162,6 +3729,12 @@ if __name__ == "__main__":
             print "--Bracketed expression--\n{expression}".format(expression=output.bracketed_expression)
             print "--Tree expression--\n{expression}".format(expression=output.tree_expression)
             print "--Tree expression (with tags)--\n{expression}".format(expression=output.tree_expression_with_tags)
+    # If applicable, report on the instrumentation that was collected
+    if productionist.instrumentation is not None:
+        print "\n-- Instrumentation:\n"
+        print productionist.instrumentation.format_report()
+        print "\n-- Profile:\n"
+        print productionist.instrumentation.profile_stats()
     # Lastly, save out the updated repetitions file, if applicable, for future use
-    if productionist.repetition_penalty_mode and HAVE_REPETITIONS_FILE_PERSIST_ACROSS_RUNTIME_INSTANCES:
+    if productionist.repetition_penalty_mode and productionist.persist_repetition_penalties:
         productionist.save_repetition_penalties_file()
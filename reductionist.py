@@ -3,50 +3,212 @@ import argparse  # Used to handle command-line arguments for this program
 import json  # Used to generate JSON grammar files in the Productionist format
 import operator  # Used to determine total number of generable lines of dialogue for a symbol/rule/grammar
 import itertools  # Used to efficiently compute combinatorics when deriving grammar paths
+import time  # Used to time each indexing phase
+import collections  # Used to accumulate counts when counting grammar paths
+import random  # Used to sample the recipes that are kept for an expressible meaning, if they are capped
+import gzip  # Used to optionally compress the content files that Reductionist writes out
+import bz2  # Used to optionally compress the content files that Reductionist writes out
+try:
+    import lzma  # Used to optionally compress the content files that Reductionist writes out (Python 3 only)
+except ImportError:
+    lzma = None
 import marisa_trie  # Used to build a trie data structure efficiently storing all the paths through the grammar
+import memory_accounting  # Used to optionally account for the memory taken up at each indexing phase
+
+
+# A mapping from the names of the codecs that content files may be compressed with to functions that open a file
+# for writing with that codec; only codecs that are available in the standard library are included
+COMPRESSION_CODECS = {
+    'gzip': lambda output_file_location: gzip.open(output_file_location, 'wb'),
+    'bz2': lambda output_file_location: bz2.BZ2File(output_file_location, 'w'),
+}
+if lzma is not None:
+    COMPRESSION_CODECS['lzma'] = lambda output_file_location: lzma.open(output_file_location, 'wb')
 
 
 class Reductionist(object):
     """A system that, at authoring time, processes and indexes an Expressionist grammar."""
 
-    def __init__(self, path_to_input_content_file, path_to_write_output_files_to, trie_output, verbosity=1):
+    def __init__(self, path_to_input_content_file, path_to_write_output_files_to, trie_output,
+                 memory_accounting=False, dry_run=False, factored_index=False, top_level_symbol_names=None,
+                 expressible_meaning_filter=None, compression=None, merge_identical_subgrammars=False,
+                 max_recipes_per_meaning=None, recipe_sampling_seed=0, precomputed_expressible_meanings=None,
+                 verbosity=1):
         """Initialize a Reductionist object."""
         # Whether this Reductionist will write out its trie file and use trie keys in the .meanings
         # file (as opposed to included all expanded grammar paths, which will take up more space); it
         # only makes sense to write out trie output when the Productionist module that will use the
         # files generated by Reductionist will be written and Python and make use of the marisa_trie package
         self.trie_output = trie_output
+        # If specified, the codec ('gzip', 'bz2', or 'lzma') that the grammar, expressible-meanings, and
+        # tag-signatures files will be compressed with; Productionist detects the codec from the file itself
+        # and decompresses it as a stream during load (the trie is left as is, since marisa_trie loads it
+        # directly, and so is the stats file, which is meant to be read by humans)
+        if compression is not None and compression not in COMPRESSION_CODECS:
+            raise ValueError("Unsupported compression codec '{codec}'".format(codec=compression))
+        self.compression = compression
         # If verbosity is 0, no information will be printed out during processing; if 1, information
         # about how far along Reductionist is in its general processing will be printed out; if 2,
         # information about the paths taken through the grammar to generate content will also be printed
         self.verbosity = verbosity
+        # The time taken by each indexing phase, as a list of (phase, seconds) tuples; additionally, if memory
+        # accounting is engaged, a breakdown of the memory taken up by Reductionist's intermediate structures
+        # will be recorded at the end of each phase, as a list of (phase, breakdown) tuples (see
+        # memory_accounting.reductionist_memory_breakdown())
+        self.phase_timings = []
+        self.memory_accounting = memory_accounting
+        self.memory_snapshots = []
+        self._phase_start_time = time.time()
+        # In a dry run, Reductionist only determines which rules are semantically meaningful and then counts
+        # the semantically meaningful paths through the grammar (without enumerating them), recording the
+        # counts for each symbol and rule (see self._count_grammar_paths()); no trie is built, no expressible
+        # meanings are constructed, and no files are written
+        self.dry_run = dry_run
+        self.path_counts = None
+        # If a factored index is to be built, Reductionist doesn't enumerate the semantically meaningful paths
+        # through the grammar at all; instead, it annotates each semantically meaningful symbol and rule with
+        # the tagsets ('tag signatures') of the paths descending from it, along with the number of paths that
+        # yield each one, and it writes out these annotations (in a '.dag' file) in lieu of the paths; since
+        # the grammar itself is the AND-OR DAG over which these annotations are defined, the index grows with
+        # the size of the grammar rather than with the number of paths, and Productionist samples a recipe for
+        # a given expressible meaning by walking that DAG (see self._compute_tag_signatures())
+        self.factored_index = factored_index
+        self.trie = None
+        # While the index is being built, semantically meaningful paths are represented as tuples of rule IDs,
+        # which are only encoded as strings to build the trie and to write out the .meanings file; this list
+        # maps each trie key to the path (tuple) that it stores, and it gets set by self._build_trie()
+        self._grammar_paths_for_trie_keys = None
+        self.tag_signatures_for_symbols = None
+        self.tag_signatures_for_rules = None
+        # For a factored index, a dictionary mapping each tag signature of the start symbol to a tuple (minimum
+        # length, maximum length) for the outputs yielding that signature; this gets set by
+        # self._compute_tag_signatures()
+        self.length_bounds_for_tag_signatures = None
+        # If specified, a function that is called with the tags of each expressible meaning, and which returns
+        # whether that meaning is to be kept in the bundle (as when writing a shard that only holds the meanings
+        # with a given tag; see write_sharded_bundle())
+        self.expressible_meaning_filter = expressible_meaning_filter
+        # If specified, the maximum number of recipes (grammar paths) that will be kept for each expressible
+        # meaning; when a meaning has more than that, a uniform sample of its recipes is kept, which is drawn
+        # by reservoir sampling as the paths through the grammar are collected, one top-level symbol at a time
+        # (such that neither all the paths nor a trie of them is ever held; see
+        # self._construct_expressible_meanings_by_sampling_recipes()), using a pseudorandom number generator
+        # seeded with recipe_sampling_seed (such that the sample is reproducible); this doesn't apply to a
+        # factored index, which has no recipes
+        self.max_recipes_per_meaning = max_recipes_per_meaning
+        self.recipe_sampling_seed = recipe_sampling_seed
+        # If path_to_write_output_files_to is None, nothing is written out; this is used to collect the paths
+        # through a grammar once, such that the expressible meanings can then be split across the shards of a
+        # sharded bundle without collecting the paths again for each shard (see write_sharded_bundle())
+        self.path_to_write_output_files_to = path_to_write_output_files_to
         # Build a grammar in memory, as an object of the Grammar class, by parsing a JSON file
-        # exported by Expressionist
-        self.grammar = Grammar(grammar_file_location=path_to_input_content_file)
+        # exported by Expressionist; if only certain top-level symbols are to be indexed (as when writing
+        # one shard of a sharded bundle; see write_sharded_bundle()), the grammar is restricted to those
+        # symbols and their descendants; if identical subgrammars are to be merged, every untagged symbol that
+        # is structurally identical to another one (e.g., as a copy-pasted symbol family) is merged into it
+        # before anything else happens (see Grammar._init_merge_identical_subgrammars())
+        self.grammar = Grammar(
+            grammar_file_location=path_to_input_content_file, top_level_symbol_names=top_level_symbol_names,
+            merge_identical_subgrammars=merge_identical_subgrammars
+        )
         # Create a start symbol and set of top-level production rules in the grammar
         self.grammar.create_start_symbol_and_top_level_production_rules()
         # Sort the symbol and rule lists
         self.grammar.nonterminal_symbols.sort(key=lambda s: s.id)
         self.grammar.production_rules.sort(key=lambda r: r.id)
+        self._end_phase(phase='parse')
         # Perform validation checks on the grammar; if these critically fail, there's no point in going forward,
         # in which case we'll short-circuit here and print out the errors
         self.validator = Validator(grammar=self.grammar)
         if not self.validator.errors:
             # Determine the grammar's total number of generable outputs
             self.total_generable_outputs = self.grammar.start_symbol.count_generable_variants()
-            # Operate over the grammar to build a trie data structure that efficiently stores all the
-            # semantically meaningful paths through the grammar (i.e., ones that pass through nonterminal
-            # symbols with tags)
-            self.trie = self._build_trie()
+            # Determine the minimum and maximum lengths of the terminal expansions of every symbol and rule,
+            # which are written into the grammar file so that Productionist can fulfill content requests
+            # that specify a length budget (e.g., the character limit of a speech bubble) by pruning any
+            # branch that cannot fit, rather than by generating an output and retrying if it doesn't fit
+            for symbol in self.grammar.nonterminal_symbols:
+                symbol.compute_expansion_length_bounds()
+        self._end_phase(phase='validate')
+        if not self.validator.errors and dry_run:
+            self._mark_semantically_meaningful_rules_and_symbols()
+            self._end_phase(phase='mark_semantically_meaningful')
+            self.path_counts = self._count_grammar_paths()
+            self._end_phase(phase='count_grammar_paths')
+        elif not self.validator.errors and factored_index:
+            self._mark_semantically_meaningful_rules_and_symbols()
+            self._end_phase(phase='mark_semantically_meaningful')
+            self.tag_signatures_for_symbols, self.tag_signatures_for_rules = self._compute_tag_signatures()
+            self._end_phase(phase='compute_tag_signatures')
+            # The expressible meanings of the grammar are simply the tag signatures of the start symbol
+            self.expressible_meanings = self._filter_expressible_meanings(
+                expressible_meanings=self._construct_expressible_meanings_from_tag_signatures()
+            )
+            self._end_phase(phase='construct_expressible_meanings')
+            self._save_tag_signatures(
+                tag_signatures_file_location='{path}.dag'.format(path=path_to_write_output_files_to)
+            )
+            self._save_expressible_meanings(
+                expressible_meanings_file_location='{path}.meanings'.format(path=path_to_write_output_files_to)
+            )
+            self._save_grammar(
+                grammar_file_location='{path}.grammar'.format(path=path_to_write_output_files_to)
+            )
+            self._write_stats_file(
+                stats_file_location='{path}.stats'.format(path=path_to_write_output_files_to)
+            )
+            self._end_phase(phase='save')
+        elif not self.validator.errors:
+            if precomputed_expressible_meanings is not None:
+                # The paths through this grammar were already collected (see write_sharded_bundle()), so we
+                # only need to rebuild its expressible meanings from them; a trie is built once the meanings
+                # have been filtered, such that it only ever holds the kept recipes
+                expressible_meanings = self._reconstruct_expressible_meanings(
+                    precomputed_expressible_meanings=precomputed_expressible_meanings
+                )
+            elif self.max_recipes_per_meaning is None:
+                # Operate over the grammar to build a trie data structure that efficiently stores all the
+                # semantically meaningful paths through the grammar (i.e., ones that pass through nonterminal
+                # symbols with tags)
+                self.trie = self._build_trie()
+                self._end_phase(phase='build_trie')
+                # Construct the set of expressible meanings for this grammar -- these pertain to each of the
+                # possible tagsets that generated content may come packaged with, and each expressible meaning
+                # bundles its associated tagset with recipes for producing that content (in the form of paths
+                # through the grammar)
+                expressible_meanings = self._construct_expressible_meanings()
+            else:
+                # If the recipes for each expressible meaning are capped, the meanings are instead constructed
+                # while the paths are being collected, such that only the kept recipes ever make it into a trie
+                expressible_meanings = self._construct_expressible_meanings_by_sampling_recipes()
+                self.trie = self._build_trie_of_recipes(expressible_meanings=expressible_meanings)
+                self._end_phase(phase='build_trie')
+            self.expressible_meanings = self._filter_expressible_meanings(expressible_meanings=expressible_meanings)
+            expressible_meanings_were_dropped = len(self.expressible_meanings) < len(expressible_meanings)
+            del expressible_meanings
+            # If nothing is to be written out, the expressible meanings (and the paths in the trie) are all
+            # that's wanted
+            if path_to_write_output_files_to is None:
+                self._end_phase(phase='construct_expressible_meanings')
+                return
+            if self.trie is None:
+                self.trie = self._build_trie_of_recipes(expressible_meanings=self.expressible_meanings)
+                self._end_phase(phase='build_trie')
+            # If the filter dropped any expressible meanings (e.g., for a shard of a sharded bundle), there's no
+            # need to write out the symbols and rules that only their recipes could reach
+            if expressible_meanings_were_dropped:
+                self._prune_grammar_to_kept_recipes()
+            # Likewise, there's no need to hold onto (or write out) their recipes in the trie
+            if expressible_meanings_were_dropped:
+                self.trie = self._prune_trie_to_kept_recipes()
+            # Bound the lengths of the outputs that can be generated by following each recipe, and thereby the
+            # lengths of the outputs that can express each expressible meaning
+            self._compute_expressible_meaning_length_bounds()
+            self._end_phase(phase='construct_expressible_meanings')
             # Save this trie to a file using the marisa_trie package; this file will be loaded at runtime
             # for use by Productionist
             if self.trie_output:
                 self._save_trie(trie_file_location='{path}.marisa'.format(path=path_to_write_output_files_to))
-            # Construct the set of expressible meanings for this grammar -- these pertain to each of the
-            # possible tagsets that generated content may come packaged with, and each expressible meaning
-            # bundles its associated tagset with recipes for producing that content (in the form of paths
-            # through the grammar)
-            self.expressible_meanings = self._construct_expressible_meanings()
             # Save this set of expressible meanings to a file (using my invented '.meanings' file
             # extension); this file will be loaded at runtime for use by Productionist
             self._save_expressible_meanings(
@@ -61,6 +223,7 @@ class Reductionist(object):
             self._write_stats_file(
                 stats_file_location='{path}.stats'.format(path=path_to_write_output_files_to)
             )
+            self._end_phase(phase='save')
 
     def _build_trie(self):
         """Operate over the associated grammar to build a trie containing all its semantically meaningful paths.
@@ -82,6 +245,49 @@ class Reductionist(object):
         # utilize during trie building that critically lets us prune the space of possible paths
         # through the grammar by only representing the semantically important parts of grammar paths
         # (i.e., the parts that flow through nonterminal symbols with tags)
+        self._mark_semantically_meaningful_rules_and_symbols()
+        self._end_phase(phase='mark_semantically_meaningful')
+        # Next, compile the set of semantically meaningful paths through the grammar; the result
+        # will be a set of unique paths, each represented as a tuple of the IDs of the production rules,
+        # in order, that must be executed to produce a given generable line of content (which will come
+        # with the set of tags attached to the named rules in the path); e.g., a path might look like
+        # this: (11, 9, 2, 7, 121), where the rules with IDs 11, 9, 2, 7, and 121 are named, while any
+        # rules that are not semantically meaningful are left implicit (they act as wildcards)
+        all_semantically_meaningful_paths = self._collect_grammar_paths_descending_from_nonterminal_symbol(
+            nonterminal_symbol=self.grammar.start_symbol
+        )
+        self._end_phase(phase='collect_grammar_paths', grammar_paths=all_semantically_meaningful_paths)
+        # To save on memory, exploit the amount of overlap between the nodes in these paths by
+        # building a trie that efficiently stores all the path strings; this is the only place that
+        # paths get encoded as strings (e.g., u'11,9,2,7,121'), other than when they're written out
+        if self.verbosity > 0:
+            print "Building a trie..."
+        rule_id_strings = [unicode(rule.id) for rule in self.grammar.production_rules]
+        path_strings = [
+            u','.join(map(rule_id_strings.__getitem__, path)) for path in all_semantically_meaningful_paths
+        ]
+        trie = marisa_trie.Trie(path_strings)
+        # Hold onto the path (tuple) for each trie key, so that nothing has to be parsed back out of the trie
+        self._grammar_paths_for_trie_keys = [None] * len(trie)
+        # Note: since the set of paths hasn't changed, it iterates in the same order as above
+        for path, path_string in itertools.izip(all_semantically_meaningful_paths, path_strings):
+            self._grammar_paths_for_trie_keys[trie[path_string]] = path
+        return trie
+
+    def _filter_expressible_meanings(self, expressible_meanings):
+        """Return the given expressible meanings that pass this Reductionist's filter (if any), renumbered."""
+        if self.expressible_meaning_filter is None:
+            return expressible_meanings
+        # Note: since Productionist indexes expressible meanings by ID, the kept meanings are renumbered
+        # densely; for a trie index, the paths of the dropped meanings (and the parts of the grammar that
+        # only they reach) get pruned afterward (see self._prune_grammar_to_kept_recipes())
+        kept_expressible_meanings = [m for m in expressible_meanings if self.expressible_meaning_filter(m.tags)]
+        for i, expressible_meaning in enumerate(kept_expressible_meanings):
+            expressible_meaning.id = i
+        return kept_expressible_meanings
+
+    def _mark_semantically_meaningful_rules_and_symbols(self):
+        """Determine which production rules and nonterminal symbols in the grammar are semantically meaningful."""
         for rule in self.grammar.production_rules:
             self._determine_if_production_rule_is_semantically_meaningful(production_rule=rule)
         for rule in self.grammar.production_rules:
@@ -90,22 +296,272 @@ class Reductionist(object):
             )
         for symbol in self.grammar.nonterminal_symbols:
             self._determine_if_nonterminal_symbol_is_semantically_meaningful(nonterminal_symbol=symbol)
-        # First, compile the set of semantically meaningful paths through the grammar; the result
-        # will be a list of unique paths, each represented as a string representing the sequence
-        # of production rules, in order, that must be executed to produce a given generable line
-        # of content (which will come with the set of tags attached to the named rules in the path
-        # string); rules are named by their IDs; e.g., a path string might look like this:
-        # u'11,9,*,*,*,2,7,*,121', where the rules with IDs 11, 9, 2, 7, and 121 are named, while four
-        # other rules that are not semantically meaningful are only referenced using wildcards ('*')
-        all_semantically_meaningful_paths = self._collect_grammar_paths_descending_from_nonterminal_symbol(
-            nonterminal_symbol=self.grammar.start_symbol
+
+    def _count_grammar_paths(self):
+        """Count the semantically meaningful paths through the grammar, without enumerating them.
+
+        This mirrors the path collection carried out by self._collect_grammar_paths_descending_from_nonterminal_symbol()
+        using a counting dynamic program over the grammar (which is a DAG, given that it passed validation). The
+        paths collected for a symbol comprise the (nonempty) paths collected for each of its semantically
+        meaningful rules, plus the empty path if any of its rules is not semantically meaningful; the paths
+        collected for a semantically meaningful rule are formed by taking one path for each semantically
+        meaningful symbol in its body and keeping every combination that isn't entirely empty (or, if there
+        are no such combinations, the single path naming only that rule). The counts are exact, except when
+        the same subgrammar appears more than once within a single path (e.g., a rule body that references
+        the same symbol twice), in which case different combinations may yield the same path and the counts
+        are upper bounds.
+
+        In addition to the count for each symbol and rule, this estimates the number of times that each symbol
+        and rule is expanded across all complete paths (i.e., ones descending from the start symbol), which
+        indicates how much each one contributes to the total (this estimate ignores the dropping of entirely
+        empty combinations, and a symbol that is expanded twice in a path counts twice for that path).
+
+        Returns a PathCounts object.
+        """
+        if self.verbosity > 0:
+            print "Counting grammar paths..."
+        # Map each symbol to a tuple (number of nonempty paths, whether the empty path is included), and each
+        # semantically meaningful rule to its number of paths (which are all nonempty)
+        counts_for_symbols = {}
+        counts_for_rules = {}
+
+        def count_paths_for_symbol(symbol):
+            """Return a tuple (number of nonempty paths, whether the empty path is included) for the given symbol."""
+            if symbol in counts_for_symbols:
+                return counts_for_symbols[symbol]
+            n_nonempty_paths = 0
+            includes_empty_path = False
+            for rule in symbol.production_rules:
+                if rule.semantically_meaningful:
+                    n_nonempty_paths += count_paths_for_rule(rule)
+                else:
+                    includes_empty_path = True
+            counts_for_symbols[symbol] = (n_nonempty_paths, includes_empty_path)
+            return counts_for_symbols[symbol]
+
+        def count_paths_for_rule(rule):
+            """Return the number of (nonempty) paths for the given semantically meaningful rule."""
+            if rule in counts_for_rules:
+                return counts_for_rules[rule]
+            n_combinations = 1
+            n_entirely_empty_combinations = 1
+            for symbol in self._semantically_meaningful_symbols_in_rule_body(production_rule=rule):
+                n_nonempty_paths, includes_empty_path = count_paths_for_symbol(symbol)
+                n_combinations *= n_nonempty_paths + includes_empty_path
+                n_entirely_empty_combinations *= includes_empty_path
+            counts_for_rules[rule] = (n_combinations - n_entirely_empty_combinations) or 1
+            return counts_for_rules[rule]
+
+        n_nonempty_paths, includes_empty_path = count_paths_for_symbol(self.grammar.start_symbol)
+        total = n_nonempty_paths + includes_empty_path
+        # Now propagate, from the start symbol down, the number of contexts (i.e., combinations of paths
+        # for the rest of a complete path) in which each symbol is expanded; we process symbols in an order
+        # such that a symbol is only processed once every symbol that references it has been
+        contexts_for_symbols = collections.defaultdict(int)
+        contexts_for_symbols[self.grammar.start_symbol] = 1
+        contexts_for_rules = {}
+        for symbol in self._semantically_meaningful_symbols_in_topological_order():
+            for rule in symbol.production_rules:
+                if not rule.semantically_meaningful:
+                    continue
+                contexts_for_rules[rule] = contexts_for_symbols[symbol]
+                body_symbols = self._semantically_meaningful_symbols_in_rule_body(production_rule=rule)
+                sizes = [sum(counts_for_symbols[s]) for s in body_symbols]
+                for i, body_symbol in enumerate(body_symbols):
+                    n_contexts = contexts_for_rules[rule]
+                    for j, size in enumerate(sizes):
+                        if j != i:
+                            n_contexts *= size
+                    contexts_for_symbols[body_symbol] += n_contexts
+        return PathCounts(
+            total=total,
+            counts_for_symbols={symbol: sum(counts) for symbol, counts in counts_for_symbols.iteritems()},
+            counts_for_rules=counts_for_rules,
+            expansions_of_symbols={
+                symbol: contexts_for_symbols[symbol] * counts_for_symbols[symbol][0]
+                for symbol in counts_for_symbols
+            },
+            expansions_of_rules={
+                rule: contexts_for_rules.get(rule, 0) * counts_for_rules[rule] for rule in counts_for_rules
+            }
         )
-        # To save on memory, exploit the amount of overlap between the nodes in these paths by
-        # building a trie that efficiently stores all the path strings
+
+    def _compute_tag_signatures(self):
+        """Annotate each semantically meaningful symbol and rule with the tag signatures of the paths descending
+        from it, along with the number of paths that yield each one.
+
+        The tag signature of a path is the set of tags accumulated by executing the rules on it, i.e., the
+        union of the tags of those rules. Mirroring the path collection carried out by
+        self._collect_grammar_paths_descending_from_nonterminal_symbol(), the signatures of a symbol are
+        those of its semantically meaningful rules, plus the empty signature (for the empty path) if any of
+        its rules is not semantically meaningful; the signatures of a semantically meaningful rule are formed
+        by taking the union of its own tags with one signature for each semantically meaningful symbol in its
+        body, with counts multiplying, except that the combination in which every symbol takes the empty path
+        is dropped (unless it's the only combination, in which case the rule yields the single path naming
+        only itself). As in self._count_grammar_paths(), the counts are upper bounds when the same subgrammar
+        appears more than once within a single path.
+
+        Alongside the counts, this bounds the lengths of the outputs that can be generated by following the paths
+        with each signature (and, for the start symbol, these become the length bounds of the expressible
+        meanings, which are set as self.length_bounds_for_tag_signatures); a symbol that takes the empty path is
+        expanded using one of its rules that aren't semantically meaningful. Since the bounds of a dropped
+        combination can't be subtracted back out, the bounds for a signature may be looser than its paths.
+
+        Returns a tuple (signatures for symbols, signatures for rules), each a dictionary mapping symbols
+        (or rules) to dictionaries that map signatures (frozensets of integer tag IDs) to path counts.
+        """
         if self.verbosity > 0:
-            print "Building a trie..."
-        trie = marisa_trie.Trie(all_semantically_meaningful_paths)
-        return trie
+            print "Computing tag signatures..."
+        tag_to_id = self.grammar.tag_to_id
+        signatures_for_symbols = {}
+        signatures_for_rules = {}
+        # Map each symbol to a dictionary mapping each of its signatures to a tuple (minimum length, maximum length)
+        length_bounds_for_symbols = {}
+
+        def merge_length_bounds(length_bounds, other_length_bounds):
+            """Return the tightest length bounds covering both of the given ones (the first of which may be None)."""
+            if length_bounds is None:
+                return other_length_bounds
+            return min(length_bounds[0], other_length_bounds[0]), max(length_bounds[1], other_length_bounds[1])
+
+        # Process symbols such that each one comes after every symbol that it references
+        for symbol in reversed(self._semantically_meaningful_symbols_in_topological_order()):
+            signatures_for_this_symbol = collections.defaultdict(int)
+            length_bounds_for_this_symbol = {}
+            # Rules that are not semantically meaningful are all represented by the (one) empty path
+            wildcard_rules = [rule for rule in symbol.production_rules if not rule.semantically_meaningful]
+            if wildcard_rules:
+                signatures_for_this_symbol[frozenset()] += 1
+                length_bounds_for_this_symbol[frozenset()] = (
+                    min(rule.min_length for rule in wildcard_rules), max(rule.max_length for rule in wildcard_rules)
+                )
+            for rule in symbol.production_rules:
+                if not rule.semantically_meaningful:
+                    continue
+                rule_tags = frozenset(int(tag_to_id[tag]) for tag in rule.tags)
+                combinations = {rule_tags: 1}
+                # The rule's terminal symbols and the symbols in its body that aren't semantically meaningful
+                # contribute the same lengths to every combination
+                fixed_min_length = fixed_max_length = 0
+                for body_symbol in rule.body:
+                    if type(body_symbol) is unicode:
+                        fixed_min_length += len(body_symbol)
+                        fixed_max_length += len(body_symbol)
+                    elif not body_symbol.semantically_meaningful:
+                        fixed_min_length += body_symbol.min_length
+                        fixed_max_length += body_symbol.max_length
+                length_bounds_for_combinations = {rule_tags: (fixed_min_length, fixed_max_length)}
+                entirely_empty_combination_possible = True
+                for body_symbol in self._semantically_meaningful_symbols_in_rule_body(production_rule=rule):
+                    extended_combinations = collections.defaultdict(int)
+                    extended_length_bounds_for_combinations = {}
+                    for signature, count in combinations.iteritems():
+                        min_length, max_length = length_bounds_for_combinations[signature]
+                        for body_symbol_signature, body_symbol_count in signatures_for_symbols[body_symbol].iteritems():
+                            extended_signature = signature | body_symbol_signature
+                            extended_combinations[extended_signature] += count * body_symbol_count
+                            body_symbol_min_length, body_symbol_max_length = (
+                                length_bounds_for_symbols[body_symbol][body_symbol_signature]
+                            )
+                            extended_length_bounds_for_combinations[extended_signature] = merge_length_bounds(
+                                length_bounds=extended_length_bounds_for_combinations.get(extended_signature),
+                                other_length_bounds=(
+                                    min_length + body_symbol_min_length, max_length + body_symbol_max_length
+                                )
+                            )
+                    combinations = extended_combinations
+                    length_bounds_for_combinations = extended_length_bounds_for_combinations
+                    entirely_empty_combination_possible &= any(
+                        not r.semantically_meaningful for r in body_symbol.production_rules
+                    )
+                if entirely_empty_combination_possible:
+                    combinations[rule_tags] -= 1
+                    if not combinations[rule_tags]:
+                        del combinations[rule_tags]
+                signatures_for_rules[rule] = dict(combinations) if combinations else {rule_tags: 1}
+                for signature, count in signatures_for_rules[rule].iteritems():
+                    signatures_for_this_symbol[signature] += count
+                    length_bounds_for_this_symbol[signature] = merge_length_bounds(
+                        length_bounds=length_bounds_for_this_symbol.get(signature),
+                        other_length_bounds=length_bounds_for_combinations[signature]
+                    )
+            signatures_for_symbols[symbol] = dict(signatures_for_this_symbol)
+            length_bounds_for_symbols[symbol] = length_bounds_for_this_symbol
+        self.length_bounds_for_tag_signatures = length_bounds_for_symbols.get(self.grammar.start_symbol, {})
+        return signatures_for_symbols, signatures_for_rules
+
+    def _construct_expressible_meanings_from_tag_signatures(self):
+        """Construct the set of expressible meanings for a factored index, one for each tag signature of the
+        start symbol.
+
+        Since a factored index holds no enumerated paths, the recipes field of each expressible meaning is
+        written out as a wildcard ('*'), which signals that Productionist is to sample its recipes from the
+        tag signatures (and which would fail loudly in a Productionist that doesn't support factored indices).
+        """
+        if self.verbosity > 0:
+            print "Constructing expressible meanings..."
+        id_to_tag = self.grammar.id_to_tag
+        signatures = sorted(
+            self.tag_signatures_for_symbols.get(self.grammar.start_symbol, {frozenset(): 1}),
+            key=lambda signature: (len(signature), sorted(signature))
+        )
+        expressible_meanings = []
+        for meaning_id, signature in enumerate(signatures):
+            expressible_meaning = ExpressibleMeaning(
+                meaning_id=meaning_id, tags={id_to_tag[str(tag_id)] for tag_id in signature},
+                initial_grammar_path='*'
+            )
+            expressible_meaning.min_length, expressible_meaning.max_length = self.length_bounds_for_tag_signatures.get(
+                signature, (self.grammar.start_symbol.min_length, self.grammar.start_symbol.max_length)
+            )
+            expressible_meanings.append(expressible_meaning)
+        return expressible_meanings
+
+    @staticmethod
+    def _semantically_meaningful_symbols_in_rule_body(production_rule):
+        """Return the semantically meaningful nonterminal symbols in the body of the given rule, in order."""
+        return [
+            symbol for symbol in production_rule.body if type(symbol) is not unicode and symbol.semantically_meaningful
+        ]
+
+    def _semantically_meaningful_symbols_in_topological_order(self):
+        """Return the semantically meaningful symbols that are reachable from the start symbol (via semantically
+        meaningful rules), ordered such that every symbol comes after all the symbols that reference it.
+        """
+        ordered_symbols = []
+        visited_symbols = set()
+        # Do an iterative depth-first traversal to produce a postorder, and then reverse it
+        stack = [(self.grammar.start_symbol, False)]
+        while stack:
+            symbol, children_done = stack.pop()
+            if children_done:
+                ordered_symbols.append(symbol)
+                continue
+            if symbol in visited_symbols:
+                continue
+            visited_symbols.add(symbol)
+            stack.append((symbol, True))
+            for rule in symbol.production_rules:
+                if rule.semantically_meaningful:
+                    for body_symbol in self._semantically_meaningful_symbols_in_rule_body(production_rule=rule):
+                        if body_symbol not in visited_symbols:
+                            stack.append((body_symbol, False))
+        ordered_symbols.reverse()
+        return ordered_symbols
+
+    def _end_phase(self, phase, grammar_paths=None):
+        """Record the time taken by the given indexing phase (and, if memory accounting is engaged, a breakdown
+        of the memory currently taken up), and start the clock for the next phase.
+        """
+        self.phase_timings.append((phase, time.time()-self._phase_start_time))
+        if self.memory_accounting:
+            self.memory_snapshots.append(
+                (phase, memory_accounting.reductionist_memory_breakdown(
+                    reductionist_object=self, grammar_paths=grammar_paths
+                ))
+            )
+        # Note: the time taken to account for memory is excluded from the timing of the next phase
+        self._phase_start_time = time.time()
 
     def _determine_if_production_rule_is_semantically_meaningful(self, production_rule):
         """Return whether the given production rule is semantically meaningful.
@@ -174,7 +630,7 @@ class Reductionist(object):
             print "{whitespace}Collecting grammar paths descending from symbol [[{symbol_name}]]".format(
                 whitespace=n_tabs_for_debug * '  ', symbol_name=nonterminal_symbol.name
             )
-        grammar_paths = set()
+        grammar_paths = set()  # Of tuples of rule IDs
         for rule in nonterminal_symbol.production_rules:
             grammar_paths |= self._collect_grammar_paths_descending_from_production_rule(
                 production_rule=rule, n_tabs_for_debug=n_tabs_for_debug + 1
@@ -196,25 +652,18 @@ class Reductionist(object):
                 # If type(symbol) == unicode, then that's a terminal symbol (i.e., it's just a string)
             ))
             if cartesian_product_of_all_symbols_in_this_rule_body:
-                # Now prepend these partial rule chains with the ID for this rule (if it is semantically
-                # meaningful, otherwise a wildcard, denoted by '*') and then return this
-                # string as a partial rule chain
+                # Now prepend the ID for this rule to each combination of partial rule chains that isn't
+                # entirely empty (concatenating the chains in the combination), and then return these
+                # as this rule's partial rule chains
                 partial_rule_chains = set()
                 for rule_combination in cartesian_product_of_all_symbols_in_this_rule_body:
-                    rule_combination = [combo for combo in rule_combination if combo]
                     if any(rule_combination):
-                        partial_rule_chain = u"{my_id}{partial_chain}".format(
-                            my_id='{},'.format(production_rule.id) if production_rule.semantically_meaningful else '',
-                            partial_chain=','.join(rule_combination)
-                        )
-                        partial_rule_chains.add(partial_rule_chain)
-                partial_rule_chains = partial_rule_chains if partial_rule_chains else {unicode(production_rule.id)}
-            elif production_rule.semantically_meaningful:
-                # This production rule is semantically meaningful, but nothing below it is; we
-                # can simply return a list containing only the ID of this rule
-                partial_rule_chains = {u"{}".format(production_rule.id)}
+                        partial_rule_chains.add(tuple(itertools.chain((production_rule.id,), *rule_combination)))
+                partial_rule_chains = partial_rule_chains if partial_rule_chains else {(production_rule.id,)}
             else:
-                partial_rule_chains = {u''}
+                # This production rule is semantically meaningful, but nothing below it is; we
+                # can simply return a set containing only the chain naming this rule
+                partial_rule_chains = {(production_rule.id,)}
         else:
             # This is a terminal rule, which means we don't need to keep track of it in any rule chain
             # that it is a part of (since we only want to keep track of rules that have symbols in their
@@ -223,7 +672,7 @@ class Reductionist(object):
             # just represent it in a rule chain using a wildcard symbol; later on, this will allow us
             # to determine which rule chains are semantically equivalent, since we can just throw out
             # the wildcard symbols and match the IDs of semantically meaningful rules
-            partial_rule_chains = {u''}
+            partial_rule_chains = {()}
         return partial_rule_chains
 
     def _save_trie(self, trie_file_location):
@@ -245,93 +694,395 @@ class Reductionist(object):
         the trie, collecting all the tags attached to each named rule in that path, and then adding
         the path to list of paths associated with the expressible meaning with that same
         tagset (which will have to be instantiated the first time each tagset is encountered).
+
+        Paths are held by their trie keys here; they only get encoded for the .meanings file (as either
+        the trie keys themselves or the expanded paths) in self._save_expressible_meanings().
         """
         if self.verbosity > 0:
             print "Constructing expressible meanings..."
         expressible_meanings = []
-        for path_string, trie_key_for_that_path_string in self.trie.iteritems():
-            if path_string:
-                rules_on_that_path = [self.grammar.production_rules[int(i)] for i in path_string.split(',')]
-            else:
-                rules_on_that_path = []  # An empty path, in the case of paths through symbols with no tags
+        expressible_meanings_for_tagsets = {}
+        production_rules = self.grammar.production_rules
+        # Note: we iterate over the trie (rather than over its keys in numeric order) because the order in
+        # which expressible meanings are first encountered determines their IDs
+        for _, trie_key_for_that_path in self.trie.iteritems():
             all_tags_for_that_path = set()
-            for rule in rules_on_that_path:
-                all_tags_for_that_path |= set(rule.tags)
-            if self.trie_output:
-                # Use the trie key
-                grammar_path = str(trie_key_for_that_path_string)
-            else:
-                # Use the expanded trie key, i.e., the list of production rule IDs constituting the grammar path
-                grammar_path = path_string
+            # An empty path, in the case of paths through symbols with no tags, yields no tags; note: the tags
+            # are accumulated exactly this way so that the set's iteration order, which determines the order
+            # in which they're written out, stays the same
+            for rule_id in self._grammar_paths_for_trie_keys[trie_key_for_that_path]:
+                all_tags_for_that_path |= set(production_rules[rule_id].tags)
             try:
                 # If an expressible meaning already exists for this tagset, simply
                 # append the trie key for this path to its listing of associated paths
-                expressible_meaning = next(em for em in expressible_meanings if em.tags == all_tags_for_that_path)
-                expressible_meaning.grammar_paths.append(grammar_path)
-            except StopIteration:
+                expressible_meaning = expressible_meanings_for_tagsets[frozenset(all_tags_for_that_path)]
+                expressible_meaning.grammar_paths.append(trie_key_for_that_path)
+                expressible_meaning.n_grammar_paths_found += 1
+            except KeyError:
                 # We haven't constructed an expressible meaning for that tagset yet, so do
                 # so now and pass along this path trie key as its first associated path (more will
                 # likely be collected as this loop proceeds)
                 meaning_id = len(expressible_meanings)
-                expressible_meanings.append(
-                    ExpressibleMeaning(
-                        meaning_id=meaning_id, tags=all_tags_for_that_path,
+                expressible_meaning = ExpressibleMeaning(
+                    meaning_id=meaning_id, tags=all_tags_for_that_path,
+                    initial_grammar_path=trie_key_for_that_path
+                )
+                expressible_meanings.append(expressible_meaning)
+                expressible_meanings_for_tagsets[frozenset(all_tags_for_that_path)] = expressible_meaning
+        return expressible_meanings
+
+    def _construct_expressible_meanings_by_sampling_recipes(self):
+        """Construct a set of expressible meanings while collecting the semantically meaningful paths through the
+        grammar, keeping at most self.max_recipes_per_meaning recipes for each meaning.
+
+        Rather than collecting every path (and building a trie of them) before grouping them into expressible
+        meanings, as self._build_trie() and self._construct_expressible_meanings() do, we collect the paths that
+        descend from one top-level production rule at a time and stream them into the meanings, each of which
+        keeps a uniform sample of its recipes by reservoir sampling, using a pseudorandom number generator seeded
+        with self.recipe_sampling_seed. Since every path that isn't empty starts with the top-level rule that it
+        descends from, the batches are disjoint, and each one can be let go of before the next is collected;
+        as such, the paths held at any one time are those descending from a single top-level symbol, plus the
+        kept recipes.
+
+        The kept recipes are held as paths (tuples of rule IDs) here; see self._build_trie_of_recipes().
+        """
+        if self.verbosity > 0:
+            print "Indexing grammar..."
+        self._mark_semantically_meaningful_rules_and_symbols()
+        self._end_phase(phase='mark_semantically_meaningful')
+        if self.verbosity > 0:
+            print "Constructing expressible meanings (sampling up to {n} recipes for each)...".format(
+                n=self.max_recipes_per_meaning
+            )
+        expressible_meanings = []
+        expressible_meanings_for_tagsets = {}
+        production_rules = self.grammar.production_rules
+        max_recipes_per_meaning = self.max_recipes_per_meaning
+        random_number_generator = random.Random(self.recipe_sampling_seed)
+        # Every top-level rule that isn't semantically meaningful yields the empty path, which must only be
+        # counted once
+        empty_path_collected = False
+        for top_level_rule in self.grammar.start_symbol.production_rules:
+            grammar_paths = self._collect_grammar_paths_descending_from_production_rule(
+                production_rule=top_level_rule, n_tabs_for_debug=1
+            )
+            if () in grammar_paths:
+                if empty_path_collected:
+                    grammar_paths.discard(())
+                empty_path_collected = True
+            for grammar_path in grammar_paths:
+                all_tags_for_that_path = set()
+                for rule_id in grammar_path:
+                    all_tags_for_that_path |= set(production_rules[rule_id].tags)
+                expressible_meaning = expressible_meanings_for_tagsets.get(frozenset(all_tags_for_that_path))
+                if expressible_meaning is None:
+                    expressible_meaning = ExpressibleMeaning(
+                        meaning_id=len(expressible_meanings), tags=all_tags_for_that_path,
                         initial_grammar_path=grammar_path
                     )
-                )
+                    expressible_meanings.append(expressible_meaning)
+                    expressible_meanings_for_tagsets[frozenset(all_tags_for_that_path)] = expressible_meaning
+                    continue
+                expressible_meaning.n_grammar_paths_found += 1
+                if len(expressible_meaning.grammar_paths) < max_recipes_per_meaning:
+                    expressible_meaning.grammar_paths.append(grammar_path)
+                else:
+                    # Keep this path with probability (cap / paths found), in place of a uniformly selected kept
+                    # path (i.e., reservoir sampling)
+                    i = random_number_generator.randrange(expressible_meaning.n_grammar_paths_found)
+                    if i < max_recipes_per_meaning:
+                        expressible_meaning.grammar_paths[i] = grammar_path
+            del grammar_paths
+        self._end_phase(phase='collect_grammar_paths')
+        return expressible_meanings
+
+    def _reconstruct_expressible_meanings(self, precomputed_expressible_meanings):
+        """Return expressible meanings built from the given list of (tags, grammar paths, number of paths found)
+        tuples, whose paths are tuples of the IDs of rules in this grammar (see write_sharded_bundle()).
+
+        The kept recipes are held as paths (tuples of rule IDs) here; see self._build_trie_of_recipes().
+        """
+        self._mark_semantically_meaningful_rules_and_symbols()
+        self._end_phase(phase='mark_semantically_meaningful')
+        expressible_meanings = []
+        for tags, grammar_paths, n_grammar_paths_found in precomputed_expressible_meanings:
+            expressible_meaning = ExpressibleMeaning(
+                meaning_id=len(expressible_meanings), tags=tags, initial_grammar_path=None,
+                grammar_paths=list(grammar_paths)
+            )
+            expressible_meaning.n_grammar_paths_found = n_grammar_paths_found
+            expressible_meanings.append(expressible_meaning)
+        self._end_phase(phase='collect_grammar_paths')
         return expressible_meanings
 
+    def _compute_expressible_meaning_length_bounds(self):
+        """Determine the minimum and maximum lengths (in characters) of the outputs that can be generated for
+        each expressible meaning, by bounding the lengths of the outputs that can be generated by following
+        each of its recipes.
+        """
+        # When following a recipe, Productionist expands a symbol that doesn't head the next rule on the path
+        # with one of its rules that aren't semantically meaningful (a 'wildcard rule'), and so the lengths
+        # that such a symbol can contribute are bounded by its wildcard rules alone
+        wildcard_length_bounds_for_symbols = {}
+        for symbol in self.grammar.nonterminal_symbols:
+            wildcard_rules = [rule for rule in symbol.production_rules if not rule.semantically_meaningful]
+            if wildcard_rules:
+                wildcard_length_bounds_for_symbols[symbol] = (
+                    min(rule.min_length for rule in wildcard_rules), max(rule.max_length for rule in wildcard_rules)
+                )
+            else:
+                wildcard_length_bounds_for_symbols[symbol] = (symbol.min_length, symbol.max_length)
+        production_rules = self.grammar.production_rules
+        grammar_paths_for_trie_keys = self._grammar_paths_for_trie_keys
+        for expressible_meaning in self.expressible_meanings:
+            recipe_length_bounds = [
+                self._length_bounds_for_grammar_path(
+                    grammar_path=[production_rules[rule_id] for rule_id in grammar_paths_for_trie_keys[trie_key]],
+                    wildcard_length_bounds_for_symbols=wildcard_length_bounds_for_symbols
+                )
+                for trie_key in expressible_meaning.grammar_paths
+            ]
+            expressible_meaning.min_length = min(bounds[0] for bounds in recipe_length_bounds)
+            expressible_meaning.max_length = max(bounds[1] for bounds in recipe_length_bounds)
+
+    def _length_bounds_for_grammar_path(self, grammar_path, wildcard_length_bounds_for_symbols):
+        """Return a tuple (minimum length, maximum length) for the outputs that can be generated by following the
+        given semantically meaningful path (a list of production rules) from the start symbol.
+
+        This mirrors the way that Productionist follows a recipe: a symbol that heads the next rule on the path is
+        expanded using that rule, and any other symbol is expanded using one of its wildcard rules.
+        """
+        remaining_path = collections.deque(grammar_path)
+
+        def length_bounds_for_symbol(symbol):
+            """Return a tuple (minimum length, maximum length) for the expansions of the given symbol."""
+            if not remaining_path or remaining_path[0].head is not symbol:
+                return wildcard_length_bounds_for_symbols[symbol]
+            rule = remaining_path.popleft()
+            min_length = max_length = 0
+            for body_symbol in rule.body:
+                if type(body_symbol) is unicode:
+                    min_length += len(body_symbol)
+                    max_length += len(body_symbol)
+                else:
+                    symbol_min_length, symbol_max_length = length_bounds_for_symbol(body_symbol)
+                    min_length += symbol_min_length
+                    max_length += symbol_max_length
+            return min_length, max_length
+
+        return length_bounds_for_symbol(self.grammar.start_symbol)
+
+    def _prune_grammar_to_kept_recipes(self):
+        """Drop the symbols and rules that can no longer be reached when following the recipes of the kept
+        expressible meanings, renumbering the remaining ones (and the paths that reference them).
+
+        When following a recipe, Productionist expands a symbol with the next rule on the path, if that rule
+        is headed by the symbol, and otherwise with one of its wildcard rules; as such, the rules that can be
+        reached are the rules on the kept paths, plus the wildcard rules of every symbol that can be reached
+        (except for the start symbol, whose wildcard rules can only be reached by following an empty path,
+        since every other path starts with a rule headed by the start symbol).
+        """
+        production_rules = self.grammar.production_rules
+        grammar_paths_for_trie_keys = self._grammar_paths_for_trie_keys
+        rules_on_kept_paths = set()
+        empty_path_is_kept = False
+        for expressible_meaning in self.expressible_meanings:
+            for trie_key in expressible_meaning.grammar_paths:
+                if not grammar_paths_for_trie_keys[trie_key]:
+                    empty_path_is_kept = True
+                rules_on_kept_paths.update(
+                    production_rules[rule_id] for rule_id in grammar_paths_for_trie_keys[trie_key]
+                )
+        reachable_symbols = set()
+        reachable_rules = set()
+        symbols_to_visit = [self.grammar.start_symbol]
+        while symbols_to_visit:
+            symbol = symbols_to_visit.pop()
+            if symbol in reachable_symbols:
+                continue
+            reachable_symbols.add(symbol)
+            for rule in symbol.production_rules:
+                if rule in rules_on_kept_paths or (
+                    not rule.semantically_meaningful and (symbol is not self.grammar.start_symbol or empty_path_is_kept)
+                ):
+                    reachable_rules.add(rule)
+                    symbols_to_visit.extend(s for s in rule.body if type(s) is not unicode)
+        old_rule_ids = {rule: rule.id for rule in reachable_rules}
+        self.grammar.restrict_to_symbols_and_rules(
+            nonterminal_symbols=reachable_symbols, production_rules=reachable_rules
+        )
+        # Renumber the rules on the kept paths; the paths of dropped meanings are released
+        new_rule_ids = {}
+        for rule in self.grammar.production_rules:
+            new_rule_ids[old_rule_ids[rule]] = rule.id
+        kept_trie_keys = {trie_key for m in self.expressible_meanings for trie_key in m.grammar_paths}
+        for trie_key in xrange(len(grammar_paths_for_trie_keys)):
+            if trie_key in kept_trie_keys:
+                grammar_paths_for_trie_keys[trie_key] = tuple(
+                    new_rule_ids[rule_id] for rule_id in grammar_paths_for_trie_keys[trie_key]
+                )
+            else:
+                grammar_paths_for_trie_keys[trie_key] = None
+        # Since dropping rules may have narrowed the terminal expansions of the remaining symbols, recount them
+        # (and rebound their lengths)
+        self.total_generable_outputs = self.grammar.start_symbol.count_generable_variants()
+        for symbol in self.grammar.nonterminal_symbols:
+            symbol.compute_expansion_length_bounds()
+        if self.verbosity > 0:
+            print "Pruned the grammar to {n_symbols} symbols and {n_rules} rules...".format(
+                n_symbols=len(self.grammar.nonterminal_symbols), n_rules=len(self.grammar.production_rules)
+            )
+
+    def _prune_trie_to_kept_recipes(self):
+        """Build a trie holding only the paths that are kept as recipes for the expressible meanings, and update
+        the meanings to reference their paths by their keys in that trie.
+        """
+        grammar_paths_for_trie_keys = self._grammar_paths_for_trie_keys
+        for expressible_meaning in self.expressible_meanings:
+            expressible_meaning.grammar_paths = [
+                grammar_paths_for_trie_keys[trie_key] for trie_key in expressible_meaning.grammar_paths
+            ]
+        return self._build_trie_of_recipes(expressible_meanings=self.expressible_meanings)
+
+    def _build_trie_of_recipes(self, expressible_meanings):
+        """Build a trie holding the recipes of the given expressible meanings, whose recipes are held as paths
+        (tuples of rule IDs), and update the meanings to reference their paths by their keys in that trie.
+        """
+        rule_id_strings = [unicode(rule.id) for rule in self.grammar.production_rules]
+        path_strings = {}
+        for expressible_meaning in expressible_meanings:
+            for grammar_path in expressible_meaning.grammar_paths:
+                if grammar_path not in path_strings:
+                    path_strings[grammar_path] = u','.join(map(rule_id_strings.__getitem__, grammar_path))
+        trie = marisa_trie.Trie(path_strings.values())
+        self._grammar_paths_for_trie_keys = [None] * len(trie)
+        trie_keys = {}
+        for grammar_path, path_string in path_strings.iteritems():
+            trie_key = trie[path_string]
+            trie_keys[grammar_path] = trie_key
+            self._grammar_paths_for_trie_keys[trie_key] = grammar_path
+        for expressible_meaning in expressible_meanings:
+            expressible_meaning.grammar_paths = [trie_keys[p] for p in expressible_meaning.grammar_paths]
+        return trie
+
+    def _save_tag_signatures(self, tag_signatures_file_location):
+        """Write out a JSON file holding the tag signatures of a factored index, for use at runtime by Productionist.
+
+        Each signature is written as a comma-separated string of tag IDs (just like the tags field of a line
+        in a .meanings file), and it maps to the number of paths yielding it.
+        """
+        if self.verbosity > 0:
+            print "Saving tag-signatures file..."
+
+        def signatures_to_dictionary(signatures):
+            """Return a JSON-serializable dictionary for the given tag signatures."""
+            return {
+                ','.join(str(tag_id) for tag_id in sorted(signature)): count
+                for signature, count in signatures.iteritems()
+            }
+
+        # Stream the file out one symbol or rule at a time, rather than building a dictionary for the whole index;
+        # note that json.dumps() uses the C encoder, whereas json.dump() doesn't, which matters for a large index
+        with self._open_output_file(output_file_location=tag_signatures_file_location) as outfile:
+            outfile.write('{"nonterminal_symbols": {')
+            for i, (symbol, signatures) in enumerate(self.tag_signatures_for_symbols.iteritems()):
+                outfile.write('{separator}"{id}": {signatures}'.format(
+                    separator=', ' if i else '', id=symbol.id,
+                    signatures=json.dumps(signatures_to_dictionary(signatures))
+                ))
+            outfile.write('}, "production_rules": {')
+            for i, (rule, signatures) in enumerate(self.tag_signatures_for_rules.iteritems()):
+                outfile.write('{separator}"{id}": {signatures}'.format(
+                    separator=', ' if i else '', id=rule.id,
+                    signatures=json.dumps(signatures_to_dictionary(signatures))
+                ))
+            outfile.write('}}')
+
     def _save_expressible_meanings(self, expressible_meanings_file_location):
         """Save a set of constructed expressible meanings to a file."""
         if self.verbosity > 0:
             print "Saving expressible meanings file..."
-        f = open(expressible_meanings_file_location, 'w')
+        f = self._open_output_file(output_file_location=expressible_meanings_file_location)
         tag_to_id = self.grammar.tag_to_id
+        grammar_paths_for_trie_keys = self._grammar_paths_for_trie_keys
         for expressible_meaning in self.expressible_meanings:
-            if not self.trie_output:
-                all_paths_str = '|'.join(
-                    self.trie.restore_key(path_trie_key) for path_trie_key in expressible_meaning.grammar_paths
-                )
+            # Write out either the trie keys for the paths or the expanded paths (i.e., the lists of production
+            # rule IDs constituting them), depending on self.trie_output; note that in a factored index, the
+            # paths field is already in the form that we want to write out (see
+            # self._construct_expressible_meanings_from_tag_signatures())
+            if self.factored_index:
+                all_paths_str = '|'.join(expressible_meaning.grammar_paths)
+            elif self.trie_output:
+                all_paths_str = '|'.join([str(trie_key) for trie_key in expressible_meaning.grammar_paths])
             else:
-                all_paths_str = '|'.join(str(path_trie_key) for path_trie_key in expressible_meaning.grammar_paths)
+                all_paths_str = '|'.join([
+                    ','.join([str(rule_id) for rule_id in grammar_paths_for_trie_keys[trie_key]])
+                    for trie_key in expressible_meaning.grammar_paths
+                ])
             all_tags_str = ','.join(tag_to_id[tag] for tag in expressible_meaning.tags)
+            # Note: the length bounds of the meaning's outputs are written into the grammar file instead (see
+            # self._save_grammar()), such that the format of this file stays the same for existing readers
             line = "{meaning_id}\t{paths}\t{tags}\n".format(
                 meaning_id=expressible_meaning.id, paths=all_paths_str, tags=all_tags_str
             )
-            f.write(line)
+            f.write(line.encode('utf-8'))
         f.close()
 
     def _save_grammar(self, grammar_file_location):
         """Write out a JSON file defining the grammar, for use at runtime by Productionist."""
         if self.verbosity > 0:
             print "Saving grammar file..."
-        # Prepare a grammar dictionary with the metadata that we need
-        grammar_dictionary = {}
-        # Add in metadata that we need
-        grammar_dictionary['id_to_tag'] = self.grammar.id_to_tag
-        # Add in the grammar's nonterminal symbols (along with all necessary metadata)
-        grammar_dictionary['nonterminal_symbols'] = {}
-        for symbol in self.grammar.nonterminal_symbols:
-            grammar_dictionary['nonterminal_symbols'][symbol.id] = {
-                'name': symbol.name,
-                'expansions_are_complete_outputs': symbol.expansions_are_complete_outputs,
-                'is_start_symbol': symbol.start_symbol,
-                'is_semantically_meaningful': symbol.semantically_meaningful,
-                'tags': symbol.tags,
-                'production_rules': [
-                    {
-                        "id": rule.id,
-                        "application_frequency": rule.application_frequency,
-                        "body": [s.id if type(s) != unicode else s for s in rule.body],
-                        "is_semantically_meaningful": rule.semantically_meaningful,
-                    }
-                    for rule in symbol.production_rules
-                ]
-            }
-        # Export this dictionary to a JSON file (though we'll use the '.grammar' file extension to
-        # emphasize that a specific dictionary structure is required)
-        with open(grammar_file_location, 'w') as outfile:
-            json.dump(grammar_dictionary, outfile)
+        tag_to_id = self.grammar.tag_to_id
+        # Export the grammar to a JSON file (though we'll use the '.grammar' file extension to emphasize that a
+        # specific dictionary structure is required); rather than building a dictionary for the whole grammar,
+        # we stream the file out one nonterminal symbol at a time
+        with self._open_output_file(output_file_location=grammar_file_location) as outfile:
+            # Add in metadata that we need, including the minimum and maximum lengths (in characters) of the
+            # outputs of each expressible meaning, listed in order of meaning ID (these live here, rather than in
+            # the .meanings file, so as not to change the format of that file)
+            outfile.write(
+                '{{"id_to_tag": {id_to_tag}, "expressible_meaning_length_bounds": {length_bounds}, '
+                '"nonterminal_symbols": {{'.format(
+                    id_to_tag=json.dumps(self.grammar.id_to_tag),
+                    length_bounds=json.dumps([[m.min_length, m.max_length] for m in self.expressible_meanings])
+                )
+            )
+            # Add in the grammar's nonterminal symbols (along with all necessary metadata)
+            for i, symbol in enumerate(self.grammar.nonterminal_symbols):
+                symbol_dictionary = {
+                    'name': symbol.name,
+                    'expansions_are_complete_outputs': symbol.expansions_are_complete_outputs,
+                    'is_start_symbol': symbol.start_symbol,
+                    'is_semantically_meaningful': symbol.semantically_meaningful,
+                    'tags': symbol.tags,
+                    # The minimum and maximum lengths (in characters) of the symbol's terminal expansions
+                    'min_length': symbol.min_length,
+                    'max_length': symbol.max_length,
+                    'production_rules': [
+                        {
+                            "id": rule.id,
+                            "application_frequency": rule.application_frequency,
+                            "body": [s.id if type(s) != unicode else s for s in rule.body],
+                            "is_semantically_meaningful": rule.semantically_meaningful,
+                            # The rule's tags, as a bitmask with the bit for each tag's ID set, which lets
+                            # Productionist accumulate and check an output's tags using integer operations
+                            "tag_mask": sum(1 << int(tag_to_id[tag]) for tag in rule.tags),
+                            "min_length": rule.min_length,
+                            "max_length": rule.max_length,
+                        }
+                        for rule in symbol.production_rules
+                    ]
+                }
+                outfile.write('{separator}"{id}": {symbol}'.format(
+                    separator=', ' if i else '', id=symbol.id, symbol=json.dumps(symbol_dictionary)
+                ))
+            outfile.write('}}')
+
+    def _open_output_file(self, output_file_location):
+        """Open the given content file for writing, compressing it with this Reductionist's codec (if any)."""
+        if self.compression is None:
+            return open(output_file_location, 'wb')
+        return COMPRESSION_CODECS[self.compression](output_file_location)
 
     def _write_stats_file(self, stats_file_location):
         """Write out a file with stats on this grammar."""
@@ -346,9 +1097,199 @@ class Reductionist(object):
         f.write("Total terminal results of production rules\n")
         for rule in self.grammar.production_rules:
             f.write("\t{rule}\t{n}\n".format(rule=str(rule), n=rule.total_generable_variants))
+        if self.max_recipes_per_meaning is not None and not self.factored_index:
+            f.write("Recipes dropped from expressible meanings (dropped of total)\n")
+            for expressible_meaning in self.expressible_meanings:
+                n_dropped = expressible_meaning.n_grammar_paths_found - len(expressible_meaning.grammar_paths)
+                if n_dropped:
+                    f.write("\t{meaning_id}\t{n_dropped} of {n}\n".format(
+                        meaning_id=expressible_meaning.id, n_dropped=n_dropped,
+                        n=expressible_meaning.n_grammar_paths_found
+                    ))
+        if self.grammar.merged_symbol_names:
+            f.write("Symbols merged into structurally identical symbols\n")
+            for canonical_symbol_name, merged_symbol_names in sorted(self.grammar.merged_symbol_names.iteritems()):
+                f.write("\t{symbol}\t{merged}\n".format(
+                    symbol=canonical_symbol_name, merged=', '.join(merged_symbol_names)
+                ))
         f.close()
 
 
+def write_sharded_bundle(path_to_input_content_file, path_to_write_output_files_to, shard_by, trie_output,
+                         factored_index=False, compression=None, merge_identical_subgrammars=False,
+                         max_recipes_per_meaning=None, recipe_sampling_seed=0, verbosity=1):
+    """Index a grammar as a sharded content bundle, and return the manifest for the bundle.
+
+    Each shard is a content bundle in its own right, named '{bundle}.{shard}', that indexes some part of the
+    grammar, such that a Productionist process may load only the shards that it needs (see
+    productionist.ShardedContentBundle). If shard_by is 'top_level_symbol', there is one shard for each
+    top-level symbol, which indexes the grammar as restricted to that symbol and its descendants. Otherwise,
+    shard_by names a tagset, and there is one shard for each tag in that tagset, holding the expressible
+    meanings with that tag (and restricted to the top-level symbols that can produce it, and, unless the index
+    is factored, to the symbols and rules that the recipes for those meanings can reach), plus one shard (with
+    the key None) holding the expressible meanings without any tag in the tagset. Since a meaning with several
+    tags from the tagset is held by each of their shards, the paths through the grammar are collected only once
+    (unless the index is factored, in which case no paths are collected), and the expressible meanings formed
+    from them are then split across the shards. The manifest, which is
+    written to '{bundle}.manifest', maps the name of each shard to its key (the top-level symbol or tag it was
+    formed for), its top-level symbols, all the tags of its expressible meanings, and a listing of the meanings
+    themselves (each as a list [tags, minimum length, maximum length]), which lets a Productionist process
+    route a content request to a shard without loading every shard that might serve it.
+    """
+    grammar = Grammar(grammar_file_location=path_to_input_content_file)
+    top_level_symbols = sorted(
+        (s for s in grammar.nonterminal_symbols if s.expansions_are_complete_outputs), key=lambda s: s.name
+    )
+    # A list of (shard key, top-level symbol names, expressible-meaning filter) tuples
+    shard_specifications = []
+    if shard_by == 'top_level_symbol':
+        for symbol in top_level_symbols:
+            shard_specifications.append((symbol.name, [symbol.name], None))
+    else:
+        # Collect the tags that each top-level symbol can produce, i.e., the tags of it and its descendants
+        tags_for_symbols = {}
+
+        def collect_tags_for_symbol(symbol):
+            """Return the set of tags attached to the given symbol and its descendants."""
+            if symbol not in tags_for_symbols:
+                tags = set(symbol.tags)
+                for rule in symbol.production_rules:
+                    for body_symbol in rule.body:
+                        if type(body_symbol) is not unicode:
+                            tags |= collect_tags_for_symbol(symbol=body_symbol)
+                tags_for_symbols[symbol] = tags
+            return tags_for_symbols[symbol]
+
+        shard_tagset_prefix = '{tagset}:'.format(tagset=shard_by)
+        shard_tags = sorted(tag for tag in grammar.tags if tag.startswith(shard_tagset_prefix))
+        if not shard_tags:
+            raise Exception("Cannot shard by '{tagset}', since no symbol has a tag in it".format(tagset=shard_by))
+        for tag in shard_tags:
+            shard_specifications.append((
+                tag,
+                [s.name for s in top_level_symbols if tag in collect_tags_for_symbol(symbol=s)],
+                # Note: the default argument binds the current tag
+                lambda tags, tag=tag: tag in tags
+            ))
+        shard_specifications.append((
+            None,
+            [s.name for s in top_level_symbols],
+            lambda tags: not any(tag.startswith(shard_tagset_prefix) for tag in tags)
+        ))
+    # For a tagset, collect the paths through the whole grammar once (writing nothing out), and hold onto the
+    # expressible meanings formed from them, as (tags, grammar paths, number of paths found) tuples; since each
+    # shard parses the whole grammar, its rule IDs match the ones on these paths
+    precomputed_expressible_meanings = None
+    if shard_by != 'top_level_symbol' and not factored_index:
+        if verbosity > 0:
+            print "Collecting the paths through the grammar for all shards..."
+        grammar_index = Reductionist(
+            path_to_input_content_file=path_to_input_content_file,
+            path_to_write_output_files_to=None,
+            trie_output=trie_output,
+            merge_identical_subgrammars=merge_identical_subgrammars,
+            max_recipes_per_meaning=max_recipes_per_meaning,
+            recipe_sampling_seed=recipe_sampling_seed,
+            verbosity=verbosity
+        )
+        if grammar_index.validator.errors:
+            raise Exception(
+                "Cannot index grammar:\n{errors}".format(errors='\n'.join(grammar_index.validator.error_messages))
+            )
+        grammar_paths_for_trie_keys = grammar_index._grammar_paths_for_trie_keys
+        precomputed_expressible_meanings = [
+            (m.tags, [grammar_paths_for_trie_keys[trie_key] for trie_key in m.grammar_paths], m.n_grammar_paths_found)
+            for m in grammar_index.expressible_meanings
+        ]
+        del grammar_index, grammar_paths_for_trie_keys
+    manifest = {'shard_by': shard_by, 'shards': {}}
+    for i, (shard_key, top_level_symbol_names, expressible_meaning_filter) in enumerate(shard_specifications):
+        if not top_level_symbol_names:
+            continue
+        # Note: shards are named by number, since symbol names and tags may not make for safe filenames
+        shard_name = 'shard{i}'.format(i=i)
+        if verbosity > 0:
+            print "Indexing shard {shard_name} ({n} top-level symbols)...".format(
+                shard_name=shard_name, n=len(top_level_symbol_names)
+            )
+        shard_reductionist = Reductionist(
+            path_to_input_content_file=path_to_input_content_file,
+            path_to_write_output_files_to='{path}.{shard_name}'.format(
+                path=path_to_write_output_files_to, shard_name=shard_name
+            ),
+            trie_output=trie_output,
+            factored_index=factored_index,
+            # Note: given precomputed expressible meanings, the whole grammar is parsed (such that the rule IDs
+            # on their paths are valid), and the parts that the shard's recipes can't reach are pruned instead
+            top_level_symbol_names=set(top_level_symbol_names) if precomputed_expressible_meanings is None else None,
+            expressible_meaning_filter=expressible_meaning_filter,
+            compression=compression,
+            merge_identical_subgrammars=merge_identical_subgrammars,
+            max_recipes_per_meaning=max_recipes_per_meaning,
+            recipe_sampling_seed=recipe_sampling_seed,
+            precomputed_expressible_meanings=precomputed_expressible_meanings,
+            verbosity=verbosity
+        )
+        if shard_reductionist.validator.errors:
+            raise Exception(
+                "Cannot index shard {shard_name}:\n{errors}".format(
+                    shard_name=shard_name, errors='\n'.join(shard_reductionist.validator.error_messages)
+                )
+            )
+        tags_of_shard = set()
+        for expressible_meaning in shard_reductionist.expressible_meanings:
+            tags_of_shard |= expressible_meaning.tags
+        manifest['shards'][shard_name] = {
+            'key': shard_key,
+            'top_level_symbols': sorted(top_level_symbol_names),
+            'tags': sorted(tags_of_shard),
+            'expressible_meanings': [
+                [sorted(m.tags), m.min_length, m.max_length] for m in shard_reductionist.expressible_meanings
+            ],
+        }
+    with open('{path}.manifest'.format(path=path_to_write_output_files_to), 'w') as outfile:
+        json.dump(manifest, outfile)
+    return manifest
+
+
+class PathCounts(object):
+    """The counts of semantically meaningful paths through a grammar, as computed in a Reductionist dry run."""
+
+    __slots__ = ('total', 'counts_for_symbols', 'counts_for_rules', 'expansions_of_symbols', 'expansions_of_rules')
+
+    def __init__(self, total, counts_for_symbols, counts_for_rules, expansions_of_symbols, expansions_of_rules):
+        """Initialize a PathCounts object."""
+        # The total number of semantically meaningful paths through the grammar
+        self.total = total
+        # Dictionaries mapping each semantically meaningful symbol and rule to the number of (partial)
+        # paths that descend from it
+        self.counts_for_symbols = counts_for_symbols
+        self.counts_for_rules = counts_for_rules
+        # Dictionaries mapping each semantically meaningful symbol and rule to the (estimated) number of
+        # times it is expanded across all complete paths
+        self.expansions_of_symbols = expansions_of_symbols
+        self.expansions_of_rules = expansions_of_rules
+
+    def top_symbols(self, n=10):
+        """Return a list of (symbol, expansions across all paths, paths descending from it) tuples for the n
+        symbols that are expanded the most across all paths.
+        """
+        symbols = sorted(self.expansions_of_symbols, key=lambda s: (-self.expansions_of_symbols[s], s.id))[:n]
+        return [(s, self.expansions_of_symbols[s], self.counts_for_symbols[s]) for s in symbols]
+
+    def top_rules(self, n=10):
+        """Return a list of (rule, expansions across all paths, paths descending from it) tuples for the n rules
+        that are expanded the most across all paths.
+        """
+        rules = sorted(self.expansions_of_rules, key=lambda r: (-self.expansions_of_rules[r], r.id))[:n]
+        return [(r, self.expansions_of_rules[r], self.counts_for_rules[r]) for r in rules]
+
+    @staticmethod
+    def format_count(count):
+        """Return a compact string for the given count (using scientific notation for huge counts)."""
+        return str(count) if count < 10**12 else '{:.3e}'.format(count)
+
+
 class ExpressibleMeaning(object):
     """An 'expressible meaning' is a particular meaning (i.e., collection of tags), bundled with
     recipes (i.e., collection of grammar paths) for generating content that will come with those tags.
@@ -358,6 +1299,10 @@ class ExpressibleMeaning(object):
     will produce the desired content.
     """
 
+    # Since large grammars yield great numbers of symbols, rules, and expressible meanings, this class and
+    # the NonterminalSymbol and ProductionRule classes use slots rather than per-object attribute dictionaries
+    __slots__ = ('id', 'tags', 'grammar_paths', 'n_grammar_paths_found', 'min_length', 'max_length')
+
     def __init__(self, meaning_id, tags, initial_grammar_path, grammar_paths=None):
         """Initialize a ExpressibleMeaning object."""
         self.id = meaning_id
@@ -373,6 +1318,14 @@ class ExpressibleMeaning(object):
             self.grammar_paths = [initial_grammar_path]  # Gets appended to by Reductionist._build_trie()
         else:  # Called by Reductionist._load_expressible_meanings()
             self.grammar_paths = grammar_paths
+        # The number of paths that were found to yield this meaning, which only exceeds the number of paths
+        # held for it if its recipes were capped (see Reductionist.max_recipes_per_meaning)
+        self.n_grammar_paths_found = len(self.grammar_paths)
+        # The minimum and maximum lengths (in characters) of the outputs that can be generated by following one
+        # of this meaning's recipes; these get set by Reductionist._compute_expressible_meaning_length_bounds()
+        # (or, for a factored index, by Reductionist._construct_expressible_meanings_from_tag_signatures())
+        self.min_length = None
+        self.max_length = None
 
     def __str__(self):
         """Return string representation."""
@@ -381,15 +1334,120 @@ class ExpressibleMeaning(object):
         )
 
 
+class JSONObjectStream(object):
+    """A reader that parses a JSON document from a file incrementally, one value at a time.
+
+    This lets us walk a large JSON document (e.g., an Expressionist export) without ever holding the
+    whole of it in memory, either as text or as parsed objects: the file is read in chunks, and only the
+    values that the caller asks for are decoded, each with the C decoder (via JSONDecoder.raw_decode()).
+    """
+
+    __slots__ = ('json_file', 'chunk_size', 'buffer', 'position', 'exhausted', 'decoder')
+
+    WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, json_file, chunk_size=1024*1024):
+        """Initialize a JSONObjectStream object."""
+        self.json_file = json_file
+        self.chunk_size = chunk_size
+        # The text that has been read but not yet consumed starts at self.position in self.buffer
+        self.buffer = ''
+        self.position = 0
+        # Whether the entire file has been read into the buffer
+        self.exhausted = False
+        self.decoder = json.JSONDecoder()
+
+    def iterate_object_keys(self):
+        """Iterate over the keys of the JSON object that starts at the current position.
+
+        After each key is yielded, the caller must consume its value (by calling self.read_value(), or by
+        iterating over the keys of that value with this method) before advancing to the next key.
+        """
+        self._expect(character='{')
+        if self._peek() == '}':
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, basestring):
+                raise ValueError("Expected an object key at offset {}".format(self.position))
+            self._expect(character=':')
+            yield key
+            if self._peek() == '}':
+                self.position += 1
+                return
+            self._expect(character=',')
+
+    def read_value(self):
+        """Decode and return the JSON value that starts at the current position."""
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except ValueError:
+                # The value may continue past the end of the buffer, so read more of the file and try again;
+                # to keep retries for very large values to a minimum, we at least double the buffer each time
+                if not self._fill(size=len(self.buffer) - self.position):
+                    raise
+                continue
+            # A number that ends at the end of the buffer may continue in the rest of the file
+            if end == len(self.buffer) and self._fill(size=self.chunk_size):
+                continue
+            self.position = end
+            return value
+
+    def _peek(self):
+        """Skip past any whitespace and return the next character (or '' if the file has been fully consumed)."""
+        while True:
+            self.position = self.WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or not self._fill(size=self.chunk_size):
+                return self.buffer[self.position:self.position+1]
+
+    def _expect(self, character):
+        """Consume the given structural character, raising a ValueError if it isn't the next one."""
+        if self._peek() != character:
+            raise ValueError("Expected '{character}' at offset {position}".format(
+                character=character, position=self.position
+            ))
+        self.position += 1
+
+    def _fill(self, size):
+        """Read at least the given number of bytes (or the rest of the file) into the buffer, and return whether
+        anything was read.
+        """
+        if self.exhausted:
+            return False
+        # Drop the consumed part of the buffer
+        self.buffer = self.buffer[self.position:]
+        self.position = 0
+        chunk = self.json_file.read(max(size, self.chunk_size))
+        if not chunk:
+            self.exhausted = True
+            return False
+        self.buffer += chunk
+        return True
+
+
 class Grammar(object):
     """A context-free grammar, authored using Expressionist."""
 
-    def __init__(self, grammar_file_location):
+    def __init__(self, grammar_file_location, top_level_symbol_names=None, merge_identical_subgrammars=False):
         """Initialize a Grammar object."""
         self.start_symbol = None  # Gets set later by self._init_create_start_symbol_and_top_level_production_rules()
         self.nonterminal_symbols = self._init_parse_json_grammar_specification(
             grammar_file_location=grammar_file_location
         )
+        if top_level_symbol_names is not None:
+            self.nonterminal_symbols = self._init_restrict_to_top_level_symbols(
+                nonterminal_symbols=self.nonterminal_symbols, top_level_symbol_names=top_level_symbol_names
+            )
+        # A dictionary mapping the name of each symbol that other symbols were merged into to a sorted list of the
+        # names of those symbols (which only gets filled in if identical subgrammars are to be merged)
+        self.merged_symbol_names = {}
+        if merge_identical_subgrammars:
+            self.nonterminal_symbols, self.merged_symbol_names = self._init_merge_identical_subgrammars(
+                nonterminal_symbols=self.nonterminal_symbols
+            )
         self._init_assign_id_numbers_to_all_symbols_and_rules()
         self._init_ground_symbol_references_in_all_production_rule_bodies()
         # Collect all production rules
@@ -419,28 +1477,162 @@ class Grammar(object):
 
     @staticmethod
     def _init_parse_json_grammar_specification(grammar_file_location):
-        """Parse a JSON grammar specification exported by Expressionist to instantiate symbols and rules."""
-        # Parse the JSON specification to build a dictionary data structure
-        symbol_objects = []
+        """Parse a JSON grammar specification exported by Expressionist to instantiate symbols and rules.
+
+        Rather than loading the entire specification into memory (which, for a large export, would take up
+        far more memory than the symbols and rules that we build from it), we parse it incrementally, building
+        each nonterminal symbol as soon as its specification has been decoded, and then discarding that
+        specification.
+        """
         try:
-            grammar_dictionary = json.loads(open(grammar_file_location).read())
+            grammar_file = open(grammar_file_location, 'rb')
         except IOError:
             raise Exception(
                 "Cannot load grammar -- there is no JSON file located at '{filepath}'".format(
                     filepath=grammar_file_location
                 )
             )
-        nonterminal_symbol_specifications = grammar_dictionary['nonterminals']
-        for name, nonterminal_symbol_specification in nonterminal_symbol_specifications.iteritems():
-            expansions_are_complete_outputs = nonterminal_symbol_specification['deep']
-            production_rules_specification = nonterminal_symbol_specification['rules']
-            tag_dictionary = nonterminal_symbol_specification['markup']
-            symbol_object = NonterminalSymbol(
-                name=name, expansions_are_complete_outputs=expansions_are_complete_outputs,
-                tag_dictionary=tag_dictionary, production_rules_specification=production_rules_specification
+        symbols_by_name = None
+        with grammar_file:
+            json_stream = JSONObjectStream(json_file=grammar_file)
+            for key in json_stream.iterate_object_keys():
+                if key != 'nonterminals':
+                    json_stream.read_value()
+                    continue
+                symbols_by_name = {}
+                for name in json_stream.iterate_object_keys():
+                    nonterminal_symbol_specification = json_stream.read_value()
+                    expansions_are_complete_outputs = nonterminal_symbol_specification['deep']
+                    production_rules_specification = nonterminal_symbol_specification['rules']
+                    tag_dictionary = nonterminal_symbol_specification['markup']
+                    symbols_by_name[name] = NonterminalSymbol(
+                        name=name, expansions_are_complete_outputs=expansions_are_complete_outputs,
+                        tag_dictionary=tag_dictionary, production_rules_specification=production_rules_specification
+                    )
+        if symbols_by_name is None:
+            raise Exception(
+                "Cannot load grammar -- the JSON file at '{filepath}' defines no nonterminal symbols".format(
+                    filepath=grammar_file_location
+                )
+            )
+        # Note: symbols are listed in the order of a dictionary keyed by their names, which is the order in
+        # which they were listed when the specification was loaded as a dictionary, such that symbol (and rule)
+        # ID numbers are unaffected by the incremental parse
+        return symbols_by_name.values()
+
+    @staticmethod
+    def _init_restrict_to_top_level_symbols(nonterminal_symbols, top_level_symbol_names):
+        """Return the given nonterminal symbols, restricted to the named top-level symbols and their descendants.
+
+        Every other symbol that was marked as a top-level symbol is unmarked as such, so that no top-level
+        production rule gets created for it (if it is a descendant of one of the named symbols, it remains
+        in the grammar, just not as a top-level symbol).
+        """
+        symbols_by_name = {symbol.name: symbol for symbol in nonterminal_symbols}
+        reachable_symbol_names = set()
+        symbol_names_to_visit = [name for name in top_level_symbol_names if name in symbols_by_name]
+        while symbol_names_to_visit:
+            symbol_name = symbol_names_to_visit.pop()
+            if symbol_name in reachable_symbol_names:
+                continue
+            reachable_symbol_names.add(symbol_name)
+            for rule in symbols_by_name[symbol_name].production_rules:
+                for symbol_reference in rule.body_specification:
+                    if symbol_reference[:2] == '[[' and symbol_reference[-2:] == ']]':
+                        symbol_names_to_visit.append(symbol_reference[2:-2])
+        restricted_nonterminal_symbols = []
+        for symbol in nonterminal_symbols:
+            if symbol.name in reachable_symbol_names:
+                symbol.expansions_are_complete_outputs = symbol.name in top_level_symbol_names
+                restricted_nonterminal_symbols.append(symbol)
+        return restricted_nonterminal_symbols
+
+    @staticmethod
+    def _init_merge_identical_subgrammars(nonterminal_symbols):
+        """Merge every untagged nonterminal symbol that is structurally identical to another one into it, and
+        return a tuple (remaining symbols, dictionary mapping each canonical symbol's name to the merged names).
+
+        Two symbols are structurally identical if they have the same multiset of production rules, where two
+        rules are the same if they have the same application frequency and the same body, and where the symbols
+        referenced in rule bodies are compared by their own structure, recursively. To determine this, we hash
+        the grammar's structure bottom-up: each symbol is assigned a structure number, such that two symbols
+        get the same number exactly when they're structurally identical, which lets each symbol's structure be
+        keyed by the numbers of the symbols its rules reference (rather than by the entire subgrammars below
+        them). Tagged symbols and top-level symbols are never merged (each gets a structure number of its own),
+        since merging them would change the grammar's semantics or its set of top-level rules; the symbols below
+        them may still be merged, though. Each group of identical symbols is merged into the one
+        whose name comes first, and every rule body that references a merged symbol is rewritten to reference
+        that canonical symbol instead.
+        """
+        symbols_by_name = {symbol.name: symbol for symbol in nonterminal_symbols}
+        structure_numbers = {}  # Maps symbol names to structure numbers
+        structure_numbers_for_structures = {}
+        symbols_in_progress = set()
+
+        def assign_structure_number(symbol):
+            """Assign a structure number to the given symbol (and its descendants), and return that number."""
+            if symbol.name in structure_numbers:
+                return structure_numbers[symbol.name]
+            if symbol.name in symbols_in_progress:
+                # This symbol is on a cycle (which Validator will report), so a reference to it is keyed by name
+                return None
+            symbols_in_progress.add(symbol.name)
+            rule_structures = []
+            for rule in symbol.production_rules:
+                body_structure = []
+                for symbol_reference in rule.body_specification:
+                    if symbol_reference[:2] == '[[' and symbol_reference[-2:] == ']]':
+                        referenced_symbol = symbols_by_name.get(symbol_reference[2:-2])
+                        referenced_structure_number = (
+                            assign_structure_number(symbol=referenced_symbol) if referenced_symbol else None
+                        )
+                        if referenced_structure_number is None:
+                            # Key unresolvable references (and references on cycles) by name
+                            body_structure.append((False, symbol_reference))
+                        else:
+                            body_structure.append((True, referenced_structure_number))
+                    else:
+                        body_structure.append((False, symbol_reference))
+                rule_structures.append((rule.application_frequency, tuple(body_structure)))
+            symbols_in_progress.discard(symbol.name)
+            if symbol.tags or symbol.expansions_are_complete_outputs:
+                structure_key = ('unique', symbol.name)
+            else:
+                structure_key = ('structure', tuple(sorted(rule_structures)))
+            structure_number = structure_numbers_for_structures.setdefault(
+                structure_key, len(structure_numbers_for_structures)
             )
-            symbol_objects.append(symbol_object)
-        return symbol_objects
+            structure_numbers[symbol.name] = structure_number
+            return structure_number
+
+        for symbol in nonterminal_symbols:
+            assign_structure_number(symbol=symbol)
+        # Each group of symbols with the same structure number gets merged into the one whose name comes first
+        canonical_names_for_structure_numbers = {}
+        for name in sorted(structure_numbers):
+            canonical_names_for_structure_numbers.setdefault(structure_numbers[name], name)
+        canonical_names = {
+            name: canonical_names_for_structure_numbers[structure_number]
+            for name, structure_number in structure_numbers.iteritems()
+        }
+        merged_symbol_names = collections.defaultdict(list)
+        remaining_nonterminal_symbols = []
+        for symbol in nonterminal_symbols:
+            if canonical_names[symbol.name] != symbol.name:
+                merged_symbol_names[canonical_names[symbol.name]].append(symbol.name)
+                continue
+            remaining_nonterminal_symbols.append(symbol)
+            for rule in symbol.production_rules:
+                rule.body_specification = [
+                    u'[[{name}]]'.format(name=canonical_names[symbol_reference[2:-2]])
+                    if symbol_reference[:2] == '[[' and symbol_reference[-2:] == ']]' and
+                    symbol_reference[2:-2] in canonical_names else symbol_reference
+                    for symbol_reference in rule.body_specification
+                ]
+                rule.body_specification_str = u''.join(rule.body_specification)
+        for names in merged_symbol_names.itervalues():
+            names.sort()
+        return remaining_nonterminal_symbols, dict(merged_symbol_names)
 
     def _init_assign_id_numbers_to_all_symbols_and_rules(self):
         """Assigned ID numbers to all symbols and rules in this grammar."""
@@ -479,6 +1671,30 @@ class Grammar(object):
                 rule_body_with_resolved_symbol_references.append(symbol_reference)
             production_rule.body = rule_body_with_resolved_symbol_references
 
+    def restrict_to_symbols_and_rules(self, nonterminal_symbols, production_rules):
+        """Drop every nonterminal symbol and production rule that is not among the given ones, and renumber the
+        remaining ones (in their current order), such that their ID numbers are dense again.
+
+        Since the terminal expansions of the remaining symbols may have narrowed, their counts of generable
+        variants and their length bounds are reset, to be computed anew.
+        """
+        self.nonterminal_symbols = [symbol for symbol in self.nonterminal_symbols if symbol in nonterminal_symbols]
+        self.production_rules = []
+        for symbol in self.nonterminal_symbols:
+            symbol.production_rules = [rule for rule in symbol.production_rules if rule in production_rules]
+            symbol.total_generable_variants = None
+            symbol.min_length = symbol.max_length = None
+            self.production_rules += symbol.production_rules
+        for rule in self.production_rules:
+            rule.total_generable_variants = None
+            rule.min_length = rule.max_length = None
+        self._init_assign_id_numbers_to_all_symbols_and_rules()
+        self.terminal_symbols = []
+        for rule in self.production_rules:
+            for symbol in rule.body:
+                if type(symbol) == unicode and symbol not in self.terminal_symbols:
+                    self.terminal_symbols.append(symbol)
+
     def create_start_symbol_and_top_level_production_rules(self):
         """Create a start symbol for this grammar, along with a set of production rules that will expand it
         into the de facto top-level symbols in the authored grammar (i.e., the ones that appear in no
@@ -518,6 +1734,11 @@ class Grammar(object):
 class NonterminalSymbol(object):
     """A nonterminal symbol in an annotated context-free grammar authored using an Expressionist-like tool."""
 
+    __slots__ = (
+        'name', 'id', 'expansions_are_complete_outputs', 'start_symbol', 'production_rules', 'tags',
+        'total_generable_variants', 'semantically_meaningful', 'min_length', 'max_length'
+    )
+
     def __init__(self, name, expansions_are_complete_outputs, tag_dictionary, production_rules_specification,
                  start_symbol=False):
         """Initialize a NonterminalSymbol object."""
@@ -544,6 +1765,10 @@ class NonterminalSymbol(object):
         self.total_generable_variants = None
         # Whether this symbol and/or any of its descendants have tags
         self.semantically_meaningful = None
+        # The minimum and maximum lengths (in characters) of the terminal expansions of this symbol; these
+        # get set by self.compute_expansion_length_bounds(), on a call from Reductionist.__init__()
+        self.min_length = None
+        self.max_length = None
 
     def __str__(self):
         """Return string representation."""
@@ -567,10 +1792,25 @@ class NonterminalSymbol(object):
             self.total_generable_variants = sum(rule.count_generable_variants() for rule in self.production_rules)
         return self.total_generable_variants
 
+    def compute_expansion_length_bounds(self):
+        """Determine the minimum and maximum lengths (in characters) of the terminal expansions of this symbol."""
+        if self.min_length is None:
+            rule_length_bounds = [rule.compute_expansion_length_bounds() for rule in self.production_rules]
+            # Note: a symbol with no production rules (which Validator reports) is treated as expanding to nothing
+            self.min_length = min(bounds[0] for bounds in rule_length_bounds) if rule_length_bounds else 0
+            self.max_length = max(bounds[1] for bounds in rule_length_bounds) if rule_length_bounds else 0
+        return self.min_length, self.max_length
+
 
 class ProductionRule(object):
     """A production rule in an annotated context-free grammar authored using an Expressionist-like tool."""
 
+    __slots__ = (
+        'id', 'head', 'body', 'terminal', 'body_specification', 'body_specification_str', 'application_frequency',
+        'tags', 'total_generable_variants', 'semantically_meaningful', 'conventionally_semantically_meaningful',
+        'min_length', 'max_length'
+    )
+
     def __init__(self, head, body_specification, application_frequency):
         """Initialize a ProductionRule object.
 
@@ -598,6 +1838,10 @@ class ProductionRule(object):
         # Reductionist._determine_if_production_rule_is_semantically_meaningful()
         self.semantically_meaningful = None  # Is conventionally semantically meaningful, or one of its siblings is
         self.conventionally_semantically_meaningful = False  # Has tags, or has descendants that have tags
+        # The minimum and maximum lengths (in characters) of the terminal results of executing this rule; these
+        # get set by self.compute_expansion_length_bounds()
+        self.min_length = None
+        self.max_length = None
 
     def __str__(self):
         """Return string representation."""
@@ -625,6 +1869,22 @@ class ProductionRule(object):
             )
         return self.total_generable_variants
 
+    def compute_expansion_length_bounds(self):
+        """Determine the minimum and maximum lengths (in characters) of the terminal results of executing this rule."""
+        if self.min_length is None:
+            min_length = max_length = 0
+            for symbol in self.body:
+                if type(symbol) is unicode:
+                    min_length += len(symbol)
+                    max_length += len(symbol)
+                else:
+                    symbol_min_length, symbol_max_length = symbol.compute_expansion_length_bounds()
+                    min_length += symbol_min_length
+                    max_length += symbol_max_length
+            self.min_length = min_length
+            self.max_length = max_length
+        return self.min_length, self.max_length
+
 
 class Validator(object):
     """A class for validating grammars exported by Expressionist."""
@@ -728,6 +1988,53 @@ if __name__ == "__main__":
              "use the marisa_trie package to restore trie keys",
         action="store_true"
     )
+    parser.add_argument(
+        '--dry_run',
+        help="whether to only count the semantically meaningful paths through the grammar, without enumerating "
+             "them or writing any files, and report the symbols and rules that contribute the most paths (flag "
+             "argument); this finishes quickly even for grammars that would take very long to index",
+        action="store_true"
+    )
+    parser.add_argument(
+        '--factored_index',
+        help="whether to write out a factored index (a '.dag' file annotating the grammar's symbols and rules "
+             "with the tag signatures of the paths descending from them) in lieu of enumerating every "
+             "semantically meaningful path (flag argument); use this for grammars with too many paths to store",
+        action="store_true"
+    )
+    parser.add_argument(
+        '--merge_identical_subgrammars',
+        help="whether to merge untagged symbols that are structurally identical to other symbols (e.g., copy-pasted "
+             "symbol families) before indexing (flag argument); the merges are listed in the .stats file",
+        action="store_true"
+    )
+    parser.add_argument(
+        '--max_recipes_per_meaning',
+        help="if specified, the maximum number of recipes that will be kept for each expressible meaning, which "
+             "will be a reproducible uniform sample of its recipes (the number dropped from each meaning is "
+             "recorded in the .stats file); the paths through the grammar are then sampled as they're collected, "
+             "so that only the paths descending from one top-level symbol are held at a time, rather than all "
+             "of them",
+        type=int
+    )
+    parser.add_argument(
+        '--recipe_sampling_seed',
+        help="the seed for sampling the recipes that are kept when they are capped (default: 0)",
+        type=int,
+        default=0
+    )
+    parser.add_argument(
+        '--compression',
+        help="if specified, the codec that the grammar, expressible-meanings, and tag-signatures files will be "
+             "compressed with (Productionist detects compressed files automatically)",
+        choices=sorted(COMPRESSION_CODECS)
+    )
+    parser.add_argument(
+        '--shard_by',
+        help="if specified, write a sharded bundle (with a '.manifest' file) instead of a single one; use "
+             "'top_level_symbol' for one shard per top-level symbol, or the name of a tagset for one shard per "
+             "tag in that tagset (cannot be combined with --dry_run)"
+    )
     parser.add_argument(
         "--verbosity",
         help="how verbose Reductionist's debug text should be (0=no debug text, 1=more debug text, 2=most debug text)",
@@ -735,29 +2042,87 @@ if __name__ == "__main__":
         default=0
     )
     args = parser.parse_args()
+    # A dry run writes no files, whereas --shard_by is all about how the files are written, so there's no sensible
+    # way to combine the two
+    if args.dry_run and args.shard_by:
+        parser.error("--dry_run cannot be combined with --shard_by")
     # Prepare the full path that output files will be written to
     output_path_and_filename = args.output_dir
     if output_path_and_filename[-1] != '/':
         output_path_and_filename += '/'
     output_path_and_filename += args.content_bundle_name
-    # Index the grammar and save out the resulting files (content file [.content], trie file [.marisa], and
-    # expressible meanings file [.meanings])
-    reductionist = Reductionist(
-        path_to_input_content_file=args.grammar_file,
-        path_to_write_output_files_to=output_path_and_filename,
-        trie_output=args.trie_output,
-        verbosity=args.verbosity
-    )
-    if not reductionist.validator.errors:
-        print "\n--Success! Indexed this grammar's {n} generable lines to infer {m} expressible meanings.--".format(
-            n=reductionist.total_generable_outputs,
-            m=len(reductionist.expressible_meanings)
+    if args.shard_by:
+        # Index the grammar as a sharded bundle, writing out the files for each shard, along with a manifest
+        manifest = write_sharded_bundle(
+            path_to_input_content_file=args.grammar_file,
+            path_to_write_output_files_to=output_path_and_filename,
+            shard_by=args.shard_by,
+            trie_output=args.trie_output,
+            factored_index=args.factored_index,
+            compression=args.compression,
+            merge_identical_subgrammars=args.merge_identical_subgrammars,
+            max_recipes_per_meaning=args.max_recipes_per_meaning,
+            recipe_sampling_seed=args.recipe_sampling_seed,
+            verbosity=args.verbosity
         )
+        print "\n--Success! Indexed this grammar as {n} shards.--".format(n=len(manifest['shards']))
+        for shard_name in sorted(manifest['shards'], key=lambda name: int(name[len('shard'):])):
+            print "\t{shard_name}\t{key}\t{n} top-level symbols\t{m} tags\t{k} expressible meanings".format(
+                shard_name=shard_name, key=manifest['shards'][shard_name]['key'],
+                n=len(manifest['shards'][shard_name]['top_level_symbols']),
+                m=len(manifest['shards'][shard_name]['tags']),
+                k=len(manifest['shards'][shard_name]['expressible_meanings'])
+            )
     else:
-        print "\n--Errors--"
-        for error_message in reductionist.validator.error_messages:
-            print '\n{msg}'.format(msg=error_message)
-    if reductionist.validator.warnings:
-        print "\n--Warnings--"
-        for warning_message in reductionist.validator.warning_messages:
-            print '\n{msg}'.format(msg=warning_message)
+        # Index the grammar and save out the resulting files (content file [.content], trie file [.marisa], and
+        # expressible meanings file [.meanings])
+        reductionist = Reductionist(
+            path_to_input_content_file=args.grammar_file,
+            path_to_write_output_files_to=output_path_and_filename,
+            trie_output=args.trie_output,
+            dry_run=args.dry_run,
+            factored_index=args.factored_index,
+            compression=args.compression,
+            merge_identical_subgrammars=args.merge_identical_subgrammars,
+            max_recipes_per_meaning=args.max_recipes_per_meaning,
+            recipe_sampling_seed=args.recipe_sampling_seed,
+            verbosity=args.verbosity
+        )
+        if reductionist.grammar.merged_symbol_names:
+            print "\n--Merged {n} symbols into structurally identical symbols:--".format(
+                n=sum(len(names) for names in reductionist.grammar.merged_symbol_names.itervalues())
+            )
+            for canonical_symbol_name, merged_names in sorted(reductionist.grammar.merged_symbol_names.iteritems()):
+                print "\t[[{symbol}]]\t<-- {merged}".format(
+                    symbol=canonical_symbol_name, merged=', '.join('[[{}]]'.format(name) for name in merged_names)
+                )
+        if not reductionist.validator.errors and args.dry_run:
+            path_counts = reductionist.path_counts
+            print "\n--Dry run: this grammar has {n} semantically meaningful paths.--".format(
+                n=PathCounts.format_count(path_counts.total)
+            )
+            print "\nSymbols that are expanded the most across all paths:"
+            print "\t{:>20}{:>20}  {}".format('expansions', 'paths descending', 'symbol')
+            for symbol, n_expansions, n_paths_descending in path_counts.top_symbols():
+                print "\t{:>20}{:>20}  [[{}]]".format(
+                    PathCounts.format_count(n_expansions), PathCounts.format_count(n_paths_descending), symbol.name
+                )
+            print "\nRules that are expanded the most across all paths:"
+            print "\t{:>20}{:>20}  {}".format('expansions', 'paths descending', 'rule')
+            for rule, n_expansions, n_paths_descending in path_counts.top_rules():
+                print "\t{:>20}{:>20}  #{}: {}".format(
+                    PathCounts.format_count(n_expansions), PathCounts.format_count(n_paths_descending), rule.id, rule
+                )
+        elif not reductionist.validator.errors:
+            print "\n--Success! Indexed this grammar's {n} generable lines to infer {m} expressible meanings.--".format(
+                n=reductionist.total_generable_outputs,
+                m=len(reductionist.expressible_meanings)
+            )
+        else:
+            print "\n--Errors--"
+            for error_message in reductionist.validator.error_messages:
+                print '\n{msg}'.format(msg=error_message)
+        if reductionist.validator.warnings:
+            print "\n--Warnings--"
+            for warning_message in reductionist.validator.warning_messages:
+                print '\n{msg}'.format(msg=warning_message)
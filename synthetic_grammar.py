@@ -0,0 +1,140 @@
+import random  # Used to make the random choices that shape a synthetic grammar
+import json  # Used to write out synthetic grammars in the format that Expressionist exports
+import argparse  # Used to handle command-line arguments for this program
+
+
+def generate_synthetic_grammar(n_symbols=100, branching_factor=3, depth=4, nonterminals_per_rule=2,
+                               tag_density=0.2, n_tagsets=5, tags_per_tagset=4, sharing=0.5, seed=0):
+    """Return a dictionary specifying a synthetic grammar, in the format of a JSON file exported by Expressionist.
+
+    The grammar is organized into depth levels of nonterminal symbols (with n_symbols spread evenly across
+    them, and at least one symbol per level). The symbols on the first level are top-level symbols (i.e.,
+    their expansions are complete outputs), and those on the last level are leaves, whose rules include only
+    terminal symbols. Every symbol has branching_factor production rules, and the body of each rule of a
+    non-leaf symbol references nonterminals_per_rule symbols on the next level, interleaved with terminals.
+
+    The knobs work as follows:
+        tag_density: the probability that a given symbol is tagged (with one tag from a random tagset).
+        sharing: the probability that a given symbol reference in a rule body is to a random symbol on the next
+            level, rather than to one of the symbols "owned" by the referencing symbol (each symbol owns a
+            contiguous block of the next level); with sharing=0, the grammar is (nearly) tree-shaped, and with
+            sharing=1, subgrammars are referenced from all over the grammar.
+        seed: an integer seed for the pseudorandom number generator, such that grammars are reproducible.
+    """
+    rng = random.Random(seed)
+    depth = max(1, depth)
+    n_symbols = max(n_symbols, depth)
+    # Spread the symbols evenly across the levels
+    levels = []
+    for level in xrange(depth):
+        n_symbols_on_this_level = n_symbols // depth + (1 if level < n_symbols % depth else 0)
+        levels.append(['L{level}_S{i}'.format(level=level, i=i) for i in xrange(n_symbols_on_this_level)])
+    nonterminals = {}
+    for level, symbol_names in enumerate(levels):
+        next_level = levels[level+1] if level+1 < depth else None
+        for i, symbol_name in enumerate(symbol_names):
+            markup = {}
+            if rng.random() < tag_density:
+                markup['Tagset{}'.format(rng.randrange(n_tagsets))] = ['tag{}'.format(rng.randrange(tags_per_tagset))]
+            rules = []
+            for j in xrange(branching_factor):
+                if next_level is None:
+                    expansion = ['{symbol}_word{j}'.format(symbol=symbol_name, j=j)]
+                else:
+                    # The block of the next level that this symbol owns
+                    block_size = max(1, len(next_level) // len(symbol_names))
+                    block_start = min(i * block_size, len(next_level) - block_size)
+                    expansion = []
+                    for k in xrange(nonterminals_per_rule):
+                        if rng.random() < sharing:
+                            referenced_symbol_name = rng.choice(next_level)
+                        else:
+                            referenced_symbol_name = next_level[block_start + rng.randrange(block_size)]
+                        expansion.append('[[{}]]'.format(referenced_symbol_name))
+                        expansion.append(' ' if k+1 < nonterminals_per_rule else '.')
+                rules.append({'expansion': expansion, 'app_rate': rng.randint(1, 3)})
+            nonterminals[symbol_name] = {'deep': level == 0, 'markup': markup, 'rules': rules}
+    return {'nonterminals': nonterminals}
+
+
+def write_synthetic_grammar(output_file_location, **knobs):
+    """Generate a synthetic grammar with the given knobs (see generate_synthetic_grammar()) and write it to file."""
+    with open(output_file_location, 'w') as output_file:
+        json.dump(generate_synthetic_grammar(**knobs), output_file)
+
+
+if __name__ == "__main__":
+    # Parse the command-line arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "output_file",
+        help="the full filepath that the synthetic grammar (in the format exported by Expressionist) will be written to"
+    )
+    parser.add_argument(
+        "--n_symbols",
+        help="the number of nonterminal symbols in the grammar (default: 100)",
+        type=int,
+        default=100
+    )
+    parser.add_argument(
+        "--branching_factor",
+        help="the number of production rules for each nonterminal symbol (default: 3)",
+        type=int,
+        default=3
+    )
+    parser.add_argument(
+        "--depth",
+        help="the number of levels of nonterminal symbols (default: 4)",
+        type=int,
+        default=4
+    )
+    parser.add_argument(
+        "--nonterminals_per_rule",
+        help="the number of nonterminal symbols referenced in the body of each non-leaf rule (default: 2)",
+        type=int,
+        default=2
+    )
+    parser.add_argument(
+        "--tag_density",
+        help="the probability that a given nonterminal symbol is tagged (default: 0.2)",
+        type=float,
+        default=0.2
+    )
+    parser.add_argument(
+        "--n_tagsets",
+        help="the number of tagsets that tags are drawn from (default: 5)",
+        type=int,
+        default=5
+    )
+    parser.add_argument(
+        "--tags_per_tagset",
+        help="the number of tags in each tagset (default: 4)",
+        type=int,
+        default=4
+    )
+    parser.add_argument(
+        "--sharing",
+        help="the probability that a symbol reference is to a random symbol on the next level, rather than to " +
+             "one owned by the referencing symbol (default: 0.5)",
+        type=float,
+        default=0.5
+    )
+    parser.add_argument(
+        "--seed",
+        help="an integer seed for the pseudorandom number generator (default: 0)",
+        type=int,
+        default=0
+    )
+    args = parser.parse_args()
+    write_synthetic_grammar(
+        output_file_location=args.output_file,
+        n_symbols=args.n_symbols,
+        branching_factor=args.branching_factor,
+        depth=args.depth,
+        nonterminals_per_rule=args.nonterminals_per_rule,
+        tag_density=args.tag_density,
+        n_tagsets=args.n_tagsets,
+        tags_per_tagset=args.tags_per_tagset,
+        sharing=args.sharing,
+        seed=args.seed
+    )
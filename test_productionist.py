@@ -0,0 +1,111 @@
+import sys  # Used to check which profiler, if any, is installed
+import os  # Used to lay out the files that the test bundle comprises
+import shutil  # Used to clean up the test bundle, and to copy it
+import json  # Used to rewrite the grammar file of the test bundle as an older Reductionist would have written it
+import tempfile  # Used to hold the test bundle
+import unittest
+import productionist
+import reductionist
+import synthetic_grammar
+
+
+class ProductionistTestCase(unittest.TestCase):
+    """Tests of Productionist against a small synthetic content bundle that is built once for all tests."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Generate a synthetic grammar and index it into a content bundle."""
+        cls.content_bundle_directory = tempfile.mkdtemp()
+        grammar_file_location = os.path.join(cls.content_bundle_directory, 'synthetic.json')
+        synthetic_grammar.write_synthetic_grammar(
+            output_file_location=grammar_file_location, n_symbols=20, depth=3, seed=1
+        )
+        reductionist.Reductionist(
+            path_to_input_content_file=grammar_file_location,
+            path_to_write_output_files_to=os.path.join(cls.content_bundle_directory, 'synthetic'),
+            trie_output=True,
+            verbosity=0
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the content bundle."""
+        shutil.rmtree(cls.content_bundle_directory)
+
+    def _load_productionist(self, **kwargs):
+        """Return a Productionist object for the test bundle, with the given keyword arguments."""
+        return productionist.Productionist(
+            content_bundle_name='synthetic',
+            content_bundle_directory=self.content_bundle_directory,
+            verbosity=0,
+            **kwargs
+        )
+
+    def test_failed_request_turns_off_profiler(self):
+        """A request that can't be satisfied must not leave the profiler installed."""
+        productionist_object = self._load_productionist()
+        instrumentation = productionist_object.enable_instrumentation(profile=True)
+        unsatisfiable_content_request = productionist.ContentRequest(must_have={'NoSuchTagset:no_such_tag'})
+        with self.assertRaises(AssertionError):
+            productionist_object.fulfill_content_request(content_request=unsatisfiable_content_request)
+        self.assertIsNone(sys.getprofile())
+        self.assertEqual(instrumentation.counters['failed_requests'], 1)
+        self.assertEqual(instrumentation.counters['requests'], 0)
+        # A later request should still be profiled, and disabling instrumentation should turn the profiler off
+        productionist_object.fulfill_content_request(content_request=productionist.ContentRequest())
+        self.assertEqual(instrumentation.counters['requests'], 1)
+        instrumentation.profiler.enable()
+        productionist_object.disable_instrumentation()
+        self.assertIsNone(sys.getprofile())
+
+    def test_meanings_file_has_three_fields(self):
+        """The length bounds of expressible meanings must not change the format of the .meanings file."""
+        with open(os.path.join(self.content_bundle_directory, 'synthetic.meanings')) as meanings_file:
+            for line in meanings_file:
+                self.assertEqual(len(line.rstrip('\n').split('\t')), 3)
+
+    def test_bundle_without_length_bounds_loads(self):
+        """A bundle whose grammar file lacks the length bounds of its expressible meanings must still load (in
+        either mode), with the bounds computed from its recipes instead.
+        """
+        for extension in ('meanings', 'marisa'):
+            shutil.copy(
+                os.path.join(self.content_bundle_directory, 'synthetic.{}'.format(extension)),
+                os.path.join(self.content_bundle_directory, 'older.{}'.format(extension))
+            )
+        with open(os.path.join(self.content_bundle_directory, 'synthetic.grammar')) as grammar_file:
+            grammar_dictionary = json.load(grammar_file)
+        del grammar_dictionary['expressible_meaning_length_bounds']
+        with open(os.path.join(self.content_bundle_directory, 'older.grammar'), 'w') as grammar_file:
+            json.dump(grammar_dictionary, grammar_file)
+        productionist_object = self._load_productionist(repetition_penalty_mode=False)
+        expected_length_bounds = [(em.min_length, em.max_length) for em in productionist_object.expressible_meanings]
+        self.assertNotIn((None, None), expected_length_bounds)
+        for memory_mapped_meanings in (False, True):
+            older_productionist_object = productionist.Productionist(
+                content_bundle_name='older',
+                content_bundle_directory=self.content_bundle_directory,
+                memory_mapped_meanings=memory_mapped_meanings,
+                repetition_penalty_mode=False,
+                verbosity=0
+            )
+            self.assertEqual(
+                [(em.min_length, em.max_length) for em in older_productionist_object.expressible_meanings],
+                [(None, None)] * len(expected_length_bounds)
+            )
+            max_length = min(max_length for _, max_length in expected_length_bounds)
+            output = older_productionist_object.fulfill_content_request(
+                content_request=productionist.ContentRequest(max_length=max_length)
+            )
+            self.assertLessEqual(len(output.text), max_length)
+            self.assertEqual(
+                [
+                    older_productionist_object._length_bounds_for_expressible_meaning(expressible_meaning=em)
+                    for em in older_productionist_object.expressible_meanings
+                ],
+                expected_length_bounds
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()